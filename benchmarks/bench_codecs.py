@@ -0,0 +1,128 @@
+"""
+Benchmark image codecs for exported frames: throughput and compression ratio.
+
+Encodes and decodes every frame of real recordings (TIFF directories, loaded
+with `load_tiff`), or of a synthetic uint16 stack, with each codec in
+`toile.codecs`, checking that decoding is lossless. Reports encode and
+decode throughput in MB/s of raw pixel data, and the ratio of raw to encoded
+size. The 'atdata' row is the default whole-sample msgpack serialization.
+
+Usage:
+    python benchmarks/bench_codecs.py [--codecs atdata,raw,npy,zstd,lz4,png16] [--frames 200] [--repeat 3] [RECORDING ...]
+"""
+
+##
+# Imports
+
+import argparse
+import time
+
+import numpy as np
+
+import toile.schema as schema
+from toile.codecs import (
+    decode_image,
+    encode_image,
+)
+from toile.tiff_import import (
+    load_tiff,
+)
+
+
+##
+# Helpers
+
+def _synthetic_stack( n_frames: int, shape: tuple[int, int] = (512, 512) ) -> np.ndarray:
+    """Noisy uint16 stack with smooth background and sparse bright cells."""
+    rng = np.random.default_rng( 0 )
+    yy, xx = np.mgrid[:shape[0], :shape[1]]
+    background = 400 + 200 * np.sin( yy / 40 ) * np.cos( xx / 55 )
+
+    cells = np.zeros( shape )
+    for cy, cx in rng.integers( 0, shape[0], size = (40, 2) ):
+        cells += 3000 * np.exp( -( (yy - cy) ** 2 + (xx - cx) ** 2 ) / 50 )
+
+    frames = np.empty( (n_frames, *shape), dtype = np.uint16 )
+    for i in range( n_frames ):
+        frames[i] = np.clip( rng.poisson( background + cells * rng.uniform( 0.5, 1.5 ) ), 0, 65535 )
+    return frames
+
+def _encoders( codec: str, level: int | None ):
+    """Encode and decode functions for a codec, including 'atdata'."""
+    if codec == 'atdata':
+        return (
+            lambda x: schema.Frame( image = x ).packed,
+            lambda b: schema.Frame.from_bytes( b ).image,
+        )
+    return (
+        lambda x: encode_image( x, codec, level ),  # type: ignore[arg-type]
+        lambda b: decode_image( b, codec ),  # type: ignore[arg-type]
+    )
+
+def _run( label: str, frames: np.ndarray, codecs: list[str], level: int | None, repeat: int ) -> None:
+    raw_mb = frames.nbytes / 1e6
+    print( f'{label}: {frames.shape[0]} frames of {frames.shape[1:]} {frames.dtype} ({raw_mb:.1f} MB)' )
+
+    for codec in codecs:
+        encode, decode = _encoders( codec, level )
+        try:
+            encoded = [ encode( f ) for f in frames ]
+        except ( ImportError, ValueError ) as e:
+            print( f'{codec:>8}  skipped: {e}' )
+            continue
+
+        t_encode = float( 'inf' )
+        t_decode = float( 'inf' )
+        for _ in range( repeat ):
+            t0 = time.perf_counter()
+            encoded = [ encode( f ) for f in frames ]
+            t_encode = min( t_encode, time.perf_counter() - t0 )
+
+            t0 = time.perf_counter()
+            decoded = [ decode( b ) for b in encoded ]
+            t_decode = min( t_decode, time.perf_counter() - t0 )
+
+        lossless = all( np.array_equal( a, b ) for a, b in zip( frames, decoded ) )
+        n_encoded = sum( len( b ) for b in encoded )
+        print(
+            f'{codec:>8}  '
+            f'encode {raw_mb / t_encode:8.1f} MB/s  |  '
+            f'decode {raw_mb / t_decode:8.1f} MB/s  |  '
+            f'ratio {frames.nbytes / n_encoded:5.2f}x  lossless={lossless}'
+        )
+
+
+##
+# Main
+
+def main():
+    parser = argparse.ArgumentParser( description = __doc__,
+        formatter_class = argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument( 'recordings', nargs = '*',
+        help = 'Recording directories to benchmark on' )
+    parser.add_argument( '--codecs', default = 'atdata,raw,npy,zstd,lz4,png16',
+        help = 'Comma-separated codecs to compare' )
+    parser.add_argument( '--level', type = int, default = None,
+        help = 'Compression level (codec default if unset)' )
+    parser.add_argument( '--frames', type = int, default = 200,
+        help = 'Frames per recording (or synthetic stack) to encode' )
+    parser.add_argument( '--repeat', type = int, default = 3 )
+    args = parser.parse_args()
+
+    codecs = args.codecs.split( ',' )
+
+    if len( args.recordings ) > 0:
+        for p in args.recordings:
+            ds = load_tiff( p, lazy = True )
+            frames = np.asarray( ds.frames[:args.frames] )
+            _run( p[-32:], frames, codecs, args.level, args.repeat )
+
+    else:
+        _run( 'synthetic', _synthetic_stack( args.frames ), codecs, args.level, args.repeat )
+
+if __name__ == '__main__':
+    main()
+
+
+#
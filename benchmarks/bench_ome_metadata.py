@@ -0,0 +1,116 @@
+"""
+Benchmark OME-XML metadata collation: streaming parser vs. `xmltodict`.
+
+Compares `_collate_ome_xml` against `_collate_metadata( xmltodict.parse( ... ) )`
+on synthetic Prairie View-style OME-XML (one TiffData/Plane pair per frame),
+or on the OME-XML of real TIFF files, and checks that both produce identical
+output.
+
+Usage:
+    python benchmarks/bench_ome_metadata.py [--planes 1000,10000,50000] [--repeat 3] [TIFF ...]
+"""
+
+##
+# Imports
+
+import argparse
+import time
+import tracemalloc
+from uuid import uuid4
+
+import tifffile
+import xmltodict
+
+from toile.tiff_import import (
+    _collate_metadata,
+    _collate_ome_xml,
+)
+
+
+##
+# Helpers
+
+def _synthetic_ome_xml( n_planes: int ) -> str:
+    """Build Prairie View-style OME-XML with one TiffData/Plane per frame."""
+
+    tiff_data = ''.join(
+        f'<TiffData IFD="0" PlaneCount="1" FirstT="{i}" FirstZ="0" FirstC="0">'
+        f'<UUID FileName="rec_Cycle00001_Ch2_{i + 1:06d}.ome.tif">urn:uuid:{uuid4()}</UUID>'
+        '</TiffData>'
+        for i in range( n_planes )
+    )
+    planes = ''.join(
+        f'<Plane TheT="{i}" TheZ="0" TheC="0" DeltaT="{0.1 * i:.3f}" '
+        'PositionX="1.5" PositionY="-2.0" PositionZ="30.0" />'
+        for i in range( n_planes )
+    )
+
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<OME xmlns="http://www.openmicroscopy.org/Schemas/OME/2015-01" UUID="urn:uuid:{uuid4()}">'
+        '<Image ID="Image:1" Name="rec"><AcquisitionDate>2024-01-15T14:30:00</AcquisitionDate>'
+        f'<Pixels ID="Pixels:1" DimensionOrder="XYCZT" Type="uint16" SizeX="512" SizeY="512" '
+        f'SizeZ="1" SizeC="1" SizeT="{n_planes}" PhysicalSizeX="0.5" PhysicalSizeY="0.5" PhysicalSizeZ="1.0">'
+        '<Channel ID="Channel:1:0" Name="Ch2" SamplesPerPixel="1" />'
+        f'{tiff_data}{planes}</Pixels></Image></OME>'
+    )
+
+def _time( f, xml: str, repeat: int ) -> tuple[float, float, dict]:
+    """Best-of-`repeat` wall time and peak traced memory (MB) for `f( xml )`."""
+    best = float( 'inf' )
+    for _ in range( repeat ):
+        t0 = time.perf_counter()
+        ret = f( xml )
+        best = min( best, time.perf_counter() - t0 )
+
+    tracemalloc.start()
+    f( xml )
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak / 1e6, ret
+
+def _run( label: str, xml: str, repeat: int ) -> None:
+    t_old, m_old, ret_old = _time( lambda x: _collate_metadata( xmltodict.parse( x ) ), xml, repeat )
+    t_new, m_new, ret_new = _time( _collate_ome_xml, xml, repeat )
+
+    print(
+        f'{label:>32}  '
+        f'xmltodict {t_old * 1e3:9.1f} ms {m_old:8.1f} MB  |  '
+        f'fast {t_new * 1e3:9.1f} ms {m_new:8.1f} MB  |  '
+        f'speedup {t_old / t_new:5.1f}x  identical={ret_old == ret_new}'
+    )
+
+
+##
+# Main
+
+def main():
+    parser = argparse.ArgumentParser( description = __doc__,
+        formatter_class = argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument( 'tiffs', nargs = '*',
+        help = 'OME-TIFF files whose metadata to benchmark' )
+    parser.add_argument( '--planes', default = '1000,10000,50000',
+        help = 'Comma-separated plane counts for synthetic OME-XML' )
+    parser.add_argument( '--repeat', type = int, default = 3 )
+    args = parser.parse_args()
+
+    if len( args.tiffs ) > 0:
+        for p in args.tiffs:
+            with tifffile.TiffFile( p ) as tif:
+                xml = tif.ome_metadata
+            if xml is None:
+                print( f'{p}: no OME metadata' )
+                continue
+            _run( p[-32:], xml, args.repeat )
+
+    else:
+        for n in ( int( x ) for x in args.planes.split( ',' ) ):
+            _run( f'{n} planes', _synthetic_ome_xml( n ), args.repeat )
+
+if __name__ == '__main__':
+    main()
+
+
+#
@@ -7,7 +7,9 @@ and exporting them to WebDataset format for machine learning pipelines.
 
 from typer import Typer
 
+from .catalog import app as catalog_app
 from .export import app as export_app
+from .metadata import app as metadata_app
 
 
 ##
@@ -15,6 +17,8 @@ from .export import app as export_app
 app = Typer()
 
 app.add_typer( export_app, name = 'export' )
+app.add_typer( catalog_app, name = 'catalog' )
+app.add_typer( metadata_app, name = 'metadata' )
 
 
 ##
@@ -0,0 +1,185 @@
+"""Balanced shard layouts and shuffled write order.
+
+By default, `ShardWriter` fills each shard greedily up to the shard size, so
+the last shard of an export is often nearly empty. Shard sizes also vary
+with how samples happen to fall at the limit. When the size of every sample
+is predicted up front (from the stack shapes in an export plan; see
+`toile.plan`), shard boundaries can instead be chosen so that every shard
+holds about the same number of bytes, or exactly the same number of samples
+(see `_plan_shard_counts`), which evens out the work of data loaders that
+are each assigned whole shards.
+
+Samples can also be shuffled across recordings as they are written, through
+a buffer of fixed size (see `_ShuffleBuffer`).
+"""
+
+##
+# Imports
+
+import math
+import random
+
+import numpy as np
+
+from ._shards import (
+    ShardWriter,
+)
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Optional,
+    Sequence,
+)
+
+
+##
+# Shard layouts
+
+def _plan_shard_counts( sample_nbytes: Sequence[int],
+            shard_size: Optional[float] = None,
+            samples_per_shard: Optional[int] = None,
+        ) -> list[int]:
+    """Number of samples in each shard of a balanced layout.
+
+    Args:
+        sample_nbytes: Predicted size in bytes of each sample, in write order
+        shard_size: Target shard size in bytes. Samples are split into as
+            few shards as keep each within about this size, with boundaries
+            placed so that the shards are as equal in size as possible
+        samples_per_shard: Exact number of samples per shard (the last
+            shard holds the remainder); takes precedence over `shard_size`
+
+    Returns:
+        Number of samples in each shard, in order
+    """
+    n_samples = len( sample_nbytes )
+
+    if samples_per_shard is not None:
+        if samples_per_shard < 1:
+            raise ValueError( f'Samples per shard must be positive (got {samples_per_shard})' )
+        return [ min( samples_per_shard, n_samples - i )
+                 for i in range( 0, n_samples, samples_per_shard ) ]
+
+    if shard_size is None or shard_size <= 0:
+        raise ValueError( f'Shard size must be positive (got {shard_size})' )
+    if n_samples == 0:
+        return []
+
+    cumulative = np.cumsum( np.asarray( sample_nbytes, dtype = np.float64 ) )
+    total = cumulative[-1]
+    n_shards = max( 1, math.ceil( total / shard_size ) )
+
+    # End each shard at the sample boundary closest to its share of the total
+    targets = total * np.arange( 1, n_shards ) / n_shards
+    after = np.searchsorted( cumulative, targets )
+    before = np.maximum( after - 1, 0 )
+    closer = np.where( cumulative[after] - targets <= targets - cumulative[before], after, before )
+
+    ends = np.unique( np.clip( closer + 1, 1, n_samples ) )
+    bounds = [ 0, *( int( x ) for x in ends if x < n_samples ), n_samples ]
+    return [ hi - lo for lo, hi in zip( bounds[:-1], bounds[1:] ) ]
+
+
+##
+# Shuffling
+
+class _BufferedRecording:
+    """Samples of one recording held in a `_ShuffleBuffer`."""
+
+    def __init__( self, on_written: Callable[[list[str], Optional[tuple[int, int]]], Any] ):
+        self.on_written = on_written
+        self.keys: list[str] = []
+        self.shards: Optional[tuple[int, int]] = None
+        self.n_buffered = 0
+        self.complete = False
+
+    def finish_if_done( self ) -> None:
+        if self.complete and self.n_buffered == 0:
+            self.on_written( self.keys, self.shards )
+
+class _ShuffleBuffer:
+    """Writes samples to a shard writer in shuffled order.
+
+    Samples pass through a buffer of `size` samples. Once it is full, each
+    added sample displaces a randomly chosen one, which is written. Samples
+    therefore mix with others up to about `size` positions away, across
+    recording boundaries. The buffer holds serialized samples, so its memory
+    use is about `size` times the sample size.
+
+    Samples are added a recording at a time, and each recording's callback
+    runs once the last of its samples has been written.
+    """
+
+    def __init__( self, dest: ShardWriter, size: int, seed: Optional[int] = None ):
+        """Create a shuffle buffer.
+
+        Args:
+            dest: Shard writer to write samples to
+            size: Number of samples held back for shuffling
+            seed: Seed of the shuffle (nondeterministic if None)
+        """
+        if size < 1:
+            raise ValueError( f'Shuffle buffer size must be positive (got {size})' )
+
+        self.dest = dest
+        self.size = size
+        self._rng = random.Random( seed )
+        self._buffer: list[tuple[dict[str, Any], _BufferedRecording]] = []
+
+    def _write( self, sample: dict[str, Any], recording: _BufferedRecording ) -> None:
+        self.dest.write( sample )
+        assert self.dest.current_shard is not None
+
+        recording.keys.append( sample['__key__'] )
+        recording.shards = (
+            (self.dest.current_shard, self.dest.current_shard) if recording.shards is None
+            else (recording.shards[0], self.dest.current_shard)
+        )
+        recording.n_buffered -= 1
+        recording.finish_if_done()
+
+    def add_recording( self, samples: Iterable[dict[str, Any]],
+                on_written: Callable[[list[str], Optional[tuple[int, int]]], Any],
+            ) -> None:
+        """Add the samples of a recording.
+
+        If iterating `samples` raises, its samples still in the buffer are
+        dropped (those already written stay), and `on_written` is never
+        called.
+
+        Args:
+            samples: Serialized samples (whole; not written in pieces)
+            on_written: Called with the keys of the recording's samples, in
+                write order, and the first and last index of the shards they
+                were written to (None if there were none), once all have
+                been written
+        """
+        recording = _BufferedRecording( on_written )
+        try:
+            for cur_sample in samples:
+                if cur_sample.get( '__append__', False ):
+                    raise ValueError( 'Samples written in pieces cannot be shuffled' )
+
+                recording.n_buffered += 1
+                self._buffer.append( (cur_sample, recording) )
+                if len( self._buffer ) > self.size:
+                    i = self._rng.randrange( len( self._buffer ) )
+                    self._buffer[i], self._buffer[-1] = self._buffer[-1], self._buffer[i]
+                    self._write( *self._buffer.pop() )
+        except BaseException:
+            self._buffer = [ x for x in self._buffer if x[1] is not recording ]
+            raise
+
+        recording.complete = True
+        recording.finish_if_done()
+
+    def flush( self ) -> None:
+        """Write all buffered samples, in shuffled order."""
+        self._rng.shuffle( self._buffer )
+        while len( self._buffer ) > 0:
+            self._write( *self._buffer.pop() )
+
+
+#
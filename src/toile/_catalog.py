@@ -0,0 +1,186 @@
+"""Recording catalogs stored as SQLite tables.
+
+A catalog lists recordings with one row each, holding what can be learned
+without reading pixels: the stack's shape and dtype from its TIFF header,
+the collated movie-level OME metadata, and the fields parsed from its
+filename. Each metadata field gets a column of its own, so that recordings
+can be selected with an SQL `WHERE` expression over them, e.g.,
+`mouse_id = 12 AND slice_id = 'A' AND date_acquired > '2024-01-01'`.
+
+Catalogs are built by `toile.catalog.build_catalog` (`toile catalog build`).
+"""
+
+##
+# Imports
+
+import os
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from ._common import (
+    _Pathable,
+)
+
+from typing import (
+    Any,
+    Optional,
+    Sequence,
+)
+
+
+##
+# Constants
+
+_TABLE = 'recordings'
+
+# Columns every catalog has, in order; metadata fields with the same names
+# aren't given columns of their own
+_COLUMNS = [
+    ('path', 'TEXT PRIMARY KEY'),
+    ('stack_path', 'TEXT'),
+    ('channel_paths', 'TEXT'),
+    ('n_channels', 'INTEGER'),
+    ('n_frames', 'INTEGER'),
+    ('height', 'INTEGER'),
+    ('width', 'INTEGER'),
+    ('shape', 'TEXT'),
+    ('dtype', 'TEXT'),
+    ('nbytes', 'INTEGER'),
+    ('file_nbytes', 'INTEGER'),
+    ('error', 'TEXT'),
+]
+
+
+##
+# Helpers
+
+def _quote( name: str ) -> str:
+    """Quote a column name for use in SQL."""
+    return '"' + name.replace( '"', '""' ) + '"'
+
+def _column_value( x: Any ) -> Any:
+    """Value of a metadata field as stored in its column: scalars as they
+    are, anything else as JSON."""
+    if isinstance( x, np.generic ):
+        x = x.item()
+    if x is None or isinstance( x, (bool, int, float, str) ):
+        return x
+    return json.dumps( x, default = str )
+
+def _connect_readonly( catalog: _Pathable ) -> sqlite3.Connection:
+    """Open a catalog without allowing changes to it."""
+    catalog = Path( catalog )
+    if not catalog.is_file():
+        raise FileNotFoundError( f'No catalog at {catalog.as_posix()}' )
+    return sqlite3.connect( catalog.absolute().as_uri() + '?mode=ro', uri = True )
+
+
+##
+# Writing
+
+def _write_catalog( catalog: _Pathable, rows: Sequence[dict[str, Any]] ) -> None:
+    """Write a catalog of `rows`, replacing any catalog already at `catalog`.
+
+    Args:
+        catalog: Location of the SQLite database
+        rows: One dict per recording, in export order, with the fixed
+            columns (see `_COLUMNS`), and the recording's metadata fields
+            as a dict under 'metadata'
+    """
+    catalog = Path( catalog )
+    fixed = [ k for k, _ in _COLUMNS ]
+
+    # Metadata fields in order of first appearance
+    fields = dict()
+    for cur_row in rows:
+        for k in cur_row.get( 'metadata', dict() ):
+            if k not in fixed:
+                fields[k] = None
+
+    # Written beside the catalog and moved into place, so that readers never
+    # see a partial catalog
+    tmp_path = catalog.with_name( catalog.name + '.tmp' )
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect( tmp_path )
+    try:
+        with conn:
+            conn.execute(
+                f'CREATE TABLE {_TABLE} ('
+                + ', '.join( [ f'{_quote( k )} {t}' for k, t in _COLUMNS ]
+                             + [ _quote( k ) for k in fields ] )
+                + ')'
+            )
+            conn.executemany(
+                f'INSERT INTO {_TABLE} VALUES ({", ".join( "?" * ( len( fixed ) + len( fields ) ) )})',
+                ( [ _column_value( x.get( k ) ) for k in fixed ]
+                  + [ _column_value( x.get( 'metadata', dict() ).get( k ) ) for k in fields ]
+                  for x in rows ),
+            )
+    finally:
+        conn.close()
+
+    os.replace( tmp_path, catalog )
+
+
+##
+# Reading
+
+def query_catalog( catalog: _Pathable,
+            where: Optional[str] = None,
+        ) -> list[dict[str, Any]]:
+    """Rows of a catalog, optionally filtered by an SQL expression.
+
+    Args:
+        catalog: Location of the SQLite database
+        where: SQL expression over the catalog's columns that selected rows
+            satisfy (e.g., `"mouse_id = 12 AND date_acquired > '2024-01-01'"`);
+            all rows if None
+
+    Returns:
+        Selected rows as dicts, in catalog order; fields of recordings
+        without them are None
+
+    Raises:
+        ValueError: If `where` isn't a valid expression over the catalog
+    """
+    conn = _connect_readonly( catalog )
+    try:
+        query = f'SELECT * FROM {_TABLE}'
+        if where is not None:
+            query += f' WHERE ({where})'
+        try:
+            cursor = conn.execute( query + ' ORDER BY rowid' )
+        except sqlite3.Error as e:
+            raise ValueError( f'Invalid catalog filter {where!r}: {e}' ) from e
+        names = [ x[0] for x in cursor.description ]
+        return [ dict( zip( names, x ) ) for x in cursor ]
+    finally:
+        conn.close()
+
+def select_recordings( catalog: _Pathable,
+            where: Optional[str] = None,
+        ) -> list[str]:
+    """Recording directories in a catalog that satisfy an SQL expression.
+
+    Recordings the catalog lists with an error are left out.
+
+    Args:
+        catalog: Location of the SQLite database
+        where: SQL expression over the catalog's columns (see
+            `query_catalog`); all recordings if None
+
+    Returns:
+        Paths of the selected recordings, in catalog order
+    """
+    condition = 'error IS NULL'
+    if where is not None:
+        condition += f' AND ({where})'
+    return [ x['path'] for x in query_catalog( catalog, condition ) ]
+
+
+#
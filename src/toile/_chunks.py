@@ -0,0 +1,194 @@
+"""Chunked array layout for whole-movie samples.
+
+A movie sample stores its stack as a grid of fixed-size (time × tile) chunks,
+each a separate tar member holding the chunk's raw C-order bytes, plus a JSON
+header member describing the layout. Readers can then fetch a time range or
+spatial crop by decoding only the chunks that overlap it. Any axes between
+time and the spatial axes (e.g., channels of a (time, channel, height,
+width) stack) are kept whole in every chunk.
+
+Member names, relative to the sample key:
+
+- `movie.json`: header (see `_movie_header`)
+- `chunk-TTTTT-YYY-XXX.bin`: chunk at grid position (T, Y, X)
+"""
+
+##
+# Imports
+
+import math
+import json
+
+import numpy as np
+
+from typing import (
+    Any,
+    Iterator,
+    Optional,
+)
+from numpy.typing import (
+    NDArray,
+)
+
+
+##
+# Constants
+
+MOVIE_HEADER_MEMBER = 'movie.json'
+
+
+##
+# Layout
+
+def _chunk_member( ti: int, yi: int, xi: int ) -> str:
+    """Member name (extension) of the chunk at grid position (ti, yi, xi)."""
+    return f'chunk-{ti:05d}-{yi:03d}-{xi:03d}.bin'
+
+def _chunk_shape( shape: tuple[int, ...],
+            chunk_frames: int,
+            chunk_tile: int = 0,
+        ) -> tuple[int, ...]:
+    """Chunk shape for a (time, ..., height, width) stack.
+
+    Args:
+        shape: Stack shape
+        chunk_frames: Frames per chunk
+        chunk_tile: Height and width of each chunk's tile (0 for full frames)
+
+    Returns:
+        Shape of a full chunk, spanning any middle axes whole
+    """
+    if chunk_frames < 1 or chunk_tile < 0:
+        raise ValueError( f'Invalid chunking: {chunk_frames} frames, {chunk_tile} tile' )
+
+    middle, (height, width) = tuple( shape[1:-2] ), shape[-2:]
+    if chunk_tile == 0:
+        return chunk_frames, *middle, height, width
+    return chunk_frames, *middle, min( chunk_tile, height ), min( chunk_tile, width )
+
+def _chunk_grid( shape: tuple[int, ...], chunk_shape: tuple[int, ...] ) -> tuple[int, ...]:
+    """Number of chunks along each axis."""
+    return tuple( max( 1, math.ceil( n / c ) ) for n, c in zip( shape, chunk_shape ) )
+
+def _movie_header( shape: tuple[int, ...],
+            dtype: np.dtype,
+            chunk_shape: tuple[int, ...],
+            metadata: Optional[dict[str, Any]] = None,
+            frame_metadata: Optional[list[Any]] = None,
+        ) -> bytes:
+    """Serialize the header of a chunked movie sample.
+
+    Args:
+        shape: Stack shape (time, ..., height, width)
+        dtype: Stack dtype
+        chunk_shape: Shape of a full chunk (edge chunks are truncated)
+        metadata: Movie-level metadata
+        frame_metadata: Per-frame metadata, one entry per frame
+
+    Returns:
+        JSON header bytes
+    """
+    return json.dumps( {
+            'shape': list( shape ),
+            'dtype': np.dtype( dtype ).str,
+            'chunk_shape': list( chunk_shape ),
+            'grid': list( _chunk_grid( shape, chunk_shape ) ),
+            'metadata': metadata,
+            'frame_metadata': frame_metadata,
+        },
+        default = str,
+    ).encode( 'utf-8' )
+
+def _iter_time_chunks( frames: Any,
+            chunk_shape: tuple[int, ...],
+        ) -> Iterator[dict[str, bytes]]:
+    """Cut a stack into chunk members, one time block at a time.
+
+    Each block of `chunk_shape[0]` frames is read from `frames` once (so
+    lazily-loaded stacks are streamed) and split into tiles.
+
+    Args:
+        frames: Stack of shape (time, ..., height, width), in memory or lazy
+        chunk_shape: Shape of a full chunk
+
+    Yields:
+        For each time block, chunk member names mapped to their raw bytes
+    """
+    n_frames = frames.shape[0]
+    ct, (cy, cx) = chunk_shape[0], chunk_shape[-2:]
+    ny, nx = _chunk_grid( frames.shape, chunk_shape )[-2:]
+
+    for ti, t0 in enumerate( range( 0, n_frames, ct ) ):
+        block = np.asarray( frames[t0:t0 + ct] )
+        members = dict()
+        for yi in range( ny ):
+            for xi in range( nx ):
+                cur_tile = block[..., yi * cy:(yi + 1) * cy, xi * cx:(xi + 1) * cx]
+                members[_chunk_member( ti, yi, xi )] = np.ascontiguousarray( cur_tile ).tobytes()
+        yield members
+
+def _chunk_slices( start: int, stop: int, chunk: int ) -> Iterator[tuple[int, slice, slice]]:
+    """Chunks overlapping `[start, stop)` along one axis.
+
+    Yields:
+        Chunk index, slice within the chunk, and slice within the output
+    """
+    for i in range( start // chunk, -(-stop // chunk) ):
+        lo = max( start, i * chunk )
+        hi = min( stop, (i + 1) * chunk )
+        yield i, slice( lo - i * chunk, hi - i * chunk ), slice( lo - start, hi - start )
+
+def _read_chunked( header: dict[str, Any],
+            read_member,
+            t: slice = slice( None ),
+            y: slice = slice( None ),
+            x: slice = slice( None ),
+        ) -> NDArray:
+    """Assemble a region of a chunked movie from its chunks.
+
+    Args:
+        header: Parsed movie header
+        read_member: Function mapping a chunk member name to its bytes
+        t: Time range to read
+        y: Row range to read
+        x: Column range to read
+
+    Returns:
+        Array of shape (len(t), ..., len(y), len(x)), spanning any middle
+        axes whole
+    """
+    shape = header['shape']
+    chunk_shape = header['chunk_shape']
+    dtype = np.dtype( header['dtype'] )
+    middle = list( shape[1:-2] )
+    # Only the time and spatial axes are chunked
+    outer_shape = [ shape[0], *shape[-2:] ]
+    outer_chunk = [ chunk_shape[0], *chunk_shape[-2:] ]
+
+    bounds = []
+    for cur_slice, n in zip( (t, y, x), outer_shape ):
+        start, stop, step = cur_slice.indices( n )
+        if step != 1:
+            raise ValueError( 'Chunked reads only support contiguous ranges' )
+        bounds.append( (start, max( start, stop )) )
+
+    out = np.empty( [ bounds[0][1] - bounds[0][0], *middle, *( hi - lo for lo, hi in bounds[1:] ) ],
+        dtype = dtype,
+    )
+    if out.size == 0:
+        return out
+
+    for ti, t_in, t_out in _chunk_slices( *bounds[0], outer_chunk[0] ):
+        for yi, y_in, y_out in _chunk_slices( *bounds[1], outer_chunk[1] ):
+            for xi, x_in, x_out in _chunk_slices( *bounds[2], outer_chunk[2] ):
+                cur_t, cur_y, cur_x = [ min( c, n - i * c )
+                                        for i, c, n in zip( (ti, yi, xi), outer_chunk, outer_shape ) ]
+                cur_chunk = np.frombuffer( read_member( _chunk_member( ti, yi, xi ) ),
+                    dtype = dtype,
+                ).reshape( cur_t, *middle, cur_y, cur_x )
+                out[t_out, ..., y_out, x_out] = cur_chunk[t_in, ..., y_in, x_in]
+
+    return out
+
+
+#
@@ -0,0 +1,168 @@
+"""Content-addressed deduplication of recordings and frames.
+
+Recordings are identified by a cheap digest of their content: the OME UUID
+of the acquisition, the shape and dtype of the stack, and the pixels of a
+few frames sampled evenly through it. Two input directories holding the same
+recording (e.g., referenced from two experiment folders) get the same
+digest without either being read in full. Frames are identified by a digest
+of their full pixel data.
+"""
+
+##
+# Imports
+
+import json
+import hashlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ._common import (
+    _Pathable,
+)
+from ._metadata_cache import (
+    MetadataCache,
+)
+from .schema import (
+    Movie,
+)
+from .tiff_import import (
+    ChannelMode,
+    close_movie,
+    load_tiff,
+)
+
+from typing import (
+    Literal,
+    Optional,
+    Sequence,
+    TypeAlias,
+)
+from numpy.typing import (
+    NDArray,
+)
+
+
+##
+# Typing shortcuts
+
+DedupMode: TypeAlias = Literal[
+    'none',
+    'recordings',
+    'frames',
+]
+"""Which duplicates an export skips:
+
+- 'none': export everything
+- 'recordings': skip recordings whose content digest matches one already
+  exported (in this run, or in earlier runs of a resumed export)
+- 'frames': as 'recordings', and also skip individual frames whose pixels
+  match a frame already written in this run (frame exports only)
+"""
+
+# Frames sampled from each recording for its digest
+_DIGEST_FRAMES = 8
+# Recordings opened at once to take their digests ahead of an export
+_DIGEST_THREADS = 8
+
+_DIGEST_SIZE = 16
+
+
+##
+# Digests
+
+def _frame_digest( image: NDArray ) -> str:
+    """Digest of a frame's dtype, shape, and full pixel data."""
+    h = hashlib.blake2b( digest_size = _DIGEST_SIZE )
+    h.update( f'{image.dtype.str}{image.shape}'.encode( 'ascii' ) )
+    h.update( np.ascontiguousarray( image ) )
+    return h.hexdigest()
+
+def _movie_digest( ds: Movie ) -> str:
+    """Cheap content digest of a loaded recording, from its metadata and a
+    few sampled frames (only those frames are read from a lazy movie).
+
+    Frames are taken as loaded, so the recording should be loaded without
+    normalization, for its digest to identify its raw content.
+    """
+    n_frames = ds.frames.shape[0]
+    metadata = ds.metadata if ds.metadata is not None else dict()
+
+    h = hashlib.blake2b( digest_size = _DIGEST_SIZE )
+    h.update( json.dumps( {
+        'uuid': metadata.get( 'uuid' ),
+        'shape': list( ds.frames.shape ),
+        'dtype': np.dtype( ds.frames.dtype ).str,
+    } ).encode( 'utf-8' ) )
+
+    sampled = sorted( set( np.linspace( 0, n_frames - 1, _DIGEST_FRAMES ).round().astype( int ) ) )
+    for i in ( sampled if n_frames > 0 else [] ):
+        h.update( np.ascontiguousarray( ds.frames[i] ) )
+
+    return h.hexdigest()
+
+def _recording_digest( path: _Pathable,
+            stack_path: Optional[_Pathable | Sequence[_Pathable]] = None,
+            channels: ChannelMode = 'first',
+            metadata_cache: Optional[MetadataCache] = None,
+            frame_pattern_full: str = '*_*0001.ome.tif*',
+            frame_pattern: str = '*.ome.tif*',
+        ) -> str:
+    """Cheap content digest of the recording in a directory (see `_movie_digest`).
+
+    Opens the stack lazily and without normalization, so only the OME
+    metadata and the sampled frames are read.
+
+    Args:
+        path: Recording directory (as for `load_tiff`)
+        stack_path: Full stack file of the recording (or one per channel),
+            if already resolved
+        channels: Which channels are exported (see `ChannelMode`)
+        metadata_cache: Cache of OME metadata to consult first (see `load_tiff`)
+        frame_pattern_full: Glob pattern for full stack files (as for `load_tiff`)
+        frame_pattern: Glob pattern for the files of a split stack (as for `load_tiff`)
+
+    Returns:
+        Hex digest identifying the recording's content
+    """
+    ds = load_tiff( path, frame_pattern_full, frame_pattern,
+        lazy = True, stack_path = stack_path, channels = channels,
+        metadata_cache = metadata_cache,
+    )
+    try:
+        return _movie_digest( ds )
+    finally:
+        close_movie( ds )
+
+def _recording_digests( paths: Sequence[Path],
+            stack_paths: Optional[dict[Path, Path | list[Path]]] = None,
+            threads: int = _DIGEST_THREADS,
+            **kwargs
+        ) -> list[str | Exception]:
+    """Digests of many recordings (see `_recording_digest`), taken concurrently.
+
+    Args:
+        paths: Recording directories
+        stack_paths: Already-resolved stack files of recordings, by path
+        threads: Number of recordings opened at once
+        **kwargs: Other arguments of `_recording_digest`
+
+    Returns:
+        Digest of each recording, in order, or the exception raised while
+        taking it
+    """
+    if stack_paths is None:
+        stack_paths = dict()
+
+    def _digest( path: Path ) -> str | Exception:
+        try:
+            return _recording_digest( path, stack_paths.get( path ), **kwargs )
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor( max_workers = max( 1, threads ) ) as pool:
+        return list( pool.map( _digest, paths ) )
+
+
+#
@@ -0,0 +1,429 @@
+"""Export manifests for resumable and incremental exports.
+
+A manifest is an append-only JSON Lines file written alongside the shards of
+an export. It records each shard once it has been finalized on disk, and
+each recording once all of its samples have been written, together with a
+fingerprint of the recording's files. Recordings skipped as duplicates of
+others are recorded too, as are recordings whose samples were dropped from
+the indices. Re-running an export with `resume` skips recordings whose
+entries are complete and whose files are unchanged, and appends everything
+else to fresh shards.
+
+Alongside the manifest, a sample index (`{stem}-index.tsv`) maps each sample
+key to its shard and to the byte offset and length of its members within the
+shard's tar stream, one tab-separated `key shard offset length` line per
+sample. Lines are appended as shards are finalized, at which point each shard
+also gets its own detailed index (see `_write_shard_index`).
+"""
+
+##
+# Imports
+
+import os
+import json
+from pathlib import Path
+
+from ._common import (
+    _Pathable,
+)
+from ._shards import (
+    ShardSample,
+    _drop_from_shard_index,
+    _write_shard_index,
+)
+
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Optional,
+    Sequence,
+    TextIO,
+)
+
+
+##
+# Constants
+
+_MANIFEST_SUFFIX = '-manifest.jsonl'
+_INDEX_SUFFIX = '-index.tsv'
+
+# Files considered part of a recording when fingerprinting its directory
+_RECORDING_FILE_SUFFIXES = ('.tif', '.tiff')
+
+
+##
+# Helpers
+
+def _manifest_path( output_dir: _Pathable, stem: str ) -> Path:
+    """Path of the manifest for an export with the given stem."""
+    return Path( output_dir ) / f'{stem}{_MANIFEST_SUFFIX}'
+
+def _index_path( output_dir: _Pathable, stem: str ) -> Path:
+    """Path of the sample index for an export with the given stem."""
+    return Path( output_dir ) / f'{stem}{_INDEX_SUFFIX}'
+
+def _recording_id( path: _Pathable ) -> str:
+    """Stable identifier for a recording directory within manifests."""
+    return Path( os.path.abspath( path ) ).as_posix()
+
+def _is_recording_file( name: str ) -> bool:
+    """Whether a file is considered part of a recording when fingerprinting."""
+    return name.lower().endswith( _RECORDING_FILE_SUFFIXES )
+
+def _fingerprint_stats( stats: Iterable[tuple[int, int]] ) -> dict[str, int]:
+    """Fingerprint of a recording from the `(size, mtime_ns)` of its files.
+
+    See `_recording_fingerprint`.
+    """
+    n_files = 0
+    size = 0
+    mtime_ns = 0
+
+    for cur_size, cur_mtime_ns in stats:
+        n_files += 1
+        size += cur_size
+        mtime_ns = max( mtime_ns, cur_mtime_ns )
+
+    return {
+        'n_files': n_files,
+        'size': size,
+        'mtime_ns': mtime_ns,
+    }
+
+def _recording_fingerprint( path: _Pathable ) -> dict[str, int]:
+    """Cheap change-detection fingerprint of a recording directory.
+
+    Summarizes the TIFF files in the directory by count, total size, and
+    latest modification time, which covers single-stack, multi-channel, and
+    one-file-per-frame recordings alike without reading any pixel data.
+
+    Args:
+        path: Recording directory
+
+    Returns:
+        Dict with 'n_files', 'size', and 'mtime_ns' keys
+    """
+    stats = []
+    with os.scandir( path ) as it:
+        for entry in it:
+            if not _is_recording_file( entry.name ):
+                continue
+            if not entry.is_file():
+                continue
+
+            st = entry.stat()
+            stats.append( (st.st_size, st.st_mtime_ns) )
+
+    return _fingerprint_stats( stats )
+
+
+##
+# Manifest
+
+class ExportManifest:
+    """Append-only record of finalized shards and committed recordings.
+
+    Every entry is flushed and synced to disk as soon as it is recorded, so
+    after a crash the manifest describes exactly the shards that were closed
+    and the recordings whose samples were all written.
+
+    Closed shards can still hold samples of a recording that never finished
+    (because its export failed, or was interrupted after the shard was
+    closed), or that a resumed export writes again. Those samples are
+    dropped from the shard indices and the sample index (see
+    `drop_recording`), so readers of the indices see each recording once,
+    with all of its samples.
+
+    Recording indices (used to build globally unique sample keys) are
+    reserved in blocks per export run and never reused, even for recordings
+    whose export was interrupted, so keys stay unique across resumed runs.
+
+    Attributes:
+        path: Location of the manifest file
+        index_path: Location of the sample index, if one is kept
+        shards: Finalized shards, by shard index
+        recordings: Latest committed entry for each recording, by recording id
+        duplicates: Latest duplicate entry for each recording skipped as a
+            duplicate, by recording id
+    """
+
+    def __init__( self, path: _Pathable,
+                resume: bool = False,
+                index_path: Optional[_Pathable] = None,
+            ):
+        """Open a manifest for writing.
+
+        Args:
+            path: Location of the manifest file
+            resume: Load and append to an existing manifest instead of
+                starting a new one
+            index_path: Location of the sample index to maintain alongside
+                the manifest (None to not keep one)
+        """
+        self.path = Path( path )
+        self.index_path = None if index_path is None else Path( index_path )
+        self.shards: dict[int, str] = dict()
+        self.recordings: dict[str, dict[str, Any]] = dict()
+        self.duplicates: dict[str, dict[str, Any]] = dict()
+        self._next_index = 0
+        self._descriptions: dict[str, dict[str, Any]] = dict()
+        self._dropped: set[str] = set()
+
+        if resume and self.path.exists():
+            self._load()
+            self._f: TextIO = open( self.path, 'a' )
+        else:
+            self._f = open( self.path, 'w' )
+
+        self._index_f: Optional[TextIO] = None
+        if self.index_path is not None:
+            if resume and self.index_path.exists():
+                # Drop lines of shards that the manifest never recorded
+                self._filter_index( lambda fields: int( fields[1] ) in self.shards )
+                self._index_f = open( self.index_path, 'a' )
+            else:
+                self._index_f = open( self.index_path, 'w' )
+
+    def _load( self ) -> None:
+        """Read existing entries, dropping a trailing partially-written line."""
+
+        n_valid = 0
+        with open( self.path, 'rb' ) as f:
+            for line in f:
+                if not line.endswith( b'\n' ):
+                    break
+                try:
+                    entry = json.loads( line )
+                except json.JSONDecodeError:
+                    break
+
+                if entry.get( 'type' ) == 'shard':
+                    self.shards[int( entry['shard'] )] = entry['path']
+                elif entry.get( 'type' ) == 'recording':
+                    self.recordings[entry['recording']] = entry
+                elif entry.get( 'type' ) == 'duplicate':
+                    self.duplicates[entry['recording']] = entry
+                elif entry.get( 'type' ) == 'run':
+                    self._next_index = max( self._next_index,
+                        entry['first_index'] + entry['n_recordings'] )
+
+                n_valid += len( line )
+
+        # Make sure new entries start on a fresh line
+        os.truncate( self.path, n_valid )
+
+    def _filter_index( self, keep: Callable[[list[str]], bool] ) -> None:
+        """Rewrite the sample index with only the complete lines whose fields
+        (`key shard offset length`) satisfy `keep`."""
+        assert self.index_path is not None
+
+        tmp_path = self.index_path.with_name( self.index_path.name + '.tmp' )
+        with open( self.index_path, 'r' ) as f_in, open( tmp_path, 'w' ) as f_out:
+            for line in f_in:
+                fields = line.rstrip( '\n' ).split( '\t' )
+                if line.endswith( '\n' ) and len( fields ) == 4 and keep( fields ):
+                    f_out.write( line )
+        os.replace( tmp_path, self.index_path )
+
+    def _append( self, entry: dict[str, Any] ) -> None:
+        self._f.write( json.dumps( entry ) + '\n' )
+        self._f.flush()
+        os.fsync( self._f.fileno() )
+
+    ##
+
+    @property
+    def next_shard( self ) -> int:
+        """Index of the first shard after all finalized shards."""
+        if len( self.shards ) == 0:
+            return 0
+        return max( self.shards ) + 1
+
+    def is_current( self, recording: str, fingerprint: dict[str, int] ) -> bool:
+        """Whether a recording is fully exported and unchanged since.
+
+        Args:
+            recording: Recording id (see `_recording_id`)
+            fingerprint: Current fingerprint of the recording's files
+
+        Returns:
+            True if the recording's latest entry matches `fingerprint` and
+            every shard holding its samples was finalized
+        """
+        entry = self.recordings.get( recording )
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return False
+        if entry['shards'] is None:
+            return True
+
+        first, last = entry['shards']
+        return all( i in self.shards
+                    for i in range( first, last + 1 ) )
+
+    def reserve_indices( self, n: int ) -> int:
+        """Reserve a block of recording indices for an export run.
+
+        Args:
+            n: Number of indices to reserve
+
+        Returns:
+            First index of the reserved block
+        """
+        first = self._next_index
+        self._next_index += n
+        self._append( {
+            'type': 'run',
+            'first_index': first,
+            'n_recordings': n,
+        } )
+        return first
+
+    def describe_recording( self, entry: dict[str, Any] ) -> None:
+        """Register a recording's description for the indices of its shards.
+
+        Call before writing the recording's samples, so that every shard
+        holding them can include the description.
+
+        Args:
+            entry: JSON-serializable description, with the recording key
+                (as used for `__recording__` on samples) under 'recording'
+        """
+        self._descriptions[entry['recording']] = entry
+
+    def record_shard( self, index: int, path: _Pathable,
+                samples: Sequence[ShardSample] = (),
+            ) -> None:
+        """Record that a shard has been finalized on disk.
+
+        Writes the shard's own index and its lines of the sample index
+        first, so that a recorded shard is always fully indexed.
+
+        Args:
+            index: Shard index
+            path: Shard file path
+            samples: Locations of the samples in the shard
+        """
+        samples = [ x for x in samples
+                    if x.recording not in self._dropped ]
+        recordings = { x.recording: self._descriptions[x.recording]
+                       for x in samples
+                       if x.recording in self._descriptions }
+        _write_shard_index( path, index, samples, recordings )
+
+        if self._index_f is not None:
+            self._index_f.writelines( f'{x.key}\t{index}\t{x.offset}\t{x.length}\n'
+                                      for x in samples )
+            self._index_f.flush()
+            os.fsync( self._index_f.fileno() )
+
+        path = Path( path ).as_posix()
+        self.shards[index] = path
+        self._append( {
+            'type': 'shard',
+            'shard': index,
+            'path': path,
+        } )
+
+    def drop_recording( self, recording: str, first_shard: int ) -> None:
+        """Drop the samples of a recording from the indices.
+
+        Use when a recording's export fails or is interrupted after some of
+        its samples may have been written, or when a resumed export writes
+        it again. The samples stay in their shards, but are removed from the
+        indices of the shards finalized since it started (and from the
+        sample index), and are left out of those of shards finalized from
+        now on.
+
+        Args:
+            recording: Key of the recording (as used for `__recording__` on
+                samples; see `describe_recording`)
+            first_shard: Index of the shard that was open (or next to be
+                opened) when its first sample was written
+        """
+        self._dropped.add( recording )
+
+        keys: set[str] = set()
+        for i, cur_path in self.shards.items():
+            if i >= first_shard:
+                keys.update( _drop_from_shard_index( cur_path, recording ) )
+
+        if self.index_path is not None and self._index_f is not None and len( keys ) > 0:
+            self._index_f.close()
+            self._filter_index( lambda fields: fields[0] not in keys )
+            self._index_f = open( self.index_path, 'a' )
+
+        self._append( {
+            'type': 'dropped',
+            'recording': recording,
+            'first_shard': first_shard,
+        } )
+
+    def record_recording( self, recording: str,
+                fingerprint: dict[str, int],
+                shards: Optional[tuple[int, int]],
+                keys: list[str],
+                **extra: Any,
+            ) -> None:
+        """Record that all samples of a recording have been written.
+
+        Args:
+            recording: Recording id (see `_recording_id`)
+            fingerprint: Fingerprint of the recording's files at export time
+            shards: First and last index of the shards holding its samples
+                (None if it produced no samples)
+            keys: Keys of its samples, in write order
+            **extra: Additional JSON-serializable fields for the entry
+        """
+        entry = {
+            'type': 'recording',
+            'recording': recording,
+            'fingerprint': fingerprint,
+            'shards': None if shards is None else list( shards ),
+            'keys': keys,
+            **extra,
+        }
+        self.recordings[recording] = entry
+        self._append( entry )
+
+    def record_duplicate( self, recording: str,
+                fingerprint: dict[str, int],
+                duplicate_of: str,
+                digest: str,
+            ) -> None:
+        """Record that a recording was skipped as a duplicate of another.
+
+        Duplicates are not considered exported by `is_current`, so a resumed
+        export checks them again.
+
+        Args:
+            recording: Recording id (see `_recording_id`)
+            fingerprint: Fingerprint of the recording's files
+            duplicate_of: Recording id of the exported recording it duplicates
+            digest: Content digest shared by both
+        """
+        entry = {
+            'type': 'duplicate',
+            'recording': recording,
+            'fingerprint': fingerprint,
+            'duplicate_of': duplicate_of,
+            'digest': digest,
+        }
+        self.duplicates[recording] = entry
+        self._append( entry )
+
+    ##
+
+    def close( self ) -> None:
+        self._f.close()
+        if self._index_f is not None:
+            self._index_f.close()
+
+    def __enter__( self ) -> 'ExportManifest':
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ) -> None:
+        self.close()
+
+
+#
@@ -0,0 +1,383 @@
+"""Persistent cache of stack headers and collated OME metadata.
+
+Reading a recording's metadata means opening its TIFF files, reading the OME
+XML, and collating it, every time the recording is planned, estimated, or
+loaded. A `MetadataCache` keeps the results in an SQLite database instead,
+so that repeated plans, dry runs, and exports of the same archive skip that
+work for recordings that haven't changed.
+
+Entries are keyed by the absolute path of a stack file and by the options
+their content depends on. Each records the size and modification time of
+the stack file (see `_StackIdentity`) and, for a stack split across files,
+the layout of its frames along with the size and modification time of the
+other files in it; an entry any of whose files have changed since is
+ignored, and replaced when the stack is next read. Looking an entry up
+costs a `stat` per file of the stack, and never opens one.
+"""
+
+##
+# Imports
+
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from ._common import (
+    _Pathable,
+)
+from .schema import (
+    FrameMetadataTable,
+)
+
+from typing import (
+    Any,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+
+##
+# Constants
+
+# Bumped whenever the layout of the database or of its entries changes;
+# caches of any other version are cleared on opening
+_SCHEMA_VERSION = 2
+
+_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS headers (
+        path TEXT NOT NULL,
+        frame_pattern TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        files TEXT NOT NULL,
+        shape TEXT NOT NULL,
+        dtype TEXT NOT NULL,
+        frames TEXT,
+        PRIMARY KEY (path, frame_pattern)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS metadata (
+        path TEXT NOT NULL,
+        frame_pattern TEXT NOT NULL,
+        parser TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        files TEXT NOT NULL,
+        uuid TEXT,
+        metadata TEXT NOT NULL,
+        frames BLOB,
+        frames_present BLOB,
+        PRIMARY KEY (path, frame_pattern, parser)
+    )''',
+    'CREATE INDEX IF NOT EXISTS metadata_uuid ON metadata (uuid)',
+]
+
+_PRESENT_DTYPE = np.dtype( [ (k, np.bool_) for k in FrameMetadataTable.FIELDS ] )
+
+
+##
+# File identity
+
+class _StackIdentity( NamedTuple ):
+    """What a cache entry's validity depends on, besides the other files of a split stack."""
+    path: str
+    """Absolute path of the stack file"""
+    size: int
+    """Size of the stack file in bytes"""
+    mtime_ns: int
+    """Modification time of the stack file"""
+
+def _stack_identity( stack_path: _Pathable ) -> _StackIdentity:
+    """Current identity of a stack file."""
+    stack_path = Path( os.path.abspath( stack_path ) )
+    st = os.stat( stack_path )
+    return _StackIdentity(
+        path = stack_path.as_posix(),
+        size = st.st_size,
+        mtime_ns = st.st_mtime_ns,
+    )
+
+def _layout_files( identity: _StackIdentity,
+            frames: Optional[Sequence[tuple[str, int]]],
+        ) -> list[list[Any]]:
+    """Name, size, and modification time of the files of a split stack other
+    than the stack file itself, in order (empty for a stack in a single
+    file).
+
+    Raises:
+        OSError: If one of the files is missing
+    """
+    if frames is None:
+        return []
+    stack_path = Path( identity.path )
+    ret = []
+    for name in dict.fromkeys( x for x, _ in frames ):
+        if name == stack_path.name:
+            continue
+        st = os.stat( stack_path.parent / name )
+        ret.append( [ name, st.st_size, st.st_mtime_ns ] )
+    return ret
+
+def _files_current( identity: _StackIdentity, files: str ) -> bool:
+    """Whether the other files of a stack, as stored with an entry, are unchanged."""
+    stack_path = Path( identity.path )
+    for name, size, mtime_ns in json.loads( files ):
+        try:
+            st = os.stat( stack_path.parent / name )
+        except OSError:
+            return False
+        if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+            return False
+    return True
+
+
+##
+# Cache
+
+class MetadataCache:
+    """On-disk cache of stack headers and collated OME metadata.
+
+    Look up an entry with the identity of the stack file taken *before*
+    reading it, and store what was read under that same identity, so that a
+    file changing mid-read is never cached as unchanged:
+
+        >>> cache = MetadataCache( 'metadata.sqlite' )
+        >>> identity = cache.identify( stack_path )
+        >>> header = cache.header( identity, '*.ome.tif*' )
+        >>> if header is None:
+        ...     header = _stack_header( stack_path )
+        ...     cache.put_header( identity, '*.ome.tif*', *header )
+
+    An entry records the layout of a stack split across files, so a hit
+    gives everything needed to read its frames without opening its files
+    first (see `toile.tiff_import._StackHeader`).
+
+    Each thread uses its own connection to the database, and caches pickle
+    as their path, so a cache can be shared by threads and worker processes
+    alike; concurrent writers wait for one another.
+
+    Attributes:
+        path: Location of the SQLite database
+    """
+
+    def __init__( self, path: _Pathable ):
+        """Open a cache, creating it if needed.
+
+        Args:
+            path: Location of the SQLite database
+        """
+        self.path = Path( path )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+
+        # Create (or clear) the schema up front
+        self._connection()
+
+    def __getstate__( self ) -> dict[str, Any]:
+        return { 'path': self.path }
+
+    def __setstate__( self, state: dict[str, Any] ) -> None:
+        self.__init__( state['path'] )
+
+    def _connection( self ) -> sqlite3.Connection:
+        """This thread's connection to the database."""
+        conn = getattr( self._local, 'conn', None )
+        if conn is not None:
+            return conn
+
+        conn = sqlite3.connect( self.path, timeout = 60., check_same_thread = False )
+        conn.execute( 'PRAGMA journal_mode = WAL' )
+        with conn:
+            version = conn.execute( 'PRAGMA user_version' ).fetchone()[0]
+            if version != _SCHEMA_VERSION:
+                conn.execute( 'DROP TABLE IF EXISTS headers' )
+                conn.execute( 'DROP TABLE IF EXISTS metadata' )
+            for statement in _SCHEMA:
+                conn.execute( statement )
+            conn.execute( f'PRAGMA user_version = {_SCHEMA_VERSION}' )
+
+        self._local.conn = conn
+        with self._lock:
+            self._connections.append( conn )
+        return conn
+
+    ##
+
+    def identify( self, stack_path: _Pathable ) -> _StackIdentity:
+        """Current identity of a stack file, to look up and store its entries with."""
+        return _stack_identity( stack_path )
+
+    def header( self, identity: _StackIdentity,
+            frame_pattern: str,
+        ) -> Optional[tuple[tuple[int, ...], np.dtype, Optional[list[tuple[str, int]]]]]:
+        """Cached shape, dtype, and layout of a stack (see `toile.tiff_import._stack_header`).
+
+        Returns:
+            Shape, dtype, and frame locations (None for a stack in a single
+            file), or None if there is no entry for the stack's current
+            identity, or the other files of its layout have changed
+        """
+        row = self._connection().execute(
+            'SELECT shape, dtype, frames, files FROM headers WHERE path = ? AND frame_pattern = ?'
+            ' AND size = ? AND mtime_ns = ?',
+            (identity.path, frame_pattern, identity.size, identity.mtime_ns),
+        ).fetchone()
+        if row is None or not _files_current( identity, row[3] ):
+            return None
+        frames = None if row[2] is None else [ tuple( x ) for x in json.loads( row[2] ) ]
+        return tuple( json.loads( row[0] ) ), np.dtype( row[1] ), frames
+
+    def put_header( self, identity: _StackIdentity,
+            frame_pattern: str,
+            shape: tuple[int, ...],
+            dtype: np.dtype,
+            frames: Optional[Sequence[tuple[str, int]]] = None,
+        ) -> None:
+        """Store the shape, dtype, and layout of a stack, replacing any earlier entry."""
+        files = _layout_files( identity, frames )
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (identity.path, frame_pattern, identity.size, identity.mtime_ns, json.dumps( files ),
+                 json.dumps( [ int( x ) for x in shape ] ), np.dtype( dtype ).str,
+                 None if frames is None else json.dumps( [ [ x, int( i ) ] for x, i in frames ] )),
+            )
+
+    def metadata( self, identity: _StackIdentity,
+            frame_pattern: str,
+            parser: str,
+        ) -> Optional[dict[str, Any]]:
+        """Cached collated OME metadata of a stack (see `toile.tiff_import._read_ome_metadata`).
+
+        Returns:
+            Collated metadata, with per-frame metadata under 'frames' as a
+            `FrameMetadataTable`, or None if there is no entry for the
+            stack's current identity, or the other files of its layout have
+            changed
+        """
+        row = self._connection().execute(
+            'SELECT metadata, frames, frames_present, files FROM metadata'
+            ' WHERE path = ? AND frame_pattern = ? AND parser = ?'
+            ' AND size = ? AND mtime_ns = ?',
+            (identity.path, frame_pattern, parser, identity.size, identity.mtime_ns),
+        ).fetchone()
+        if row is None or not _files_current( identity, row[3] ):
+            return None
+
+        ret = json.loads( row[0] )
+        if row[1] is not None:
+            ret['frames'] = FrameMetadataTable(
+                np.frombuffer( row[1], dtype = FrameMetadataTable.DTYPE ).copy(),
+                np.frombuffer( row[2], dtype = _PRESENT_DTYPE ).copy(),
+            )
+        return ret
+
+    def put_metadata( self, identity: _StackIdentity,
+            frame_pattern: str,
+            parser: str,
+            metadata: dict[str, Any],
+            layout: Optional[Sequence[tuple[str, int]]] = None,
+        ) -> None:
+        """Store the collated OME metadata of a stack, replacing any earlier entry.
+
+        Args:
+            layout: Frame locations of a stack split across files (see
+                `put_header`), whose files the metadata was also read from
+        """
+        files = _layout_files( identity, layout )
+        metadata = dict( metadata )
+        frames = metadata.pop( 'frames', None )
+
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (identity.path, frame_pattern, parser, identity.size, identity.mtime_ns, json.dumps( files ),
+                 metadata.get( 'uuid' ),
+                 json.dumps( metadata, default = str ),
+                 None if frames is None else frames.data.tobytes(),
+                 None if frames is None else frames.present.tobytes()),
+            )
+
+    ##
+
+    def entries( self ) -> Iterator[dict[str, Any]]:
+        """Every metadata entry, with the matching header if there is one.
+
+        Yields:
+            Dicts with the stack's 'path', 'size', 'mtime_ns',
+            'frame_pattern', and 'parser', its 'shape' and 'dtype' (None if
+            not cached), 'uuid', 'n_frames', and collated movie-level
+            'metadata', ordered by path
+        """
+        rows = self._connection().execute(
+            'SELECT m.path, m.size, m.mtime_ns, m.frame_pattern, m.parser, h.shape, h.dtype,'
+            ' m.uuid, length( m.frames ), m.metadata'
+            ' FROM metadata m LEFT JOIN headers h ON h.path = m.path'
+            ' AND h.frame_pattern = m.frame_pattern AND h.size = m.size'
+            ' AND h.mtime_ns = m.mtime_ns'
+            ' ORDER BY m.path, m.frame_pattern, m.parser'
+        )
+        for row in rows:
+            yield {
+                'path': row[0],
+                'size': row[1],
+                'mtime_ns': row[2],
+                'frame_pattern': row[3],
+                'parser': row[4],
+                'shape': None if row[5] is None else json.loads( row[5] ),
+                'dtype': row[6],
+                'uuid': row[7],
+                'n_frames': None if row[8] is None else row[8] // FrameMetadataTable.DTYPE.itemsize,
+                'metadata': json.loads( row[9] ),
+            }
+
+    def prune( self ) -> int:
+        """Remove the entries of stacks any of whose files have changed or no longer exist.
+
+        Returns:
+            Number of entries removed
+        """
+        conn = self._connection()
+        stale = []
+        for table in ('headers', 'metadata'):
+            for path, size, mtime_ns, files in conn.execute(
+                f'SELECT DISTINCT path, size, mtime_ns, files FROM {table}'
+            ).fetchall():
+                try:
+                    current = _stack_identity( path )
+                except OSError:
+                    current = None
+                if current != (path, size, mtime_ns) or not _files_current( current, files ):
+                    stale.append( (table, path, size, mtime_ns, files) )
+
+        with conn:
+            for table, path, size, mtime_ns, files in stale:
+                conn.execute( f'DELETE FROM {table} WHERE path = ? AND size = ? AND mtime_ns = ? AND files = ?',
+                    (path, size, mtime_ns, files),
+                )
+        return len( stale )
+
+    ##
+
+    def close( self ) -> None:
+        """Close every connection to the database."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ):
+        self.close()
+
+
+#
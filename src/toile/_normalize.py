@@ -0,0 +1,277 @@
+"""Memory-efficient uint8 normalization of image stacks.
+
+Normalization is split into fitting (stack-wide statistics gathered in a
+streaming pass) and application (chunked, in-place conversion to uint8),
+so that converting a stack needs at most one output array plus a small,
+fixed-size working buffer.
+"""
+
+##
+# Imports
+
+import numpy as np
+
+from typing import (
+    Iterable,
+    Literal,
+    Optional,
+    TypeAlias,
+)
+from numpy.typing import (
+    NDArray,
+)
+
+
+##
+# Typing shortcuts
+
+NormalizationMode: TypeAlias = Literal[
+    'max',
+    'percentile',
+    'frame',
+]
+"""How intensities are mapped to uint8:
+
+- 'max': scale by the stack-wide maximum (0 maps to 0)
+- 'percentile': map the stack-wide low/high percentiles to 0/255, clipping
+- 'frame': scale each frame by its own maximum
+"""
+
+_NORMALIZATION_MODES = ('max', 'percentile', 'frame')
+
+# Number of elements per working chunk (~8MB of float64)
+_CHUNK_ELEMENTS = 1 << 20
+
+# Cap on values retained for percentiles of non-histogrammable dtypes
+_PERCENTILE_SAMPLE_SIZE = 1 << 20
+
+
+##
+# Helpers
+
+def _uses_lut( dtype: np.dtype ) -> bool:
+    """Whether `dtype` is small enough to normalize through a lookup table."""
+    return dtype.kind in 'ui' and dtype.itemsize <= 2
+
+def _lut_values( dtype: np.dtype ) -> NDArray:
+    """All values of a ≤16-bit integer dtype, ordered by their bit pattern."""
+    n_bits = 8 * dtype.itemsize
+    raw = np.arange( 1 << n_bits, dtype = f'u{dtype.itemsize}' )
+    return raw.view( dtype.newbyteorder( '=' ) )
+
+def _lut_indices( block: NDArray ) -> NDArray:
+    """View a ≤16-bit integer block as unsigned bit patterns indexing a LUT."""
+    dtype = block.dtype
+    if not dtype.isnative:
+        block = block.astype( dtype.newbyteorder( '=' ) )
+    return block.view( f'u{dtype.itemsize}' )
+
+def _frames_per_chunk( frame_shape: tuple[int, ...] ) -> int:
+    """Number of frames that fit in a single working chunk."""
+    return max( 1, _CHUNK_ELEMENTS // max( 1, int( np.prod( frame_shape ) ) ) )
+
+
+##
+# Fitting
+
+class _Uint8Normalizer:
+    """Maps image intensities to uint8 using parameters fitted on a stack.
+
+    Construct with `_fit_uint8_normalizer`, then call `apply` (or the
+    instance itself) on blocks of frames.
+
+    Attributes:
+        mode: Normalization mode (see `NormalizationMode`)
+        lo: Intensity mapped to 0 (stack-wide modes only)
+        hi: Intensity mapped to 255 (stack-wide modes only)
+    """
+
+    def __init__( self, mode: NormalizationMode,
+            lo: float = 0.,
+            hi: float = 0.,
+        ):
+        """Construct a normalizer; see `_fit_uint8_normalizer`."""
+        if mode not in _NORMALIZATION_MODES:
+            raise ValueError( f'Unrecognized normalization mode: {mode}' )
+
+        self.mode = mode
+        self.lo = lo
+        self.hi = hi
+        self._luts: dict[np.dtype, NDArray] = dict()
+
+    ##
+
+    def _scale_offset( self, lo: float, hi: float ) -> tuple[float, float]:
+        """Affine parameters for mapping `[lo, hi]` to `[0, 255]`."""
+        if hi <= lo:
+            return 0., 0.
+        if self.mode == 'percentile':
+            return 255. / (hi - lo), lo
+        # Matches the historical `floor( (255. / max) * x )` exactly
+        return 255. / hi, 0.
+
+    def _lut( self, dtype: np.dtype ) -> NDArray:
+        """Lookup table from bit patterns of `dtype` to uint8 values."""
+        dtype = dtype.newbyteorder( '=' )
+        if dtype not in self._luts:
+            values = _lut_values( dtype )
+            lut = np.empty( values.shape, dtype = np.uint8 )
+            self._convert( values, lut, self.lo, self.hi )
+            self._luts[dtype] = lut
+        return self._luts[dtype]
+
+    def _convert( self, block: NDArray, out: NDArray, lo: float, hi: float ) -> None:
+        """Convert `block` into `out` in chunks, using a bounded float buffer."""
+        scale, offset = self._scale_offset( lo, hi )
+        if scale == 0.:
+            out[...] = 0
+            return
+
+        flat_in = block.reshape( -1 )
+        flat_out = out.reshape( -1 )
+        buf = np.empty( min( flat_in.size, _CHUNK_ELEMENTS ), dtype = np.float64 )
+
+        for start in range( 0, flat_in.size, _CHUNK_ELEMENTS ):
+            stop = min( start + _CHUNK_ELEMENTS, flat_in.size )
+            cur = buf[:stop - start]
+
+            if offset != 0.:
+                np.subtract( flat_in[start:stop], offset, out = cur, casting = 'unsafe' )
+                np.multiply( cur, scale, out = cur )
+            else:
+                np.multiply( flat_in[start:stop], scale, out = cur, casting = 'unsafe' )
+            np.floor( cur, out = cur )
+            np.clip( cur, 0., 255., out = cur )
+            flat_out[start:stop] = cur
+
+    ##
+
+    def apply( self, block: NDArray, out: Optional[NDArray] = None ) -> NDArray:
+        """Normalize a block of frames with leading time axis to uint8.
+
+        Args:
+            block: Array of shape (time, ...) to normalize
+            out: Optional uint8 output array with the same shape as `block`
+
+        Returns:
+            The normalized uint8 array (`out`, if given)
+        """
+        if out is None:
+            out = np.empty( block.shape, dtype = np.uint8 )
+
+        if self.mode == 'frame':
+            for i in range( block.shape[0] ):
+                self._convert( block[i], out[i], 0., float( np.max( block[i] ) ) )
+            return out
+
+        if _uses_lut( block.dtype ):
+            lut = self._lut( block.dtype )
+            # Chunked so the index conversion inside `take` stays small
+            n_chunk = _frames_per_chunk( block.shape[1:] )
+            for start in range( 0, block.shape[0], n_chunk ):
+                stop = min( start + n_chunk, block.shape[0] )
+                np.take( lut, _lut_indices( block[start:stop] ), out = out[start:stop] )
+            return out
+
+        self._convert( block, out, self.lo, self.hi )
+        return out
+
+    def __call__( self, block: NDArray ) -> NDArray:
+        return self.apply( block )
+
+def _fit_uint8_normalizer(
+            blocks: Iterable[NDArray],
+            mode: NormalizationMode = 'max',
+            percentiles: tuple[float, float] = (0.1, 99.9),
+        ) -> _Uint8Normalizer:
+    """Fit uint8 normalization parameters in a single streaming pass.
+
+    For 'percentile' mode, ≤16-bit integer stacks use an exact histogram
+    accumulated over blocks; other dtypes use a strided subsample.
+
+    Args:
+        blocks: Blocks of frames covering the stack (e.g., the stack itself
+            as a single block, or `TiffFrameSource.iter_blocks()`)
+        mode: Normalization mode (see `NormalizationMode`)
+        percentiles: Low and high percentiles for 'percentile' mode
+
+    Returns:
+        Normalizer ready to apply to the same stack
+    """
+
+    if mode == 'frame':
+        return _Uint8Normalizer( mode )
+
+    if mode == 'max':
+        hi = None
+        for block in blocks:
+            if block.size == 0:
+                continue
+            cur_max = np.max( block )
+            hi = cur_max if hi is None else max( hi, cur_max )
+        return _Uint8Normalizer( mode, 0., 0. if hi is None else float( hi ) )
+
+    if mode != 'percentile':
+        raise ValueError( f'Unrecognized normalization mode: {mode}' )
+
+    hist: Optional[NDArray] = None
+    hist_dtype: Optional[np.dtype] = None
+    samples: list[NDArray] = []
+
+    for block in blocks:
+        if block.size == 0:
+            continue
+
+        if _uses_lut( block.dtype ):
+            hist_dtype = block.dtype.newbyteorder( '=' )
+            n_bins = 1 << (8 * block.dtype.itemsize)
+            n_chunk = _frames_per_chunk( block.shape[1:] )
+            for start in range( 0, block.shape[0], n_chunk ):
+                cur = np.bincount( _lut_indices( block[start:start + n_chunk] ).reshape( -1 ),
+                    minlength = n_bins,
+                )
+                hist = cur if hist is None else hist + cur
+
+        else:
+            flat = block.reshape( -1 )
+            stride = max( 1, flat.size // _PERCENTILE_SAMPLE_SIZE )
+            samples.append( np.asarray( flat[::stride], dtype = np.float64 ) )
+
+    if hist is not None:
+        assert hist_dtype is not None
+        values = _lut_values( hist_dtype ).astype( np.float64 )
+        order = np.argsort( values, kind = 'stable' )
+        cdf = np.cumsum( hist[order] )
+        targets = np.asarray( percentiles, dtype = np.float64 ) / 100. * (cdf[-1] - 1)
+        lo, hi = values[order][np.searchsorted( cdf, targets + 1 )]
+
+    elif len( samples ) > 0:
+        lo, hi = np.percentile( np.concatenate( samples ), percentiles )
+
+    else:
+        lo, hi = 0., 0.
+
+    return _Uint8Normalizer( mode, float( lo ), float( hi ) )
+
+def _normalize_uint8(
+            stack: NDArray,
+            mode: NormalizationMode = 'max',
+            percentiles: tuple[float, float] = (0.1, 99.9),
+        ) -> NDArray:
+    """Normalize a full in-memory stack to uint8.
+
+    Memory overhead is the uint8 output plus a fixed-size working buffer.
+
+    Args:
+        stack: Array of shape (time, ...) to normalize
+        mode: Normalization mode (see `NormalizationMode`)
+        percentiles: Low and high percentiles for 'percentile' mode
+
+    Returns:
+        uint8 array with the same shape as `stack`
+    """
+    normalizer = _fit_uint8_normalizer( [stack], mode, percentiles )
+    return normalizer.apply( stack )
+
+
+#
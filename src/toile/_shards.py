@@ -0,0 +1,637 @@
+"""Sharded WebDataset writing with streaming compression.
+
+Extends the `webdataset` shard writer so that each shard can be compressed
+as it is written (gzip, or zstd when `zstandard` is installed), with shard
+size limits measured in compressed bytes on disk.
+"""
+
+##
+# Imports
+
+import os
+import gzip
+import json
+import time
+import tarfile
+from pathlib import Path
+
+import webdataset as wds
+
+from ._common import (
+    _Pathable,
+)
+
+from typing import (
+    Any,
+    BinaryIO,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypeAlias,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+##
+# Typing shortcuts
+
+ShardCompression: TypeAlias = Literal[
+    'gzip',
+    'zstd',
+]
+
+_SHARD_EXTENSIONS: dict[ShardCompression | None, str] = {
+    None: '.tar',
+    'gzip': '.tar.gz',
+    'zstd': '.tar.zst',
+}
+
+_SHARD_INDEX_EXTENSION = '.index.json'
+
+class ShardSample( NamedTuple ):
+    """Location of a sample written to a shard.
+
+    Offsets are measured in the shard's uncompressed tar stream, which for
+    uncompressed shards is the file itself.
+    """
+    key: str
+    """Sample key"""
+    offset: int
+    """Byte offset of the sample's first tar header"""
+    length: int
+    """Byte length of all of the sample's members, headers and padding included"""
+    members: dict[str, tuple[int, int]]
+    """Byte offset and size of each member's data, by extension (e.g., 'msgpack')"""
+    recording: Optional[str] = None
+    """Key of the recording the sample belongs to, if given as `__recording__`"""
+
+
+##
+# Helpers
+
+def shard_compression( path: _Pathable ) -> ShardCompression | None:
+    """Compression of a shard, judging by its file extension.
+
+    Args:
+        path: Shard file path
+
+    Returns:
+        Shard compression codec, or None for plain tar
+    """
+    name = Path( path ).name
+    for cur_compression, cur_ext in _SHARD_EXTENSIONS.items():
+        if cur_compression is not None and name.endswith( cur_ext ):
+            return cur_compression
+    if name.endswith( _SHARD_EXTENSIONS[None] ):
+        return None
+    raise ValueError( f'Not a shard: {name}' )
+
+def _shard_index_path( path: _Pathable ) -> Path:
+    """Path of the index written alongside a shard."""
+    path = Path( path )
+    ext = shard_extension( shard_compression( path ) )
+    return path.with_name( path.name[:-len( ext )] + _SHARD_INDEX_EXTENSION )
+
+def shard_extension( compression: ShardCompression | None = None ) -> str:
+    """File extension for shards written with the given compression.
+
+    Args:
+        compression: Shard compression codec, or None for plain tar
+
+    Returns:
+        Extension including the leading dot (e.g., '.tar.zst')
+    """
+    if compression not in _SHARD_EXTENSIONS:
+        raise ValueError( f'Unrecognized shard compression: {compression}' )
+    return _SHARD_EXTENSIONS[compression]
+
+def _member_buffers( data: Any ) -> list[memoryview]:
+    """Flat byte views of a member's data, which is a bytes-like object (or
+    str), or a tuple of bytes-like objects to be written back to back."""
+    if isinstance( data, str ):
+        data = data.encode( 'utf-8' )
+    if not isinstance( data, tuple ):
+        data = (data,)
+    return [ memoryview( x ).cast( 'B' ) for x in data ]
+
+class _TarStream:
+    """Uncompressed tar archive written member by member to a file.
+
+    Produces the same archive as `tarfile` in stream mode ('w|'), as used by
+    `webdataset.TarWriter`, but writes each member's data to `fileobj`
+    straight from the caller's buffers: `tarfile` would funnel it through an
+    internal bytes buffer, copying every byte (repeatedly, for large writes)
+    on its way to the file. Headers are built with `TarInfo.tobuf`.
+
+    Attributes:
+        fileobj: Destination of the archive's bytes
+        offset: Bytes of the archive written so far
+    """
+
+    def __init__( self, fileobj: BinaryIO | Any,
+            user: str = 'bigdata',
+            group: str = 'bigdata',
+            mode: int = 0o0444,
+            mtime: Optional[float] = None,
+            format: Any = None,
+            **kwargs
+        ):
+        """Start an archive.
+
+        Args:
+            fileobj: Destination of the archive's bytes; not closed with the archive
+            user: Owner user name of members
+            group: Owner group name of members
+            mode: Permissions of members
+            mtime: Modification time of members (the time each is written if None)
+            format: Tar format, or the name of one in `tarfile` (default:
+                `tarfile`'s, PAX, which `webdataset.TarWriter` writes whatever
+                its `format`)
+            **kwargs: Other options of `webdataset.TarWriter`, which don't
+                apply to members written as bytes
+        """
+        self.fileobj = fileobj
+        self.offset = 0
+
+        self.user = user
+        self.group = group
+        self.mode = mode
+        self.mtime = mtime
+        self.format = getattr( tarfile, format, format ) if format else tarfile.DEFAULT_FORMAT
+
+    def _write( self, b: bytes | memoryview ) -> None:
+        self.fileobj.write( b )
+        self.offset += memoryview( b ).nbytes
+
+    def add( self, name: str, buffers: Sequence[memoryview] ) -> int:
+        """Write a member whose data is `buffers`, back to back.
+
+        Returns:
+            Offset of the member's data in the archive
+        """
+        size = sum( x.nbytes for x in buffers )
+
+        info = tarfile.TarInfo( name )
+        info.size = size
+        info.mtime = self.mtime if self.mtime is not None else time.time()
+        info.mode = self.mode
+        info.uname = self.user
+        info.gname = self.group
+        self._write( info.tobuf( self.format, tarfile.ENCODING, 'surrogateescape' ) )
+
+        ret = self.offset
+        for cur_buffer in buffers:
+            self._write( cur_buffer )
+        padding = -size % tarfile.BLOCKSIZE
+        if padding > 0:
+            self._write( tarfile.NUL * padding )
+        return ret
+
+    def close( self ) -> None:
+        """End the archive, padding it to a whole record as `tarfile` does."""
+        self._write( tarfile.NUL * ( 2 * tarfile.BLOCKSIZE ) )
+        remainder = self.offset % tarfile.RECORDSIZE
+        if remainder > 0:
+            self._write( tarfile.NUL * ( tarfile.RECORDSIZE - remainder ) )
+
+class _CountingFile:
+    """Write-only stream wrapper that counts the bytes passing through it."""
+
+    def __init__( self, f: BinaryIO | Any ):
+        self._f = f
+        self.nbytes = 0
+
+    def write( self, b ) -> int:
+        n = self._f.write( b )
+        if n is None:
+            n = memoryview( b ).nbytes
+        self.nbytes += n
+        return n
+
+    def flush( self ) -> None:
+        self._f.flush()
+
+    def close( self ) -> None:
+        self._f.close()
+
+def _open_compressor( raw: _CountingFile,
+            compression: ShardCompression,
+            level: Optional[int] = None,
+            threads: int = 0,
+        ) -> Any:
+    """Wrap `raw` in a streaming compressor that does not close it.
+
+    Args:
+        raw: Destination for compressed bytes
+        compression: Codec to use
+        level: Compression level (codec default if None)
+        threads: Compression threads (zstd only; 0 for single-threaded)
+
+    Returns:
+        A writable binary stream; closing it finalizes the compressed data
+    """
+
+    if compression == 'gzip':
+        return gzip.GzipFile(
+            fileobj = raw,
+            mode = 'wb',
+            compresslevel = 6 if level is None else level,
+            mtime = 0,
+        )
+
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError( 'zstd shard compression requires `zstandard` (pip install toile[zstd])' )
+
+        compressor = zstandard.ZstdCompressor(
+            level = 3 if level is None else level,
+            threads = threads,
+        )
+        return compressor.stream_writer( raw, closefd = False )
+
+    raise ValueError( f'Unrecognized shard compression: {compression}' )
+
+
+##
+# Writer
+
+class ShardWriter( wds.writer.ShardWriter ):
+    """WebDataset shard writer with optional streaming compression.
+
+    Samples are compressed as they are written, so no second pass over the
+    data is needed. With compression enabled, `maxsize` applies to the
+    compressed bytes on disk: once the shard could reach the limit, the
+    compressor is flushed after each sample so that the size is exact, and
+    (as for uncompressed shards) a shard exceeds `maxsize` by at most its
+    final sample.
+
+    Shards can instead be closed at planned sample counts (`shard_counts`;
+    see `toile._balance`), so that their sizes are balanced.
+
+    The first shard is opened by the first write, so a writer that writes
+    nothing leaves no files behind. If the writer's context exits on an
+    exception, the shard being written is abandoned (see `abandon`) rather
+    than finalized.
+
+    Attributes:
+        compression: Shard compression codec, or None for plain tar
+        compression_level: Codec compression level (codec default if None)
+        compression_threads: Worker threads for zstd compression (0 for none)
+        current_shard: Index of the shard currently being written
+        samples: Locations of the samples written to the current shard
+    """
+
+    def __init__( self, pattern: str,
+            maxcount: int = 100_000,
+            maxsize: float = 3e9,
+            #
+            compression: ShardCompression | None = None,
+            compression_level: Optional[int] = None,
+            compression_threads: int = 0,
+            shard_counts: Optional[Sequence[int]] = None,
+            #
+            **kwargs
+        ):
+        """Create a new shard writer.
+
+        Args:
+            pattern: Output filename pattern with a `%d`-style shard placeholder
+            maxcount: Maximum number of samples per shard
+            maxsize: Maximum size in bytes per shard (compressed, if enabled)
+            compression: Shard compression codec ('gzip' or 'zstd'), or None
+            compression_level: Codec compression level (codec default if None)
+            compression_threads: Worker threads for zstd compression
+            shard_counts: Planned number of samples in each shard, in order.
+                Shards then roll over at these counts, not at `maxcount` or
+                `maxsize`; those apply again once the plan is used up
+            **kwargs: Additional arguments passed to `webdataset.ShardWriter`
+        """
+        if compression is not None:
+            # Validate up front, before any file is opened
+            shard_extension( compression )
+
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threads = compression_threads
+        self.shard_counts = list( shard_counts ) if shard_counts is not None else []
+        self._first_shard: Optional[int] = None
+
+        self._raw: Optional[_CountingFile] = None
+        self._compressor: Any = None
+        self._uncompressed: Optional[_CountingFile] = None
+        self._flushed_at = 0
+        self.current_shard: Optional[int] = None
+        self.samples: list[ShardSample] = []
+
+        # `webdataset.ShardWriter` opens its first shard right away; leave
+        # that to the first write instead
+        self._started = False
+        super().__init__( pattern,
+            maxcount = maxcount,
+            maxsize = maxsize,
+            **kwargs
+        )
+        self._started = True
+
+    ##
+
+    def next_stream( self ) -> None:
+        """Close the current shard and open the next one."""
+        if not self._started:
+            return
+        self.finish()
+        self.fname = self.pattern % self.shard
+        self.current_shard = self.shard
+        if self._first_shard is None:
+            self._first_shard = self.shard
+        if self.verbose:
+            print(
+                "# writing",
+                self.fname,
+                self.count,
+                "%.1f GB" % (self.size / 1e9),
+                self.total,
+            )
+        self.shard += 1
+
+        if self.opener:
+            raw_stream = self.opener( self.fname )
+        else:
+            raw_stream = open( self.fname, 'wb' )
+        self._raw = _CountingFile( raw_stream )
+
+        if self.compression is not None:
+            self._compressor = _open_compressor( self._raw,
+                self.compression,
+                self.compression_level,
+                self.compression_threads,
+            )
+            self._uncompressed = _CountingFile( self._compressor )
+            stream = self._uncompressed
+        else:
+            self._compressor = None
+            self._uncompressed = None
+            stream = self._raw
+        self._flushed_at = 0
+
+        self.tarstream = _TarStream( stream, **self.kw )
+        self.count = 0
+        self.size = 0
+        self.samples = []
+
+    def _is_full( self ) -> bool:
+        """Whether the current shard has reached its planned count or limits."""
+        assert self.current_shard is not None and self._first_shard is not None
+        i_planned = self.current_shard - self._first_shard
+        if i_planned < len( self.shard_counts ):
+            return self.count >= self.shard_counts[i_planned]
+        return self.count >= self.maxcount or self.size >= self.maxsize
+
+    def _write_members( self, obj: dict[str, Any] ) -> tuple[int, dict[str, tuple[int, int]]]:
+        """Write the members of a sample to the current shard's tar stream.
+
+        Produces the same archive as `webdataset.TarWriter.write` (members in
+        sorted order, metadata keys starting with '_' skipped), but writes
+        each member's data directly from the caller's buffers (see
+        `_TarStream`).
+
+        Returns:
+            Bytes of member data written, and the offset and size of each
+            member's data in the tar stream, by extension
+        """
+        assert self.tarstream is not None
+        key = obj['__key__']
+
+        total = 0
+        members = dict()
+        for k in sorted( obj ):
+            if k.startswith( '_' ):
+                continue
+
+            buffers = _member_buffers( obj[k] )
+            size = sum( x.nbytes for x in buffers )
+            members[k] = (self.tarstream.add( f'{key}.{k}', buffers ), size)
+            total += size
+
+        return total, members
+
+    def write( self, obj: dict[str, Any] ) -> None:
+        """Write a sample, starting a new shard first if limits are reached.
+
+        Member data can be any bytes-like object, or a tuple of them to be
+        written back to back as one member; either way it is written to the
+        shard without intermediate copies (see `_TarStream`).
+
+        Large samples can be written in pieces: a dict with `__append__` set
+        adds its members to the previous sample (which must have the same
+        key), and never starts a new shard, so the sample stays contiguous.
+
+        Args:
+            obj: Sample to be written; an optional `__recording__` string is
+                recorded in `samples` but not written
+        """
+        append = bool( obj.get( '__append__', False ) )
+        if append:
+            obj = { k: v for k, v in obj.items()
+                    if k != '__append__' }
+            if self.tarstream is None or len( self.samples ) == 0 or self.samples[-1].key != obj['__key__']:
+                raise ValueError( f'Nothing to append to for sample {obj["__key__"]}' )
+
+        # Roll over here (as `super().write` would) so that the offset is
+        # taken in the shard the sample actually lands in
+        elif self.tarstream is None or self._is_full():
+            self.next_stream()
+        assert self.tarstream is not None
+
+        tar = self.tarstream
+        offset = tar.offset
+
+        written, members = self._write_members( obj )
+        self.size += written
+        if not append:
+            self.count += 1
+            self.total += 1
+
+        if append:
+            prev = self.samples[-1]
+            self.samples[-1] = prev._replace(
+                length = tar.offset - prev.offset,
+                members = { **prev.members, **members },
+            )
+        else:
+            self.samples.append( ShardSample(
+                key = obj['__key__'],
+                offset = offset,
+                length = tar.offset - offset,
+                members = members,
+                recording = obj.get( '__recording__' ),
+            ) )
+
+        if self.compression is not None:
+            assert self._raw is not None and self._uncompressed is not None
+
+            # Bytes still buffered inside the compressor are bounded by the
+            # uncompressed bytes fed since the last flush; flush once those
+            # could push the shard over its limit
+            pending = self._uncompressed.nbytes - self._flushed_at
+            if self._raw.nbytes + pending >= self.maxsize:
+                self._compressor.flush()
+                self._flushed_at = self._uncompressed.nbytes
+
+            # Limit shards by what has actually landed on disk
+            self.size = self._raw.nbytes
+
+    def _close_shard( self ) -> None:
+        """Close the files of the current shard."""
+        if self._compressor is not None:
+            self._compressor.close()
+            self._compressor = None
+            self._uncompressed = None
+        if self._raw is not None:
+            self._raw.close()
+            self._raw = None
+        self.tarstream = None
+
+    def finish( self ) -> None:
+        """Finalize the current shard, if any (use close instead)."""
+        if self.tarstream is None:
+            return
+
+        self.tarstream.close()
+        self._close_shard()
+
+        assert self.fname is not None
+        if callable( self.post ):
+            self.post( self.fname )
+
+    def abandon( self ) -> None:
+        """Close the current shard, if any, without finalizing it.
+
+        The shard's archive is left unterminated and `post` is not called
+        for it, so it isn't recorded as complete (for instance, resumed
+        exports delete it).
+        """
+        if self.tarstream is None:
+            return
+        self._close_shard()
+
+    def __exit__( self, exc_type, exc_val, exc_tb ) -> None:
+        if exc_type is not None:
+            self.abandon()
+        self.close()
+
+def _remove_shards_from( output_dir: _Pathable, stem: str, start: int ) -> list[Path]:
+    """Delete the shards of an export from index `start` onwards.
+
+    Used when resuming an export to clear out shards that were never
+    finalized. Shards of any compression are matched, as are shard indices.
+
+    Args:
+        output_dir: Directory the shards were written to
+        stem: Stem of the shard filenames
+        start: Index of the first shard to delete
+
+    Returns:
+        Paths of the deleted shards
+    """
+    removed = []
+    for cur_ext in (*_SHARD_EXTENSIONS.values(), _SHARD_INDEX_EXTENSION):
+        for cur_path in Path( output_dir ).glob( f'{stem}-[0-9]*{cur_ext}' ):
+            cur_index = cur_path.name[len( stem ) + 1:-len( cur_ext )]
+            if cur_index.isdigit() and int( cur_index ) >= start:
+                cur_path.unlink()
+                removed.append( cur_path )
+
+    return removed
+
+def _write_shard_index( path: _Pathable,
+            index: int,
+            samples: Sequence[ShardSample],
+            recordings: Optional[dict[str, Any]] = None,
+        ) -> Path:
+    """Write the index for a finalized shard alongside it.
+
+    The index is a JSON object with the shard's file name and index, its
+    samples (key, offset, length, recording, and member offsets and sizes,
+    as in `ShardSample`), and a description of each recording with samples
+    in the shard, by recording key.
+
+    Args:
+        path: Shard file path
+        index: Shard index
+        samples: Locations of the samples in the shard
+        recordings: Descriptions of the recordings in the shard, by key
+
+    Returns:
+        Path of the written index
+    """
+    index_path = _shard_index_path( path )
+    with open( index_path, 'w' ) as f:
+        json.dump( {
+                'shard': Path( path ).name,
+                'index': index,
+                'samples': [ x._asdict() for x in samples ],
+                'recordings': dict() if recordings is None else recordings,
+            }, f,
+            separators = (',', ':'),
+            default = str,
+        )
+
+    return index_path
+
+def _drop_from_shard_index( path: _Pathable, recording: str ) -> list[str]:
+    """Remove a recording's samples from the index of a finalized shard.
+
+    The samples themselves stay in the shard, but readers of the index
+    (see `toile.reader.ShardReader`) no longer see them.
+
+    Args:
+        path: Shard file path
+        recording: Key of the recording whose samples to remove
+
+    Returns:
+        Keys of the removed samples
+    """
+    index_path = _shard_index_path( path )
+    with open( index_path, 'r' ) as f:
+        index = json.load( f )
+
+    samples = [ x for x in index['samples'] if x['recording'] != recording ]
+    ret = [ x['key'] for x in index['samples'] if x['recording'] == recording ]
+    if len( ret ) == 0:
+        return ret
+
+    index['samples'] = samples
+    index['recordings'].pop( recording, None )
+    tmp_path = index_path.with_name( index_path.name + '.tmp' )
+    with open( tmp_path, 'w' ) as f:
+        json.dump( index, f,
+            separators = (',', ':'),
+            default = str,
+        )
+    os.replace( tmp_path, index_path )
+
+    return ret
+
+def _shard_pattern( output_dir: _Pathable, stem: str,
+            compression: ShardCompression | None = None,
+        ) -> str:
+    """Build the `%06d` shard filename pattern for an export.
+
+    Args:
+        output_dir: Directory to write shards to
+        stem: Stem for shard filenames
+        compression: Shard compression codec, or None for plain tar
+
+    Returns:
+        Pattern suitable for `ShardWriter`
+    """
+    return (Path( output_dir ) / f'{stem}-%06d{shard_extension( compression )}').as_posix()
+
+
+#
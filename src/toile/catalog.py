@@ -0,0 +1,316 @@
+"""
+Catalogs of recordings, for selecting what to export.
+
+`build_catalog` (`toile catalog build`) scans the recordings matching some
+inputs, reading only their TIFF headers, OME metadata, and filenames, and
+writes one row per recording to an SQLite table (see `toile._catalog`).
+Recordings can then be selected by their metadata with an SQL expression,
+with `select_recordings` (`toile catalog query`), or by giving an export
+config a `catalog` and a `where` expression in place of its raw globs.
+"""
+
+##
+# Imports
+
+import json
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from typer import Typer
+
+from ._common import (
+    _Pathable,
+)
+from ._catalog import (
+    _write_catalog,
+    query_catalog,
+    select_recordings,
+)
+from ._metadata_cache import (
+    MetadataCache,
+)
+from .export import (
+    _standardize_config_args,
+)
+from .plan import (
+    PlannedRecording,
+    plan_export,
+)
+from .tiff_import import (
+    _FilenameParser,
+    MetadataParser,
+    _StackHeader,
+    _inspect_stack,
+    _read_ome_metadata,
+)
+
+from typing import (
+    Any,
+    Optional,
+    Sequence,
+    get_args,
+)
+
+
+##
+# Building
+
+def _parse_filenames( filename_parser: _FilenameParser,
+            filenames: list[str],
+        ) -> list[dict[str, Any] | Exception]:
+    """Parse filenames in one batch where the parser supports it (see
+    `toile.tiff_import._TemplateFilenameParser.parse_many`), and one by one
+    otherwise, or to find which ones fail."""
+    parse_many = getattr( filename_parser, 'parse_many', None )
+    if parse_many is not None:
+        try:
+            return parse_many( filenames )
+        except Exception:
+            pass
+
+    ret = []
+    for x in filenames:
+        try:
+            ret.append( filename_parser( x ) )
+        except Exception as e:
+            ret.append( e )
+    return ret
+
+def _catalog_recording( recording: PlannedRecording,
+            filename_metadata: dict[str, Any] | Exception | None,
+            frame_pattern: str,
+            metadata_parser: MetadataParser,
+            metadata_cache: Optional[MetadataCache],
+        ) -> dict[str, Any]:
+    """Catalog row of a planned recording, reading its TIFF header and OME
+    metadata in a single pass over its stack file (see `_inspect_stack`)."""
+    ret: dict[str, Any] = dict(
+        path = recording.path,
+        stack_path = recording.stack_path,
+        channel_paths = recording.channel_paths,
+        n_channels = len( recording.channel_paths ),
+        file_nbytes = recording.file_nbytes,
+    )
+    if recording.error is not None:
+        ret['error'] = recording.error
+        return ret
+
+    # Looked up before reading anything, as `load_tiff` would
+    header = None
+    image_metadata = None
+    if metadata_cache is not None:
+        identity = metadata_cache.identify( recording.stack_path )
+        header = metadata_cache.header( identity, frame_pattern )
+        image_metadata = metadata_cache.metadata( identity, frame_pattern, metadata_parser )
+
+    inspected = None
+    if header is None or image_metadata is None:
+        try:
+            inspected = _inspect_stack( Path( recording.stack_path ), frame_pattern )
+        except Exception as e:
+            ret['error'] = f'Unreadable stack header: {e}'
+            return ret
+        header = inspected.header
+        if metadata_cache is not None:
+            metadata_cache.put_header( identity, frame_pattern, *header )
+    header = _StackHeader( *header )
+
+    ret['shape'] = list( header.shape )
+    ret['dtype'] = header.dtype.str
+    ret['nbytes'] = int( np.prod( header.shape ) ) * header.dtype.itemsize
+    ret['n_frames'] = header.shape[0]
+    ret['height'], ret['width'] = header.shape[-2:]
+
+    if isinstance( filename_metadata, Exception ):
+        ret['error'] = f'Unparseable filename: {filename_metadata}'
+        return ret
+
+    if image_metadata is None:
+        try:
+            image_metadata = _read_ome_metadata( inspected.ome_metadata, metadata_parser )
+        except Exception as e:
+            ret['error'] = f'Unreadable OME metadata: {e}'
+            return ret
+        if metadata_cache is not None:
+            metadata_cache.put_metadata( identity, frame_pattern, metadata_parser, image_metadata,
+                header.frames,
+            )
+
+    # Movie-level metadata, as `load_tiff` combines it
+    ret['metadata'] = dict( **filename_metadata, **image_metadata )
+    ret['metadata'].pop( 'frames', None )
+
+    return ret
+
+def build_catalog( inputs: Sequence[_Pathable],
+            catalog: _Pathable,
+            frame_pattern_full: str = '*_*0001.ome.tif*',
+            frame_pattern: str = '*.ome.tif*',
+            filename_parser: Optional[_FilenameParser] = None,
+            metadata_parser: MetadataParser = 'fast',
+            metadata_cache: Optional[MetadataCache | _Pathable] = None,
+            threads: int = 16,
+        ) -> list[dict[str, Any]]:
+    """Catalog every recording matching `inputs`, without reading pixel data.
+
+    Recordings are discovered as for an export (see `toile.plan.plan_export`),
+    and for each, the TIFF header and OME metadata of its (first channel's)
+    stack file are read concurrently, in one pass over the file, and its
+    filename is parsed. The
+    catalog gets a row per recording, with a column per metadata field, and
+    replaces any catalog already at `catalog`. Recordings that can't be read
+    are listed with their `error` set.
+
+    Args:
+        inputs: Recording directories or glob patterns matching them (as
+            for `export_tiffs`)
+        catalog: Location of the SQLite database to write
+        frame_pattern_full: Glob pattern for full stack files (as for `load_tiff`)
+        frame_pattern: Glob pattern for the files of a split stack (as for `load_tiff`)
+        filename_parser: Function extracting metadata from stack filenames
+            (as for `load_tiff`); by default, only the filename is recorded
+        metadata_parser: OME-XML parser (as for `load_tiff`)
+        metadata_cache: Cache of stack headers and OME metadata to consult
+            and update, or the location of its database (see
+            `toile.metadata.MetadataCache`)
+        threads: Number of threads listing directories and reading files
+
+    Returns:
+        Rows of the catalog, in export order, with movie-level metadata as
+        a dict under 'metadata'
+    """
+    if metadata_parser not in get_args( MetadataParser ):
+        raise ValueError( f'Unrecognized metadata parser: {metadata_parser}' )
+    if metadata_cache is not None and not isinstance( metadata_cache, MetadataCache ):
+        metadata_cache = MetadataCache( metadata_cache )
+    if filename_parser is None:
+        # As in `load_tiff`
+        filename_parser = lambda x: dict( filename = x )
+
+    # Headers are read along with the OME metadata, below
+    plan = plan_export( inputs,
+        frame_pattern_full = frame_pattern_full,
+        frame_pattern = frame_pattern,
+        read_headers = False,
+        threads = threads,
+    )
+
+    # Filenames are parsed up front, in one batch
+    parseable = [ x for x in plan.recordings
+                  if x.stack_path is not None ]
+    parsed = dict( zip(
+        [ x.path for x in parseable ],
+        _parse_filenames( filename_parser, [ Path( x.stack_path ).name for x in parseable ] ),
+    ) )
+
+    with ThreadPoolExecutor( max_workers = max( 1, threads ) ) as pool:
+        rows = list( pool.map(
+            lambda x: _catalog_recording( x, parsed.get( x.path ), frame_pattern, metadata_parser, metadata_cache ),
+            plan.recordings,
+        ) )
+
+    _write_catalog( catalog, rows )
+    return rows
+
+
+##
+# Typer app
+
+app = Typer()
+
+@app.command( 'build' )
+def _cli_catalog_build(
+            input: Path,
+            catalog: Path,
+            metadata_parser: str = 'fast',
+            metadata_cache: Optional[str] = None,
+            threads: int = 16,
+            verbose: bool = False,
+        ):
+    """CLI command: Catalog recordings by their metadata, without reading pixels.
+
+    Discovers recordings as `toile export plan` does, and reads the TIFF
+    header and OME metadata of each concurrently, along with the fields the
+    config's `filename_spec` parses from its filename. Writes one row per
+    recording to an SQLite table, with a column per metadata field, to
+    select recordings from with `toile catalog query` or an export config's
+    `where`.
+
+    Usage: toile catalog build INPUT CATALOG [--metadata-parser fast|xmltodict]
+        [--metadata-cache CACHE] [--threads N] [--verbose]
+
+    Args:
+        input: Path to TIFF directory, glob pattern, or YAML config file
+        catalog: SQLite database to write (replaced if it exists)
+        metadata_parser: OME-XML parser - 'fast' or 'xmltodict'
+        metadata_cache: SQLite cache of stack headers and OME metadata to
+            consult and update (see `toile metadata build`)
+        threads: Number of threads listing directories and reading files
+        verbose: List every recording cataloged
+
+    Example:
+        toile catalog build config.yaml catalog.sqlite
+    """
+    if metadata_parser not in get_args( MetadataParser ):
+        raise ValueError( f'Unrecognized metadata parser: {metadata_parser}' )
+
+    config = _standardize_config_args( input, metadata_cache = metadata_cache )
+    # The config's raw inputs, not its selection from a catalog
+    rows = build_catalog( config.inputs, catalog,
+        frame_pattern_full = config.frame_pattern_full,
+        frame_pattern = config.frame_pattern,
+        filename_parser = config.filename_parser,
+        metadata_parser = metadata_parser,
+        metadata_cache = config.metadata_cache,
+        threads = threads,
+    )
+
+    for cur_row in rows:
+        if cur_row.get( 'error' ) is not None:
+            print( f'🔴 {cur_row["path"]}: {cur_row["error"]}' )
+        elif verbose:
+            print( f'🟢 {cur_row["path"]}' )
+
+    n_failed = sum( x.get( 'error' ) is not None for x in rows )
+    print( f'Cataloged {len( rows )} recordings ({n_failed} with errors) to {catalog}' )
+
+@app.command( 'query' )
+def _cli_catalog_query(
+            catalog: Path,
+            where: Optional[str] = None,
+            paths: bool = False,
+            output: Optional[Path] = None,
+        ):
+    """CLI command: List the cataloged recordings satisfying an SQL expression.
+
+    Writes each selected row as a line of JSON, or, with `--paths`, just the
+    paths of the selected recordings that can be exported - the recordings
+    an export config with the same `catalog` and `where` would include.
+
+    Usage: toile catalog query CATALOG [--where EXPR] [--paths] [--output FILE]
+
+    Args:
+        catalog: SQLite database written by `toile catalog build`
+        where: SQL expression over the catalog's columns (default: every row)
+        paths: List only the paths of selected recordings without errors
+        output: File to write to (default: standard output)
+
+    Example:
+        toile catalog query catalog.sqlite --where "mouse_id = 12 AND slice_id = 'A'"
+    """
+    if paths:
+        lines = [ x + '\n' for x in select_recordings( catalog, where ) ]
+    else:
+        lines = [ json.dumps( x ) + '\n' for x in query_catalog( catalog, where ) ]
+
+    if output is None:
+        for line in lines:
+            print( line, end = '' )
+    else:
+        with open( output, 'w' ) as f:
+            f.writelines( lines )
+
+
+#
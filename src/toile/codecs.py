@@ -0,0 +1,341 @@
+"""
+Binary encodings for the image data of exported samples.
+
+By default, samples are serialized whole by `atdata` into a single
+`msgpack` member. With any other image codec, the image of each `Frame` or
+`Patch` is written as its own member, `image.{extension}`, in the chosen
+encoding, and the remaining fields go to a `metadata.msgpack` member:
+
+- 'raw': dtype/shape header followed by the C-order pixel buffer
+- 'npy': NumPy `.npy` format
+- 'zstd': 'raw', compressed with Zstandard (requires `zstandard`)
+- 'lz4': 'raw', compressed with LZ4 frames (requires `lz4`)
+- 'png16': lossless 8- or 16-bit grayscale PNG (2D unsigned images only)
+
+Use `decode_sample` to turn the members of such a sample back into fields.
+"""
+
+##
+# Imports
+
+import io
+import struct
+
+import msgpack
+import numpy as np
+
+from typing import (
+    Any,
+    Callable,
+    Literal,
+    NamedTuple,
+    Optional,
+    TypeAlias,
+)
+from numpy.typing import (
+    NDArray,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+##
+# Typing shortcuts
+
+ImageCodecName: TypeAlias = Literal[
+    'atdata',
+    'raw',
+    'npy',
+    'zstd',
+    'lz4',
+    'png16',
+]
+"""Encoding of the image field of exported samples ('atdata' keeps the
+default whole-sample msgpack serialization)"""
+
+METADATA_MEMBER = 'metadata.msgpack'
+
+_IMAGE_MEMBER_PREFIX = 'image.'
+
+
+##
+# Raw buffers
+
+def _raw_header( image: NDArray ) -> bytes:
+    """Header of the raw layout: the length-prefixed dtype string (e.g.,
+    `<u2`), then the number of dimensions and each dimension as
+    little-endian int64.
+
+    This is also the layout `atdata` uses for arrays inside msgpack samples.
+    """
+    if image.dtype.hasobject:
+        raise ValueError( 'Cannot encode object arrays' )
+
+    dtype = image.dtype.str.encode( 'ascii' )
+    return (
+        struct.pack( '<B', len( dtype ) ) + dtype
+        + struct.pack( f'<B{image.ndim}q', image.ndim, *image.shape )
+    )
+
+def _pack_raw( image: NDArray ) -> bytes:
+    """Serialize an array as a dtype/shape header plus its C-order buffer."""
+    return _raw_header( image ) + np.ascontiguousarray( image ).tobytes()
+
+def _unpack_raw( data: bytes ) -> NDArray:
+    """Inverse of `_pack_raw`."""
+    n_dtype = data[0]
+    dtype = np.dtype( data[1:1 + n_dtype].decode( 'ascii' ) )
+    ndim = data[1 + n_dtype]
+    start = 2 + n_dtype
+    shape = struct.unpack_from( f'<{ndim}q', data, start )
+    return np.frombuffer( data, dtype = dtype, offset = start + 8 * ndim ).reshape( shape )
+
+
+##
+# Codecs
+
+def _encode_npy( image: NDArray, level: Optional[int] ) -> bytes:
+    buf = io.BytesIO()
+    np.save( buf, image, allow_pickle = False )
+    return buf.getvalue()
+
+def _decode_npy( data: bytes ) -> NDArray:
+    return np.load( io.BytesIO( data ), allow_pickle = False )
+
+def _encode_zstd( image: NDArray, level: Optional[int] ) -> bytes:
+    if zstandard is None:
+        raise ImportError( 'The zstd image codec requires `zstandard` (pip install toile[zstd])' )
+    return zstandard.ZstdCompressor( level = 3 if level is None else level ).compress( _pack_raw( image ) )
+
+def _decode_zstd( data: bytes ) -> NDArray:
+    if zstandard is None:
+        raise ImportError( 'The zstd image codec requires `zstandard` (pip install toile[zstd])' )
+    return _unpack_raw( zstandard.ZstdDecompressor().decompress( data ) )
+
+def _encode_lz4( image: NDArray, level: Optional[int] ) -> bytes:
+    if lz4_frame is None:
+        raise ImportError( 'The lz4 image codec requires `lz4` (pip install toile[lz4])' )
+    return lz4_frame.compress( _pack_raw( image ), compression_level = 0 if level is None else level )
+
+def _decode_lz4( data: bytes ) -> NDArray:
+    if lz4_frame is None:
+        raise ImportError( 'The lz4 image codec requires `lz4` (pip install toile[lz4])' )
+    return _unpack_raw( lz4_frame.decompress( data ) )
+
+def _encode_png16( image: NDArray, level: Optional[int] ) -> bytes:
+    from PIL import Image
+
+    if image.ndim != 2 or image.dtype.kind != 'u' or image.dtype.itemsize > 2:
+        raise ValueError( f'PNG encoding needs a 2D uint8 or uint16 image (got {image.dtype} {image.shape})' )
+
+    buf = io.BytesIO()
+    Image.fromarray( np.ascontiguousarray( image, dtype = image.dtype.newbyteorder( '=' ) ) ).save( buf,
+        format = 'PNG',
+        compress_level = 6 if level is None else level,
+    )
+    return buf.getvalue()
+
+def _decode_png16( data: bytes ) -> NDArray:
+    from PIL import Image
+
+    with Image.open( io.BytesIO( data ) ) as im:
+        return np.asarray( im )
+
+class _Codec( NamedTuple ):
+    extension: str
+    """Extension of the image member (after 'image.')"""
+    encode: Callable[[NDArray, Optional[int]], bytes]
+    """Encode an image, at a codec-specific compression level (None for default)"""
+    decode: Callable[[bytes], NDArray]
+    """Decode an encoded image"""
+
+_CODECS: dict[str, _Codec] = {
+    'raw': _Codec( 'raw', lambda x, _: _pack_raw( x ), _unpack_raw ),
+    'npy': _Codec( 'npy', _encode_npy, _decode_npy ),
+    'zstd': _Codec( 'raw.zst', _encode_zstd, _decode_zstd ),
+    'lz4': _Codec( 'raw.lz4', _encode_lz4, _decode_lz4 ),
+    'png16': _Codec( 'png', _encode_png16, _decode_png16 ),
+}
+
+_CODECS_BY_MEMBER: dict[str, str] = { _IMAGE_MEMBER_PREFIX + v.extension: k
+                                      for k, v in _CODECS.items() }
+
+
+##
+# Zero-copy serialization
+
+def _image_buffer( image: Any ) -> Optional[memoryview]:
+    """Flat byte view of an image's pixels, if they are one contiguous buffer."""
+    if not isinstance( image, np.ndarray ) or not image.flags.c_contiguous or image.dtype.hasobject:
+        return None
+    return memoryview( image.reshape( -1 ).view( np.uint8 ) )
+
+def _msgpack_bin_header( n: int ) -> bytes:
+    """msgpack header of a `bin` object of `n` bytes."""
+    if n < ( 1 << 8 ):
+        return struct.pack( '>BB', 0xc4, n )
+    if n < ( 1 << 16 ):
+        return struct.pack( '>BH', 0xc5, n )
+    return struct.pack( '>BI', 0xc6, n )
+
+def _encode_sample_buffers( fields: dict[str, Any],
+            codec: ImageCodecName,
+        ) -> Optional[dict[str, Any]]:
+    """Serialize an image sample as buffers that reference its pixels.
+
+    Produces the same bytes as the regular serialization (`atdata`'s
+    `packed` for 'atdata', `encode_sample` for 'raw'), but as a tuple of
+    buffers in which the image's pixels are a view, not a copy, so that the
+    shard writer can write them straight from the source array.
+
+    Args:
+        fields: Sample fields, with the image array under 'image'
+        codec: 'atdata' or 'raw' (other codecs transform the pixels)
+
+    Returns:
+        Sample members, or None if the sample can't be serialized without
+        copying (another codec, a non-contiguous image, or other array fields)
+    """
+    if codec not in ('atdata', 'raw'):
+        return None
+    pixels = _image_buffer( fields['image'] )
+    if pixels is None:
+        return None
+
+    image_data = (_raw_header( fields['image'] ), pixels)
+    if codec == 'raw':
+        return {
+            image_member( codec ): image_data,
+            METADATA_MEMBER: msgpack.packb( { k: v for k, v in fields.items()
+                                              if k != 'image' } ),
+        }
+
+    # msgpack map of the fields, in order, with the image as `bin`
+    if len( fields ) >= 16:
+        return None
+    before: list[bytes] = [ struct.pack( '>B', 0x80 | len( fields ) ) ]
+    after: list[bytes] = []
+    cur_parts = before
+    for k, v in fields.items():
+        cur_parts.append( msgpack.packb( k ) )
+        if k == 'image':
+            cur_parts.append( _msgpack_bin_header( len( image_data[0] ) + pixels.nbytes ) )
+            cur_parts.append( image_data[0] )
+            cur_parts = after
+        elif isinstance( v, ( np.ndarray, np.generic ) ):
+            return None
+        else:
+            cur_parts.append( msgpack.packb( v ) )
+
+    return {
+        'msgpack': (b''.join( before ), pixels, b''.join( after )),
+    }
+
+
+##
+# API
+
+def image_member( codec: ImageCodecName ) -> str:
+    """Name (extension) of the image member written by `codec`."""
+    if codec not in _CODECS:
+        raise ValueError( f'Unrecognized image codec: {codec}' )
+    return _IMAGE_MEMBER_PREFIX + _CODECS[codec].extension
+
+def encode_image( image: NDArray,
+            codec: ImageCodecName,
+            level: Optional[int] = None,
+        ) -> bytes:
+    """Encode an image with one of the image codecs.
+
+    Args:
+        image: Image array
+        codec: Codec name (any but 'atdata')
+        level: Codec compression level (codec default if None; ignored by
+            'raw' and 'npy')
+
+    Returns:
+        Encoded bytes
+    """
+    if codec not in _CODECS:
+        raise ValueError( f'Unrecognized image codec: {codec}' )
+    return _CODECS[codec].encode( image, level )
+
+def decode_image( data: bytes, codec: ImageCodecName ) -> NDArray:
+    """Decode an image encoded with `encode_image`.
+
+    Args:
+        data: Encoded bytes
+        codec: Codec the image was encoded with
+
+    Returns:
+        Image array (read-only for 'raw', 'zstd', and 'lz4')
+    """
+    if codec not in _CODECS:
+        raise ValueError( f'Unrecognized image codec: {codec}' )
+    return _CODECS[codec].decode( data )
+
+def encode_sample( fields: dict[str, Any],
+            codec: ImageCodecName,
+            level: Optional[int] = None,
+        ) -> dict[str, bytes]:
+    """Serialize the fields of an image sample with an image codec.
+
+    Args:
+        fields: Sample fields, with the image array under 'image'
+        codec: Codec name (any but 'atdata')
+        level: Codec compression level (see `encode_image`)
+
+    Returns:
+        Sample members: the encoded image, and the other fields as msgpack
+    """
+    return {
+        image_member( codec ): encode_image( fields['image'], codec, level ),
+        METADATA_MEMBER: msgpack.packb( { k: v for k, v in fields.items()
+                                          if k != 'image' } ),
+    }
+
+def sample_codec( members: Any ) -> Optional[ImageCodecName]:
+    """Image codec of a sample, judging by its member names.
+
+    Args:
+        members: Member names (extensions) of the sample, e.g. the keys of a
+            raw WebDataset sample
+
+    Returns:
+        The codec's name, or None if the sample has no codec-encoded image
+    """
+    for cur_member in members:
+        if cur_member in _CODECS_BY_MEMBER:
+            return _CODECS_BY_MEMBER[cur_member]  # type: ignore[return-value]
+    return None
+
+def decode_sample( sample: dict[str, Any] ) -> dict[str, Any]:
+    """Decode a raw sample written with an image codec into its fields.
+
+    Suitable for `WebDataset( ... ).map( decode_sample )`; the result can
+    be passed as keyword arguments to the sample type (e.g., `schema.Frame`).
+
+    Args:
+        sample: Raw sample, mapping member names to bytes
+
+    Returns:
+        Sample fields, with the decoded image under 'image'
+    """
+    codec = sample_codec( sample )
+    if codec is None:
+        raise ValueError( 'Sample has no codec-encoded image member' )
+
+    ret = msgpack.unpackb( sample[METADATA_MEMBER] )
+    ret['image'] = decode_image( sample[image_member( codec )], codec )
+    return ret
+
+
+#
@@ -10,25 +10,41 @@ shard sizes for compatibility with different storage backends (e.g., Bluesky PDS
 ##
 # Imports
 
-from typer import Typer
+from typer import (
+    Typer,
+    Context,
+    Option,
+)
 
 #
 
-import warnings
-
 import os
-from glob import glob
 from pathlib import (
     Path,
 )
-import gzip
 
 import json, yaml
-from dataclasses import dataclass
+import glob
+import inspect
+from dataclasses import (
+    dataclass,
+    fields,
+    replace,
+)
+from contextlib import (
+    contextmanager,
+    nullcontext,
+)
+from collections import deque
+from itertools import product
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 
 from tqdm import tqdm
 import numpy as np
-import webdataset as wds
 
 #
 
@@ -36,8 +52,59 @@ import toile.schema as schema
 from ._common import (
     _Pathable,
 )
+from ._normalize import (
+    NormalizationMode,
+)
+from ._chunks import (
+    MOVIE_HEADER_MEMBER,
+    _chunk_grid,
+    _chunk_shape,
+    _iter_time_chunks,
+    _movie_header,
+)
+from .codecs import (
+    ImageCodecName,
+    encode_sample,
+    _encode_sample_buffers,
+)
+from ._shards import (
+    ShardCompression,
+    ShardWriter,
+    _remove_shards_from,
+    _shard_pattern,
+)
+from ._balance import (
+    _ShuffleBuffer,
+    _plan_shard_counts,
+)
+from ._catalog import (
+    select_recordings,
+)
+from ._dedup import (
+    DedupMode,
+    _frame_digest,
+    _movie_digest,
+    _recording_digests,
+)
+from ._manifest import (
+    ExportManifest,
+    _index_path,
+    _manifest_path,
+    _recording_id,
+)
+from ._metadata_cache import (
+    MetadataCache,
+)
+from .plan import (
+    ExportPlan,
+    PlannedRecording,
+    plan_export,
+)
 from .tiff_import import (
+    ChannelMode,
     load_tiff,
+    close_movie,
+    estimate_movie_nbytes,
     _FilenameParser,
     _make_filename_parser,
 )
@@ -45,42 +112,183 @@ from .tiff_import import (
 #
 
 from typing import (
+    Annotated,
+    Any,
+    Callable,
     TypeAlias,
     Literal,
     Optional,
     Sequence,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    get_args,
+)
+from numpy.typing import (
+    NDArray,
 )
 
 
 ##
 # Type shortcuts
 
-_WDSWriter: TypeAlias = wds.writer.ShardWriter | wds.writer.TarWriter
+ExportKind: TypeAlias = Literal[
+    'movies',
+    'frames',
+    'clips',
+    'patches',
+]
+
+ClipPadding: TypeAlias = Literal[
+    'none',
+    'zero',
+    'edge',
+]
+"""How clips running past the end of a recording are handled:
+
+- 'none': drop them, so every clip holds only real frames
+- 'zero': pad with zero frames
+- 'edge': pad by repeating the recording's last frame
+"""
+
+# Frames read at a time when cutting clips from a lazily-loaded movie
+_CLIP_BLOCK_FRAMES = 256
+
+# Allowance for the metadata and tar headers of a sample when predicting
+# its size for balanced shards
+_SAMPLE_OVERHEAD_NBYTES = 2048
+
+MovieMetadataMode: TypeAlias = Literal[
+    'inline',
+    'sidecar',
+]
+"""Where movie-level metadata is stored for frame exports:
+
+- 'inline': copied into every frame sample alongside its per-frame metadata
+- 'sidecar': written once per recording to `{stem}-recordings.jsonl`; frame
+  samples carry only their recording key and per-frame metadata
+"""
 
 
 ##
 # Helper methods
 
-def _write_movie_frames(
+def _movie_metadata( ds: schema.Movie ) -> dict[str, Any]:
+    """Movie-level metadata for a Movie, as a (shallow-copied) dict."""
+    return (
+        dict() if ds.metadata is None
+        else dict( ds.metadata )
+    )
+
+def _recording_entry( ds: schema.Movie,
+            recording_key: str,
+            input_path: Path,
+        ) -> dict[str, Any]:
+    """Entry describing an exported recording and its movie-level metadata.
+
+    Used for the recordings sidecar file and for per-shard indices.
+
+    Args:
+        ds: Exported Movie
+        recording_key: Key that the recording's frame samples refer to
+        input_path: Recording directory the Movie was loaded from
+
+    Returns:
+        JSON-serializable entry
+    """
+    return {
+        'recording': recording_key,
+        'path': Path( input_path ).as_posix(),
+        'n_frames': int( ds.frames.shape[0] ),
+        'metadata': _movie_metadata( ds ),
+    }
+
+def _shared_metadata( ds: schema.Movie,
+            recording_key: Optional[str],
+            movie_metadata: MovieMetadataMode,
+        ) -> dict[str, Any]:
+    """Metadata shared by all samples cut from a Movie.
+
+    Args:
+        ds: Movie the samples are cut from
+        recording_key: Key of the recording (required for 'sidecar')
+        movie_metadata: 'inline' for the full movie-level metadata, or
+            'sidecar' for a reference to it by `recording_key`
+
+    Returns:
+        Dict to merge into each sample's metadata
+    """
+    if movie_metadata == 'inline':
+        return _movie_metadata( ds )
+    if movie_metadata == 'sidecar':
+        if recording_key is None:
+            raise ValueError( "'sidecar' movie metadata requires a recording key" )
+        return { 'recording': recording_key }
+    raise ValueError( f'Unrecognized movie metadata mode: {movie_metadata}' )
+
+def _serialize_image_sample( sample: schema.Frame | schema.Patch,
+            image_codec: ImageCodecName = 'atdata',
+            image_codec_level: Optional[int] = None,
+            zero_copy: bool = False,
+        ) -> dict[str, Any]:
+    """Serialize a sample with an `image` field, encoding the image with `image_codec`.
+
+    'atdata' keeps the sample's own single-member msgpack serialization (see
+    `toile.codecs` for the layout of the others).
+
+    With `zero_copy`, samples whose image is C-contiguous are serialized (to
+    the same bytes) as buffers that view the image rather than copy it,
+    for `ShardWriter.write` to write straight into the shard; only use this
+    when samples are written as they are produced, before the source
+    array changes.
+    """
+    if zero_copy:
+        ret = _encode_sample_buffers( vars( sample ), image_codec )
+        if ret is not None:
+            return ret
+
+    if image_codec == 'atdata':
+        return sample.as_wds
+    return encode_sample( vars( sample ), image_codec, image_codec_level )
+
+def _iter_movie_frames(
             ds: schema.Movie,
-            dest: _WDSWriter,
             key_template: Optional[str] = None,
             i_start: int = 0,
-        ) -> int:
-    """Write individual frames from a Movie to a WebDataset writer.
-
-    Splits a Movie into individual Frame samples and writes them to the
-    WebDataset archive with sequential keys.
+            recording_key: Optional[str] = None,
+            i_recording: int = 0,
+            movie_metadata: MovieMetadataMode = 'inline',
+            image_codec: ImageCodecName = 'atdata',
+            image_codec_level: Optional[int] = None,
+            zero_copy: bool = False,
+            frame_digests: bool = False,
+        ) -> Iterator[dict[str, Any]]:
+    """Serialize individual frames from a Movie into WebDataset samples.
+
+    Splits a Movie into individual Frame samples, yielding each as a
+    WebDataset-ready dictionary with a sequential key.
 
     Args:
         ds: Movie object containing frames and metadata
-        dest: WebDataset ShardWriter or TarWriter to write samples to
         key_template: Optional format string for sample keys (default: 'sample{i:06d}')
-            Can use {i_dataset} for global index, {i_group} for frame index
+            Can use {i_dataset} for global index, {i_group} for frame index,
+            {i_recording} for recording index
         i_start: Starting index for sample numbering
-
-    Returns:
-        Final sample index after writing all frames
+        recording_key: Optional key of the recording, attached to each sample
+            as `__recording__` (not written to the archive)
+        i_recording: Index of the recording within the export
+        movie_metadata: 'inline' to copy movie-level metadata into every frame,
+            or 'sidecar' to reference it by `recording_key` instead (the
+            metadata is then stored once, out of band)
+        image_codec: Encoding of each frame's image (see `toile.codecs`)
+        image_codec_level: Compression level for `image_codec` (codec default if None)
+        zero_copy: Serialize frames as views of `ds.frames` where possible
+            (see `_serialize_image_sample`)
+        frame_digests: Attach a digest of each frame's pixels as `__digest__`
+            (not written to the archive), for deduplication
+
+    Yields:
+        Serialized samples, ready for `dest.write`
     """
     ##
 
@@ -88,17 +296,19 @@ def _write_movie_frames(
     if key_template is None:
         key_template = 'sample{i:06d}'
 
+    shared_metadata = _shared_metadata( ds, recording_key, movie_metadata )
+
     #
 
-    movie_metadata = (
-        dict() if ds.metadata is None
-        else { k: v
-               for k, v in ds.metadata.items() }
-    )
     frame_metadata = (
         ds.frame_metadata if ds.frame_metadata is not None
         else [ None for _ in range( ds.frames.shape[0] ) ]
     )
+
+    # Each sample is serialized before the next frame's metadata goes in, so
+    # one dict serves every frame, rather than a copy of the movie-level
+    # metadata per frame
+    cur_metadata = dict( shared_metadata )
     
     i_dataset = i_start
     for i_movie, cur_frame_meta in (
@@ -107,23 +317,800 @@ def _write_movie_frames(
             frame_metadata,
         )
     ):
-        cur_metadata = { k: v for k, v in movie_metadata.items() }
         cur_metadata['frame'] = cur_frame_meta
-
         cur_sample = schema.Frame(
             image = ds.frames[i_movie, :, :],
             metadata = cur_metadata,
         )
-        dest_data = cur_sample.as_wds
+        dest_data = _serialize_image_sample( cur_sample, image_codec, image_codec_level, zero_copy )
         dest_data['__key__'] = key_template.format(
             i_dataset = i_dataset,
             i_group = i_movie,
+            i_recording = i_recording,
         )
+        if recording_key is not None:
+            dest_data['__recording__'] = recording_key
+        if frame_digests:
+            dest_data['__digest__'] = _frame_digest( cur_sample.image )
 
-        dest.write( dest_data )
+        yield dest_data
         i_dataset += 1
-    
-    return i_dataset
+
+def _clip_starts( n_frames: int,
+            length: int,
+            stride: int,
+            padding: ClipPadding = 'none',
+        ) -> range:
+    """Start frames of the sliding-window clips over a recording.
+
+    Args:
+        n_frames: Number of frames in the recording
+        length: Frames per clip
+        stride: Frames between the starts of consecutive clips
+        padding: How clips running past the end are handled (see `ClipPadding`)
+
+    Returns:
+        Start frame of each clip, in order
+    """
+    if length < 1 or stride < 1:
+        raise ValueError( f'Clip length and stride must be positive (got {length}, {stride})' )
+    if padding not in get_args( ClipPadding ):
+        raise ValueError( f'Unrecognized clip padding: {padding}' )
+
+    if padding == 'none':
+        return range( 0, max( n_frames - length + 1, 0 ), stride )
+
+    # Just enough (padded) clips that every frame is covered
+    n_clips = 0 if n_frames == 0 else 1 + max( 0, -(-(n_frames - length) // stride) )
+    return range( 0, n_clips * stride, stride )
+
+def _iter_movie_clips(
+            ds: schema.Movie,
+            key_template: Optional[str] = None,
+            clip_length: int = 16,
+            clip_stride: int = 4,
+            clip_padding: ClipPadding = 'none',
+            recording_key: Optional[str] = None,
+            i_recording: int = 0,
+            movie_metadata: MovieMetadataMode = 'inline',
+        ) -> Iterator[dict[str, Any]]:
+    """Serialize sliding-window clips from a Movie into WebDataset samples.
+
+    Clips are sliced straight out of `ds.frames`: for in-memory stacks each
+    clip is a view, and lazily-loaded stacks are read in blocks spanning
+    many clips, so overlapping clips never read a frame from disk more than
+    once. Frames shared by consecutive blocks (those of the clips straddling
+    the boundary) are carried over into the next block in memory, rather
+    than read again.
+
+    Args:
+        ds: Movie object containing frames and metadata
+        key_template: Optional format string for sample keys (default: 'sample{i:06d}')
+            Can use {i_group} for clip index, {i_recording} for recording index
+        clip_length: Frames per clip
+        clip_stride: Frames between the starts of consecutive clips
+        clip_padding: How clips running past the end are handled (see `ClipPadding`)
+        recording_key: Optional key of the recording (see `_iter_movie_frames`)
+        i_recording: Index of the recording within the export
+        movie_metadata: Where movie-level metadata goes (see `_iter_movie_frames`)
+
+    Yields:
+        Serialized `Clip` samples, ready for `dest.write`
+    """
+    ##
+
+    # Normalize args
+    if key_template is None:
+        key_template = 'sample{i:06d}'
+
+    frames = ds.frames
+    n_frames = frames.shape[0]
+    starts = _clip_starts( n_frames, clip_length, clip_stride, clip_padding )
+    shared_metadata = _shared_metadata( ds, recording_key, movie_metadata )
+
+    #
+
+    in_memory = isinstance( frames, np.ndarray )
+    block = None
+    block_start = 0
+
+    for i_clip, start in enumerate( starts ):
+        stop = min( start + clip_length, n_frames )
+
+        if in_memory:
+            cur_frames = frames[start:stop]
+        else:
+            if block is None or stop > block_start + block.shape[0]:
+                block_stop = min( n_frames, start + max( clip_length, _CLIP_BLOCK_FRAMES ) )
+                # Frames of the old block from `start` on are already read
+                read_start = start if block is None else max( start, block_start + block.shape[0] )
+                cur_read = np.asarray( frames[read_start:block_stop] )
+                if block is not None and read_start > start:
+                    cur_read = np.concatenate( [block[start - block_start:], cur_read] )
+                block = cur_read
+                block_start = start
+            cur_frames = block[start - block_start:stop - block_start]
+
+        n_valid = stop - start
+        if n_valid < clip_length:
+            pad_shape = (clip_length - n_valid, *cur_frames.shape[1:])
+            if clip_padding == 'edge':
+                pad = np.broadcast_to( cur_frames[-1:], pad_shape )
+            else:
+                pad = np.zeros( pad_shape, dtype = cur_frames.dtype )
+            cur_frames = np.concatenate( [cur_frames, pad] )
+
+        cur_sample = schema.Clip(
+            frames = cur_frames,
+            metadata = dict( shared_metadata,
+                clip = {
+                    'start': start,
+                    'length': clip_length,
+                    'n_valid': n_valid,
+                },
+                frames = (
+                    None if ds.frame_metadata is None
+                    else [ ds.frame_metadata[i] for i in range( start, stop ) ]
+                ),
+            ),
+        )
+        dest_data = cur_sample.as_wds
+        dest_data['__key__'] = key_template.format(
+            i_dataset = i_clip,
+            i_group = i_clip,
+            i_recording = i_recording,
+        )
+        if recording_key is not None:
+            dest_data['__recording__'] = recording_key
+
+        yield dest_data
+
+def _patch_starts( n: int, size: int, overlap: int = 0 ) -> list[int]:
+    """Start offsets of patches tiling one axis of a frame.
+
+    Patches are `size - overlap` apart; if they do not end flush with the
+    frame, a final patch is aligned to its edge so every pixel is covered
+    without padding.
+
+    Args:
+        n: Length of the axis
+        size: Patch length along the axis
+        overlap: Pixels shared by neighbouring patches
+
+    Returns:
+        Start offset of each patch, in increasing order
+    """
+    if size < 1 or not ( 0 <= overlap < size ):
+        raise ValueError( f'Invalid patch tiling: size {size}, overlap {overlap}' )
+    if n < size:
+        raise ValueError( f'Frames ({n} px) are smaller than the patch size ({size} px)' )
+
+    ret = list( range( 0, n - size + 1, size - overlap ) )
+    if ret[-1] + size < n:
+        ret.append( n - size )
+    return ret
+
+def _patch_foreground( frame: NDArray,
+            ys: list[int],
+            xs: list[int],
+            size: int,
+        ) -> NDArray:
+    """Fraction of foreground pixels in each patch of a frame.
+
+    Foreground pixels are those brighter than the frame's mean intensity.
+    Counts for all patches come from a single summed-area table, so the
+    cost does not grow with the overlap.
+
+    Args:
+        frame: 2D image, or (channel, height, width) for multi-channel
+            recordings (a pixel is then foreground if it is brighter than
+            the mean of any channel)
+        ys: Patch row offsets
+        xs: Patch column offsets
+        size: Patch height and width
+
+    Returns:
+        Array of shape (len(ys), len(xs))
+    """
+    foreground = frame > frame.mean( axis = (-2, -1), keepdims = True )
+    if foreground.ndim > 2:
+        foreground = foreground.reshape( -1, *foreground.shape[-2:] ).any( axis = 0 )
+    table = np.zeros( (foreground.shape[0] + 1, foreground.shape[1] + 1), dtype = np.int64 )
+    np.cumsum( np.cumsum( foreground, axis = 0 ), axis = 1, out = table[1:, 1:] )
+
+    y0 = np.asarray( ys )[:, None]
+    x0 = np.asarray( xs )[None, :]
+    counts = (
+        table[y0 + size, x0 + size] - table[y0, x0 + size]
+        - table[y0 + size, x0] + table[y0, x0]
+    )
+    return counts / ( size * size )
+
+def _iter_movie_patches(
+            ds: schema.Movie,
+            key_template: Optional[str] = None,
+            patch_size: int = 128,
+            patch_overlap: int = 0,
+            patch_min_foreground: float = 0.,
+            recording_key: Optional[str] = None,
+            i_recording: int = 0,
+            movie_metadata: MovieMetadataMode = 'inline',
+            image_codec: ImageCodecName = 'atdata',
+            image_codec_level: Optional[int] = None,
+        ) -> Iterator[dict[str, Any]]:
+    """Serialize square patches tiling each frame of a Movie into WebDataset samples.
+
+    Each frame is read once and cut into views, so only the patches kept by
+    the foreground filter are copied and serialized.
+
+    Args:
+        ds: Movie object containing frames and metadata
+        key_template: Optional format string for sample keys (default: 'sample{i:06d}')
+            Can use {i_group} for frame index, {i_patch} for the patch's
+            position in the frame's grid, {i_recording} for recording index
+        patch_size: Height and width of each patch
+        patch_overlap: Pixels shared by neighbouring patches
+        patch_min_foreground: Minimum fraction of a patch's pixels brighter
+            than its frame's mean for the patch to be kept (0 keeps all)
+        recording_key: Optional key of the recording (see `_iter_movie_frames`)
+        i_recording: Index of the recording within the export
+        movie_metadata: Where movie-level metadata goes (see `_iter_movie_frames`)
+        image_codec: Encoding of each patch's image (see `toile.codecs`)
+        image_codec_level: Compression level for `image_codec` (codec default if None)
+
+    Yields:
+        Serialized `Patch` samples, ready for `dest.write`
+    """
+    ##
+
+    # Normalize args
+    if key_template is None:
+        key_template = 'sample{i:06d}'
+
+    n_frames = ds.frames.shape[0]
+    height, width = ds.frames.shape[-2:]
+    if n_frames == 0:
+        return
+
+    ys = _patch_starts( height, patch_size, patch_overlap )
+    xs = _patch_starts( width, patch_size, patch_overlap )
+    shared_metadata = _shared_metadata( ds, recording_key, movie_metadata )
+
+    #
+
+    i_dataset = 0
+    for i_frame in range( n_frames ):
+        frame = np.asarray( ds.frames[i_frame] )
+        cur_frame_meta = (
+            None if ds.frame_metadata is None
+            else ds.frame_metadata[i_frame]
+        )
+        foreground = _patch_foreground( frame, ys, xs, patch_size )
+
+        for (yi, y), (xi, x) in product( enumerate( ys ), enumerate( xs ) ):
+            if foreground[yi, xi] < patch_min_foreground:
+                continue
+
+            cur_sample = schema.Patch(
+                image = frame[..., y:y + patch_size, x:x + patch_size],
+                metadata = dict( shared_metadata,
+                    frame = cur_frame_meta,
+                    patch = {
+                        'frame': i_frame,
+                        'y': y,
+                        'x': x,
+                        'size': patch_size,
+                        'foreground': float( foreground[yi, xi] ),
+                    },
+                ),
+            )
+            dest_data = _serialize_image_sample( cur_sample, image_codec, image_codec_level )
+            dest_data['__key__'] = key_template.format(
+                i_dataset = i_dataset,
+                i_group = i_frame,
+                i_patch = yi * len( xs ) + xi,
+                i_recording = i_recording,
+            )
+            if recording_key is not None:
+                dest_data['__recording__'] = recording_key
+
+            yield dest_data
+            i_dataset += 1
+
+def _iter_movie_chunked(
+            ds: schema.Movie,
+            key_template: Optional[str] = None,
+            chunk_frames: int = 64,
+            chunk_tile: int = 256,
+            recording_key: Optional[str] = None,
+            i_recording: int = 0,
+            movie_metadata: MovieMetadataMode = 'inline',
+        ) -> Iterator[dict[str, Any]]:
+    """Serialize a whole Movie as a single sample of (time × tile) chunks.
+
+    The sample is yielded in pieces - a header, then the chunks of one block
+    of `chunk_frames` frames at a time, marked `__append__` - so that only
+    one block of the stack is in memory at once (see `toile._chunks` for
+    the layout).
+
+    Args:
+        ds: Movie object containing frames and metadata
+        key_template: Optional format string for the sample key (default: 'sample{i:06d}')
+            Can use {i_recording} for recording index
+        chunk_frames: Frames per chunk
+        chunk_tile: Height and width of each chunk's tile (0 for full frames)
+        recording_key: Optional key of the recording (see `_iter_movie_frames`)
+        i_recording: Index of the recording within the export
+        movie_metadata: Where movie-level metadata goes (see `_iter_movie_frames`)
+
+    Yields:
+        Pieces of the serialized sample, ready for `dest.write`
+    """
+    ##
+
+    # Normalize args
+    if key_template is None:
+        key_template = 'sample{i:06d}'
+
+    key = key_template.format(
+        i_dataset = 0,
+        i_group = 0,
+        i_recording = i_recording,
+    )
+    chunk_shape = _chunk_shape( ds.frames.shape, chunk_frames, chunk_tile )
+
+    #
+
+    header = {
+        '__key__': key,
+        MOVIE_HEADER_MEMBER: _movie_header( ds.frames.shape, ds.frames.dtype, chunk_shape,
+            metadata = _shared_metadata( ds, recording_key, movie_metadata ),
+            frame_metadata = (
+                None if ds.frame_metadata is None
+                else list( ds.frame_metadata )
+            ),
+        ),
+    }
+    if recording_key is not None:
+        header['__recording__'] = recording_key
+    yield header
+
+    for cur_members in _iter_time_chunks( ds.frames, chunk_shape ):
+        yield {
+            '__key__': key,
+            '__append__': True,
+            **cur_members,
+        }
+
+def _iter_recording_samples(
+            ds: schema.Movie,
+            kind: ExportKind,
+            key_template: str,
+            sample_kwargs: dict[str, Any],
+            zero_copy: bool = False,
+            **kwargs
+        ) -> Iterator[dict[str, Any]]:
+    """Serialize a Movie as samples of the given export kind.
+
+    Args:
+        ds: Movie object containing frames and metadata
+        kind: Export type (see `export_tiffs`)
+        key_template: Format string for sample keys
+        sample_kwargs: Kind-specific options (e.g., image codec for 'frames',
+            clip length for 'clips', patch size for 'patches', chunk shape
+            for 'movies')
+        zero_copy: Serialize frames as views of `ds.frames` where possible,
+            for samples that are written as they are produced (see
+            `_serialize_image_sample`)
+        **kwargs: Per-recording arguments (`recording_key`, `i_recording`,
+            and `movie_metadata`)
+
+    Returns:
+        Iterator over serialized samples, in write order
+    """
+    if kind == 'frames':
+        return _iter_movie_frames( ds, key_template, **sample_kwargs, zero_copy = zero_copy, **kwargs )
+    elif kind == 'clips':
+        return _iter_movie_clips( ds, key_template, **sample_kwargs, **kwargs )
+    elif kind == 'patches':
+        return _iter_movie_patches( ds, key_template, **sample_kwargs, **kwargs )
+    elif kind == 'movies':
+        return _iter_movie_chunked( ds, key_template, **sample_kwargs, **kwargs )
+    else:
+        raise ValueError( f'Unrecognized export kind: {kind}' )
+
+def _predict_sample_nbytes( recording: PlannedRecording,
+            kind: ExportKind,
+            sample_kwargs: dict[str, Any],
+            to_uint8: bool = False,
+            channels: ChannelMode = 'first',
+        ) -> list[int]:
+    """Predict the sizes of the samples a recording will be exported as.
+
+    Uses the stack shape and dtype read into the recording's plan, so
+    nothing is loaded. Sizes count pixel data (before any image codec) plus
+    a fixed allowance for metadata and tar headers.
+
+    Args:
+        recording: Planned recording, with its header read
+        kind: Export type (see `export_tiffs`)
+        sample_kwargs: Kind-specific options (see `_iter_recording_samples`)
+        to_uint8: Whether frames will be normalized to uint8
+        channels: Which channels will be loaded (see `ChannelMode`)
+
+    Returns:
+        Predicted size in bytes of each sample, in write order (none for
+        recordings that the plan already knows will fail)
+    """
+    if recording.error is not None:
+        return []
+    if recording.shape is None or recording.dtype is None:
+        raise ValueError( f'Recording {recording.path} was planned without reading its header' )
+
+    n_frames = recording.shape[0]
+    height, width = recording.shape[-2:]
+    frame_shape = tuple( recording.shape[1:] )
+    if channels == 'all' and len( frame_shape ) == 2:
+        # One file per channel, each holding a stack of this shape
+        frame_shape = (max( 1, len( recording.channel_paths ) ), *frame_shape)
+    itemsize = 1 if to_uint8 else np.dtype( recording.dtype ).itemsize
+    pixel_nbytes = int( np.prod( frame_shape[:-2] ) ) * itemsize
+    frame_nbytes = height * width * pixel_nbytes
+
+    if kind == 'frames':
+        return n_frames * [ frame_nbytes + _SAMPLE_OVERHEAD_NBYTES ]
+
+    if kind == 'clips':
+        n_clips = len( _clip_starts( n_frames,
+            sample_kwargs['clip_length'],
+            sample_kwargs['clip_stride'],
+            sample_kwargs['clip_padding'],
+        ) )
+        return n_clips * [ sample_kwargs['clip_length'] * frame_nbytes + _SAMPLE_OVERHEAD_NBYTES ]
+
+    if kind == 'patches':
+        size = sample_kwargs['patch_size']
+        try:
+            n_patches = (
+                len( _patch_starts( height, size, sample_kwargs['patch_overlap'] ) )
+                * len( _patch_starts( width, size, sample_kwargs['patch_overlap'] ) )
+            )
+        except ValueError:
+            # Frames are too small; the export will report it
+            return []
+        return ( n_frames * n_patches ) * [ size * size * pixel_nbytes + _SAMPLE_OVERHEAD_NBYTES ]
+
+    if kind == 'movies':
+        chunk_shape = _chunk_shape( (n_frames, *frame_shape),
+            sample_kwargs['chunk_frames'],
+            sample_kwargs['chunk_tile'],
+        )
+        n_chunks = int( np.prod( _chunk_grid( (n_frames, *frame_shape), chunk_shape ) ) )
+        return [ n_frames * frame_nbytes + ( n_chunks + 1 ) * _SAMPLE_OVERHEAD_NBYTES ]
+
+    raise ValueError( f'Unrecognized export kind: {kind}' )
+
+def _skip_duplicates(
+            samples: Iterable[dict[str, Any]],
+            seen_digests: dict[str, str],
+            duplicates: list[tuple[str, str]],
+        ) -> Iterator[dict[str, Any]]:
+    """Drop samples whose `__digest__` was seen before.
+
+    Args:
+        samples: Serialized samples
+        seen_digests: Keys of the samples passed so far, by digest; the keys
+            of new samples are added
+        duplicates: Receives the key of each dropped sample, with the key of
+            the sample it duplicates
+
+    Yields:
+        Samples that are not duplicates
+    """
+    for cur_sample in samples:
+        cur_digest = cur_sample.get( '__digest__' )
+        if cur_digest is not None:
+            if cur_digest in seen_digests:
+                duplicates.append( (cur_sample['__key__'], seen_digests[cur_digest]) )
+                continue
+            seen_digests[cur_digest] = cur_sample['__key__']
+
+        yield cur_sample
+
+def _write_samples(
+            dest: ShardWriter,
+            samples: Iterable[dict[str, Any]],
+            seen_digests: Optional[dict[str, str]] = None,
+        ) -> tuple[list[str], Optional[tuple[int, int]], list[tuple[str, str]]]:
+    """Write serialized samples, tracking where they land.
+
+    Args:
+        dest: Shard writer to write samples to
+        samples: Serialized samples, in write order
+        seen_digests: Optional keys of the samples written so far, by their
+            `__digest__`; samples whose digest is already present are skipped
+            as duplicates, and the keys of new ones are added
+
+    Returns:
+        Keys of the written samples, the first and last index of the shards
+        they were written to (None if there were no samples), and the key of
+        each skipped duplicate with the key of the sample it duplicates
+    """
+    keys = []
+    duplicates: list[tuple[str, str]] = []
+    if seen_digests is not None:
+        samples = _skip_duplicates( samples, seen_digests, duplicates )
+
+    first_shard = None
+    for cur_sample in samples:
+        dest.write( cur_sample )
+        if first_shard is None:
+            first_shard = dest.current_shard
+        if not cur_sample.get( '__append__', False ):
+            keys.append( cur_sample['__key__'] )
+
+    if first_shard is None:
+        return keys, None, duplicates
+    assert dest.current_shard is not None
+    return keys, (first_shard, dest.current_shard), duplicates
+
+@contextmanager
+def _dropping_uncommitted( manifest: ExportManifest, uncommitted: dict[str, int] ) -> Iterator[None]:
+    """Context that, if exited by an exception, drops the recordings still in
+    `uncommitted` from the manifest's indices (see
+    `ExportManifest.drop_recording`).
+
+    Args:
+        manifest: Manifest of the export
+        uncommitted: Index of the shard that each recording being written
+            started in, by recording key, until the recording is committed
+    """
+    try:
+        yield
+    except BaseException:
+        for cur_key, cur_shard in uncommitted.items():
+            manifest.drop_recording( cur_key, cur_shard )
+        raise
+
+def _estimate_recording_nbytes( input_path: Path,
+            load_kwargs: dict[str, Any],
+            stack_path: Optional[Path | list[Path]] = None,
+            lazy: Optional[bool] = None,
+        ) -> int:
+    """Estimated resident size of a recording loaded with `load_kwargs` (see
+    `estimate_movie_nbytes`), or 0 if it can't be estimated.
+
+    Args:
+        lazy: Estimate as if loaded lazily or not, regardless of `load_kwargs`
+    """
+    try:
+        return estimate_movie_nbytes( input_path,
+            frame_pattern_full = load_kwargs.get( 'frame_pattern_full', '*_*0001.ome.tif*' ),
+            frame_pattern = load_kwargs.get( 'frame_pattern', '*.ome.tif*' ),
+            to_uint8 = load_kwargs.get( 'to_uint8', False ),
+            lazy = load_kwargs.get( 'lazy', False ) if lazy is None else lazy,
+            stack_path = stack_path,
+            channels = load_kwargs.get( 'channels', 'first' ),
+            metadata_cache = load_kwargs.get( 'metadata_cache' ),
+        )
+    except Exception:
+        # Let `load_tiff` report the problem
+        return 0
+
+def _iter_loaded_recordings(
+            input_paths: Sequence[Path],
+            load_kwargs: dict[str, Any],
+            prefetch: int = 0,
+            prefetch_memory: int = 2_000_000_000,
+            stack_paths: Optional[dict[Path, Path | list[Path]]] = None,
+        ) -> Iterator[tuple[Path, schema.Movie | Exception]]:
+    """Load recordings in order, optionally prefetching upcoming ones.
+
+    With `prefetch > 0`, up to `prefetch` upcoming recordings are loaded in
+    background threads while the consumer writes the current one. Prefetch
+    depth backs off automatically so that the estimated size of all loaded
+    but unconsumed movies (plus the one being consumed) stays within
+    `prefetch_memory`; at least one recording is always loaded, however large.
+
+    Args:
+        input_paths: Recording directories, in output order
+        load_kwargs: Keyword arguments forwarded to `load_tiff`
+        prefetch: Maximum number of recordings to load ahead (0 to disable)
+        prefetch_memory: Memory budget in bytes for loaded recordings
+        stack_paths: Already-resolved stack files (or per-channel stack
+            files) of recordings, by input path (see `toile.plan`); others
+            are searched for by `load_tiff`
+
+    Yields:
+        Tuples of input path and either its loaded Movie or the exception
+        raised while loading it
+    """
+
+    if stack_paths is None:
+        stack_paths = dict()
+
+    if prefetch <= 0:
+        for cur_path in input_paths:
+            try:
+                yield cur_path, load_tiff( cur_path, **load_kwargs,
+                    stack_path = stack_paths.get( cur_path ),
+                )
+            except Exception as e:
+                yield cur_path, e
+        return
+
+    with ThreadPoolExecutor( max_workers = prefetch ) as pool:
+        pending: deque[tuple[Path, Future, int]] = deque()
+        remaining = deque( input_paths )
+        next_nbytes: Optional[int] = None
+
+        def _fill( held: int ):
+            nonlocal next_nbytes
+            while len( remaining ) > 0 and len( pending ) < prefetch:
+                if next_nbytes is None:
+                    next_nbytes = _estimate_recording_nbytes( remaining[0], load_kwargs,
+                        stack_paths.get( remaining[0] ),
+                    )
+
+                resident = held + sum( x[2] for x in pending )
+                if resident > 0 and resident + next_nbytes > prefetch_memory:
+                    # Back off until the consumer releases something
+                    return
+
+                cur_path = remaining.popleft()
+                pending.append( (
+                    cur_path,
+                    pool.submit( load_tiff, cur_path, **load_kwargs,
+                        stack_path = stack_paths.get( cur_path ),
+                    ),
+                    next_nbytes,
+                ) )
+                next_nbytes = None
+
+        _fill( 0 )
+        while len( pending ) > 0:
+            cur_path, cur_future, cur_nbytes = pending.popleft()
+            try:
+                cur_result = cur_future.result()
+            except Exception as e:
+                cur_result = e
+            _fill( cur_nbytes )
+
+            yield cur_path, cur_result
+
+            if len( pending ) == 0:
+                _fill( 0 )
+
+
+def _prepare_recording(
+            input_path: Path,
+            kind: ExportKind,
+            key_template: str,
+            load_kwargs: dict[str, Any],
+            sample_kwargs: dict[str, Any],
+            recording_key: str = '',
+            i_recording: int = 0,
+            movie_metadata: MovieMetadataMode = 'inline',
+            stack_path: Optional[Path | list[Path]] = None,
+            digest: bool = False,
+        ) -> tuple[dict[str, Any], list[dict[str, Any]], Optional[str]]:
+    """Load and serialize a single recording in a worker process.
+
+    This is the unit of work for parallel exports: TIFF decoding and sample
+    serialization happen here, leaving only the tar writes to the parent.
+
+    Args:
+        input_path: Recording directory to load with `load_tiff`
+        kind: Export type (see `export_tiffs`)
+        key_template: Format string for sample keys
+        load_kwargs: Keyword arguments forwarded to `load_tiff`
+        sample_kwargs: Kind-specific options (see `_iter_recording_samples`)
+        recording_key: Key of the recording (see `_iter_movie_frames`)
+        i_recording: Index of the recording within the export
+        movie_metadata: Where movie-level metadata goes (see `_iter_movie_frames`)
+        stack_path: Already-resolved stack file (or per-channel stack files)
+            of the recording (see `toile.plan`)
+        digest: Also take the recording's content digest (see
+            `toile._dedup._movie_digest`) from the loaded movie
+
+    Returns:
+        Entry describing the recording (see `_recording_entry`), its
+        serialized samples, in write order, and its digest, if taken
+    """
+    ds = load_tiff( input_path, **load_kwargs, stack_path = stack_path )
+
+    try:
+        return (
+            _recording_entry( ds, recording_key, input_path ),
+            list( _iter_recording_samples( ds, kind, key_template, sample_kwargs,
+                recording_key = recording_key,
+                i_recording = i_recording,
+                movie_metadata = movie_metadata,
+            ) ),
+            _movie_digest( ds ) if digest else None,
+        )
+
+    finally:
+        close_movie( ds )
+
+def _iter_prepared_recordings(
+            input_paths: Sequence[Path],
+            workers: int,
+            *args,
+            recording_kwargs: Optional[Sequence[dict[str, Any]]] = None,
+            memory: Optional[int] = None,
+            estimate_nbytes: Optional[Callable[[Path], int]] = None,
+        ) -> Iterator[tuple[Path, tuple[dict[str, Any], list[dict[str, Any]], Optional[str]] | Exception]]:
+    """Prepare recordings in a process pool, yielding results in input order.
+
+    Each recording's serialized samples come back from its worker whole, so
+    every recording in flight may end up held in memory (pickled, then
+    unpickled) while the consumer writes. At most `2 * workers` recordings
+    are in flight at once, and, given a `memory` budget and a way to
+    `estimate_nbytes`, fewer: submissions back off (as in
+    `_iter_loaded_recordings`) so that the estimated size of the recordings
+    in flight, plus the one being written, stays within it. At least one
+    recording is always in flight, however large.
+
+    Args:
+        input_paths: Recording directories, in output order
+        workers: Number of worker processes
+        *args: Remaining arguments forwarded to `_prepare_recording`
+        recording_kwargs: Optional per-recording keyword arguments for
+            `_prepare_recording`, parallel to `input_paths`
+        memory: Memory budget in bytes for the serialized recordings in
+            flight (unbounded if None)
+        estimate_nbytes: Function estimating the serialized size of a
+            recording, by input path
+
+    Yields:
+        Tuples of input path and either the result of `_prepare_recording`
+        or the exception raised while preparing it
+    """
+    max_pending = 2 * workers
+    if recording_kwargs is None:
+        recording_kwargs = [ dict() for _ in input_paths ]
+
+    with ProcessPoolExecutor( max_workers = workers ) as pool:
+        pending: deque[tuple[Path, Future, int]] = deque()
+        remaining = deque( zip( input_paths, recording_kwargs ) )
+        next_nbytes: Optional[int] = None
+
+        def _fill( held: int ):
+            nonlocal next_nbytes
+            while len( remaining ) > 0 and len( pending ) < max_pending:
+                cur_path, cur_kwargs = remaining[0]
+                if memory is not None and estimate_nbytes is not None:
+                    if next_nbytes is None:
+                        next_nbytes = estimate_nbytes( cur_path )
+
+                    in_flight = held + sum( x[2] for x in pending )
+                    if in_flight > 0 and in_flight + next_nbytes > memory:
+                        # Back off until the consumer releases something
+                        return
+
+                remaining.popleft()
+                pending.append( (
+                    cur_path,
+                    pool.submit( _prepare_recording, cur_path, *args, **cur_kwargs ),
+                    next_nbytes or 0,
+                ) )
+                next_nbytes = None
+
+        _fill( 0 )
+        while len( pending ) > 0:
+            cur_path, cur_future, cur_nbytes = pending.popleft()
+            try:
+                cur_result = cur_future.result()
+            except Exception as e:
+                cur_result = e
+            _fill( cur_nbytes )
+
+            yield cur_path, cur_result
+            del cur_result
+
+            if len( pending ) == 0:
+                _fill( 0 )
 
 
 ## Config parsing
@@ -138,10 +1125,42 @@ class ExportConfig:
 
     Attributes:
         inputs: List of file paths or glob patterns for input TIFF files
+        frame_pattern_full: Glob pattern for the full stack file of each recording
+        frame_pattern: Glob pattern for the files of a stack split across several files
         output_stem: Optional stem for output tar archive names (default: output directory name)
         shard_size: Maximum size in bytes for each tar shard (default: 850MB)
+        balance_shards: Whether to plan shards of equal size from predicted sample sizes
+        samples_per_shard: Exact number of samples per shard (0 to disable)
+        shuffle_buffer: Samples held for shuffling across recordings as they are written (0 to disable)
+        shuffle_seed: Seed of the shuffle (nondeterministic if None)
         to_uint8: Whether to normalize images to uint8 (0-255) range
-        compressed: Whether to compress output tar files (not yet implemented)
+        normalization: uint8 normalization mode ('max', 'percentile', or 'frame')
+        percentiles: Low and high percentiles for 'percentile' normalization
+        lazy: Whether to stream frames from disk instead of loading whole stacks
+        channels: Which channels of multi-channel recordings to export ('first' or 'all')
+        workers: Number of worker processes for decoding and serializing recordings
+        prefetch: Number of upcoming recordings to load while the current one is written
+        prefetch_memory: Memory budget in bytes for prefetched recordings
+        compressed: Whether to compress output tar files as they are written
+        compression: Shard compression codec ('gzip' or 'zstd')
+        compression_level: Codec compression level (codec default if None)
+        compression_threads: Worker threads for zstd compression (0 for none)
+        movie_metadata: Where movie-level metadata goes ('inline' or 'sidecar')
+        resume: Whether to continue an earlier export, skipping unchanged recordings
+        clip_length: Frames per clip (clip exports)
+        clip_stride: Frames between the starts of consecutive clips (clip exports)
+        clip_padding: How clips running past the end of a recording are handled (clip exports)
+        patch_size: Height and width of each patch (patch exports)
+        patch_overlap: Pixels shared by neighbouring patches (patch exports)
+        patch_min_foreground: Minimum fraction of foreground pixels in an exported patch (patch exports)
+        chunk_frames: Frames per chunk of the stored stack (movie exports)
+        chunk_tile: Height and width of each chunk's spatial tile, 0 for full frames (movie exports)
+        image_codec: Encoding of each sample's image (frame and patch exports)
+        image_codec_level: Compression level for `image_codec` (codec default if None)
+        dedup: Which duplicates to skip ('none', 'recordings', or 'frames')
+        metadata_cache: SQLite cache of stack headers and OME metadata to consult and update
+        catalog: SQLite catalog of recordings to select from with `where`, in place of `inputs`
+        where: SQL expression over the catalog's columns selecting recordings to export
         filename_parser: Optional parser function for extracting metadata from filenames
     """
     ##
@@ -151,14 +1170,78 @@ class ExportConfig:
     """List of file paths or glob patterns for input TIFF files"""
 
     # Optional
+    frame_pattern_full: str = '*_*0001.ome.tif*'
+    """Glob pattern for the full stack file of each recording (see `toile.tiff_import.load_tiff`)"""
+    frame_pattern: str = '*.ome.tif*'
+    """Glob pattern for the files of a stack split across several files (see `toile.tiff_import.load_tiff`)"""
     output_stem: str | None = None
     """Optional stem for output tar archive names (default: output directory name)"""
     shard_size: int = 850_000_000
     """Maximum size in bytes for each tar shard (default: 850MB for WebDataset standard)"""
+    balance_shards: bool = False
+    """Whether to plan shard boundaries from predicted sample sizes so that all shards are about equally large, instead of filling each greedily"""
+    samples_per_shard: int = 0
+    """Exact number of samples per shard, the last holding the remainder (0 to disable)"""
+    shuffle_buffer: int = 0
+    """Number of serialized samples held back to shuffle samples across recordings as they are written (0 to disable; not for movie exports)"""
+    shuffle_seed: int | None = None
+    """Seed of the shuffle (nondeterministic if None)"""
     to_uint8: bool = False
     """Whether to normalize images to uint8 (0-255) range"""
+    normalization: NormalizationMode = 'max'
+    """uint8 normalization mode: stack-wide 'max', stack-wide 'percentile', or per-'frame' max"""
+    percentiles: tuple[float, float] = (0.1, 99.9)
+    """Low and high percentiles mapped to 0 and 255 by 'percentile' normalization"""
+    lazy: bool = False
+    """Whether to stream frames from disk (memory-mapped where possible) instead of loading whole stacks"""
+    channels: ChannelMode = 'first'
+    """Export only the lowest-numbered channel of multi-channel recordings ('first'), or every channel, stacked into (channel, height, width) images ('all')"""
+    workers: int = 1
+    """Number of worker processes for decoding and serializing recordings (1 for serial export)"""
+    prefetch: int = 0
+    """Number of upcoming recordings to load while the current one is written (0 to disable)"""
+    prefetch_memory: int = 2_000_000_000
+    """Memory budget in bytes for prefetched recordings, or for serialized recordings in flight from worker processes (default: 2GB)"""
     compressed: bool = False
-    """Whether to compress output tar files (not yet implemented)"""
+    """Whether to compress output tar files as they are written"""
+    compression: ShardCompression = 'gzip'
+    """Shard compression codec used when `compressed` is set ('gzip' or 'zstd')"""
+    compression_level: int | None = None
+    """Codec compression level (default: 6 for gzip, 3 for zstd)"""
+    compression_threads: int = 0
+    """Worker threads for zstd compression (0 for single-threaded; ignored for gzip)"""
+    movie_metadata: MovieMetadataMode = 'inline'
+    """Copy movie-level metadata into every frame ('inline'), or write it once per recording to a sidecar file ('sidecar')"""
+    resume: bool = False
+    """Whether to continue an earlier export into the same directory, skipping recordings its manifest lists as exported and unchanged"""
+    clip_length: int = 16
+    """Frames per clip (clip exports)"""
+    clip_stride: int = 4
+    """Frames between the starts of consecutive clips (clip exports)"""
+    clip_padding: ClipPadding = 'none'
+    """How clips running past the end of a recording are handled: dropped ('none'), or padded with 'zero' or 'edge' frames"""
+    patch_size: int = 128
+    """Height and width of each patch (patch exports)"""
+    patch_overlap: int = 0
+    """Pixels shared by neighbouring patches (patch exports)"""
+    patch_min_foreground: float = 0.
+    """Minimum fraction of a patch's pixels brighter than its frame's mean for the patch to be exported; 0 keeps all (patch exports)"""
+    chunk_frames: int = 64
+    """Frames per chunk of the stored stack (movie exports)"""
+    chunk_tile: int = 256
+    """Height and width of each chunk's spatial tile, or 0 for full frames (movie exports)"""
+    image_codec: ImageCodecName = 'atdata'
+    """Encoding of each sample's image: whole-sample msgpack ('atdata'), or a separate 'raw', 'npy', 'zstd', 'lz4', or 'png16' member (frame and patch exports)"""
+    image_codec_level: int | None = None
+    """Compression level for `image_codec` (codec default if None)"""
+    dedup: DedupMode = 'none'
+    """Skip recordings whose content digest matches an exported one ('recordings'), and also duplicate frames ('frames'), or nothing ('none')"""
+    metadata_cache: str | None = None
+    """SQLite cache of stack headers and collated OME metadata consulted before reading recordings' metadata, and updated with what is read (see `toile metadata`)"""
+    catalog: str | None = None
+    """SQLite catalog of recordings (see `toile catalog`); if set, the recordings exported are those it lists that satisfy `where`, rather than those matching `inputs` (which the catalog is built from)"""
+    where: str | None = None
+    """SQL expression over the catalog's columns that exported recordings satisfy, e.g., "mouse_id = 12 AND date_acquired > '2024-01-01'" (all cataloged recordings if None)"""
 
     filename_parser: _FilenameParser | None = None
     """Optional parser function for extracting metadata from filenames"""
@@ -168,7 +1251,8 @@ def _parse_config( input_path: _Pathable ) -> ExportConfig:
 
     The YAML file should contain keys matching ExportConfig attributes.
     Optionally includes a 'filename_spec' section with 'template' and
-    'transforms' for custom filename parsing.
+    'transforms' for custom filename parsing. With a 'catalog', 'inputs'
+    may be left out.
 
     Args:
         input_path: Path to YAML configuration file
@@ -187,11 +1271,16 @@ def _parse_config( input_path: _Pathable ) -> ExportConfig:
           transforms:
             mouse_id: int
             slice_id: identity
+        catalog: "catalog.sqlite"
+        where: "mouse_id = 12 AND slice_id = 'A'"
     """
 
     with open( input_path, 'r' ) as f:
         ret_data = yaml.safe_load( f )
 
+    if 'catalog' in ret_data:
+        ret_data.setdefault( 'inputs', [] )
+
     if 'filename_spec' in ret_data:
         # Cache
         filename_spec = ret_data['filename_spec']
@@ -204,7 +1293,7 @@ def _parse_config( input_path: _Pathable ) -> ExportConfig:
     if filename_spec is not None:
         ret.filename_parser = _make_filename_parser(
             filename_spec['template'],
-            filename_spec['transforms'],
+            filename_spec.get( 'transforms' ),
         )
 
     return ret
@@ -213,11 +1302,6 @@ def _parse_config( input_path: _Pathable ) -> ExportConfig:
 ##
 # Common
 
-ExportKind: TypeAlias = Literal[
-    'movies',
-    'frames',
-]
-
 def export_tiffs(
         _inputs: Sequence[_Pathable],
         _output_dir: _Pathable,
@@ -225,11 +1309,43 @@ def export_tiffs(
         #
         kind: ExportKind = 'movies',
         to_uint8: bool = False,
+        normalization: NormalizationMode = 'max',
+        percentiles: tuple[float, float] = (0.1, 99.9),
+        lazy: bool = False,
+        channels: ChannelMode = 'first',
         filename_parser: _FilenameParser | None = None,
+        frame_pattern_full: str = '*_*0001.ome.tif*',
+        frame_pattern: str = '*.ome.tif*',
+        movie_metadata: MovieMetadataMode = 'inline',
+        resume: bool = False,
+        plan: ExportPlan | _Pathable | None = None,
+        metadata_cache: _Pathable | None = None,
+        #
+        clip_length: int = 16,
+        clip_stride: int = 4,
+        clip_padding: ClipPadding = 'none',
+        patch_size: int = 128,
+        patch_overlap: int = 0,
+        patch_min_foreground: float = 0.,
+        chunk_frames: int = 64,
+        chunk_tile: int = 256,
+        image_codec: ImageCodecName = 'atdata',
+        image_codec_level: Optional[int] = None,
+        dedup: DedupMode = 'none',
         #
         shard_size: float = 38_000_000.,
+        balance_shards: bool = False,
+        samples_per_shard: int = 0,
+        shuffle_buffer: int = 0,
+        shuffle_seed: int | None = None,
         compressed: bool = False,
+        compression: ShardCompression = 'gzip',
+        compression_level: int | None = None,
+        compression_threads: int = 0,
         #
+        workers: int = 1,
+        prefetch: int = 0,
+        prefetch_memory: int = 2_000_000_000,
         verbose: bool = False,
         #
         **kwargs
@@ -244,11 +1360,82 @@ def export_tiffs(
         _inputs: List of file paths or glob patterns for input TIFF directories
         _output_dir: Output directory for tar archives
         _stem: Optional stem for output filenames (default: output directory name)
-        kind: Export type - 'movies' (full stacks), 'frames' (individual frames), or 'clips'
+        kind: Export type - 'movies' (full stacks, stored as chunks), 'frames'
+            (individual frames), 'clips' (fixed-length sliding windows of
+            consecutive frames), or 'patches' (square tiles of each frame)
         to_uint8: Normalize images to uint8 (0-255) range
+        normalization: uint8 normalization mode - 'max', 'percentile', or 'frame'
+        percentiles: Low and high percentiles for 'percentile' normalization
+        lazy: Stream frames from disk rather than loading each stack into memory,
+            bounding peak memory by a few frames per recording
+        channels: Which channels of multi-channel recordings to export -
+            'first' (the lowest-numbered channel's stack), or 'all' (every
+            channel's stack, read concurrently and stacked so that each
+            image is (channel, height, width); see `toile.tiff_import.ChannelMode`)
         filename_parser: Optional function to extract metadata from filenames
-        shard_size: Maximum size in bytes for each tar shard
-        compressed: Enable compression (not yet implemented)
+        frame_pattern_full: Glob pattern for the full stack file of each
+            recording (as for `toile.tiff_import.load_tiff`)
+        frame_pattern: Glob pattern for the files of a stack split across
+            several files (as for `toile.tiff_import.load_tiff`)
+        movie_metadata: Where movie-level metadata goes for frame exports -
+            'inline' (copied into every frame) or 'sidecar' (written once per
+            recording to `{stem}-recordings.jsonl`, referenced by key)
+        resume: Continue an earlier export into the same directory, skipping
+            recordings that its manifest (`{stem}-manifest.jsonl`) lists as
+            completely exported and whose files are unchanged; everything
+            else is appended to fresh shards
+        plan: Plan of the export made earlier by `toile.plan.plan_export`
+            (or a path to one saved as JSON); its recordings are exported
+            instead of those matching `_inputs`. By default, the inputs are
+            planned afresh
+        metadata_cache: SQLite cache of stack headers and collated OME
+            metadata (see `toile.metadata.MetadataCache`), consulted before
+            reading any recording's metadata, and updated with what is read
+        clip_length: Frames per clip ('clips' only)
+        clip_stride: Frames between the starts of consecutive clips ('clips' only)
+        clip_padding: How clips running past the end of a recording are
+            handled - 'none' (dropped), 'zero', or 'edge' ('clips' only)
+        patch_size: Height and width of each patch ('patches' only)
+        patch_overlap: Pixels shared by neighbouring patches ('patches' only)
+        patch_min_foreground: Minimum fraction of a patch's pixels brighter
+            than its frame's mean for it to be exported; 0 exports every
+            patch ('patches' only)
+        chunk_frames: Frames per chunk of the stored stack ('movies' only)
+        chunk_tile: Height and width of each chunk's spatial tile, or 0 for
+            full frames ('movies' only)
+        image_codec: Encoding of each sample's image - 'atdata' (whole-sample
+            msgpack), 'raw', 'npy', 'zstd', 'lz4', or 'png16' (see
+            `toile.codecs`; 'frames' and 'patches' only)
+        image_codec_level: Compression level for `image_codec` (codec default if None)
+        dedup: Skip duplicate content - 'none', 'recordings' (recordings whose
+            content digest matches an exported one), or 'frames' (also
+            individual frames matching one already written; 'frames' only)
+        shard_size: Maximum size in bytes for each tar shard (compressed bytes
+            on disk, if compression is enabled)
+        balance_shards: Plan shard boundaries from predicted sample sizes
+            (using the stack shapes in the TIFF headers), so that all shards
+            are about equally large and within about `shard_size` before
+            compression, instead of filling each greedily
+        samples_per_shard: Put exactly this many samples in each shard (the
+            last holds the remainder), planned as for `balance_shards`; 0 to
+            disable
+        shuffle_buffer: Shuffle samples across recordings as they are
+            written, through a buffer of this many serialized samples (not
+            for 'movies'; 0 to disable)
+        shuffle_seed: Seed of the shuffle (nondeterministic if None)
+        compressed: Compress shards as they are written
+        compression: Shard compression codec - 'gzip' or 'zstd' (requires `zstandard`)
+        compression_level: Codec compression level (codec default if None)
+        compression_threads: Worker threads for zstd compression (0 for none)
+        workers: Number of processes decoding and serializing recordings;
+            samples are still written by this process in input order, so
+            shard contents do not depend on the worker count
+        prefetch: Number of upcoming recordings to load in background threads
+            while the current one is written (serial export only; 0 to disable)
+        prefetch_memory: Memory budget in bytes for prefetched recordings,
+            or, with `workers > 1`, for serialized recordings coming back
+            from workers; prefetch depth and the number of recordings in
+            flight back off automatically for large stacks
         verbose: Print detailed progress messages
         **kwargs: Additional arguments passed to WebDataset writer
 
@@ -280,96 +1467,442 @@ def export_tiffs(
         else _stem
     )
 
+    if kind not in get_args( ExportKind ):
+        raise ValueError( f'Unrecognized export kind: {kind}' )
+    if channels not in get_args( ChannelMode ):
+        raise ValueError( f'Unrecognized channel mode: {channels}' )
+    if movie_metadata not in get_args( MovieMetadataMode ):
+        raise ValueError( f'Unrecognized movie metadata mode: {movie_metadata}' )
+
+    if image_codec not in get_args( ImageCodecName ):
+        raise ValueError( f'Unrecognized image codec: {image_codec}' )
+    if image_codec != 'atdata' and kind not in ('frames', 'patches'):
+        raise ValueError( f'Image codecs only apply to frame and patch exports (got {kind})' )
+    if dedup not in get_args( DedupMode ):
+        raise ValueError( f'Unrecognized dedup mode: {dedup}' )
+    if dedup == 'frames' and kind != 'frames':
+        raise ValueError( f'Frame deduplication only applies to frame exports (got {kind})' )
+
+    plan_shards = balance_shards or samples_per_shard > 0
+    if samples_per_shard < 0:
+        raise ValueError( f'Samples per shard must be positive (got {samples_per_shard})' )
+    if plan_shards and ( dedup == 'frames' or ( kind == 'patches' and patch_min_foreground > 0 ) ):
+        raise ValueError( 'Shards cannot be planned when samples are filtered by content' )
+    if shuffle_buffer < 0:
+        raise ValueError( f'Shuffle buffer size must be positive (got {shuffle_buffer})' )
+    if shuffle_buffer > 0 and kind == 'movies':
+        raise ValueError( 'Movies are written in pieces and cannot be shuffled' )
+
+    sample_kwargs: dict[str, Any] = dict()
+    if kind == 'frames':
+        sample_kwargs = dict(
+            image_codec = image_codec,
+            image_codec_level = image_codec_level,
+            frame_digests = dedup == 'frames',
+        )
+    elif kind == 'clips':
+        # Fail early on bad clip settings
+        _clip_starts( 0, clip_length, clip_stride, clip_padding )
+        sample_kwargs = dict(
+            clip_length = clip_length,
+            clip_stride = clip_stride,
+            clip_padding = clip_padding,
+        )
+    elif kind == 'patches':
+        _patch_starts( patch_size, patch_size, patch_overlap )
+        sample_kwargs = dict(
+            patch_size = patch_size,
+            patch_overlap = patch_overlap,
+            patch_min_foreground = patch_min_foreground,
+            image_codec = image_codec,
+            image_codec_level = image_codec_level,
+        )
+    elif kind == 'movies':
+        _chunk_shape( (0, 1, 1), chunk_frames, chunk_tile )
+        sample_kwargs = dict(
+            chunk_frames = chunk_frames,
+            chunk_tile = chunk_tile,
+        )
+
+    # Keys combine the recording's index within the export with the frame
+    # index, zero-padded so that keys sort in write order
+    recording_key_template = 'tseries-{i_recording:06d}'
     if kind == 'frames':
-        key_template = 'tseries-{i_dataset}-frame-{i_group}'
+        key_template = recording_key_template + '-frame-{i_group:06d}'
+    elif kind == 'clips':
+        key_template = recording_key_template + '-clip-{i_group:06d}'
+    elif kind == 'patches':
+        key_template = recording_key_template + '-frame-{i_group:06d}-patch-{i_patch:04d}'
     else:
-        # TODO Make explicit for other types
-        key_template = 'sample-{i_dataset}-{i_group}'
+        # One sample per recording
+        key_template = recording_key_template
 
     # Setup output directory
     output_dir.mkdir( parents = True, exist_ok = True )
-    output_pattern = (output_dir / f'{stem}-%06d.tar').as_posix()
+    output_pattern = _shard_pattern( output_dir, stem,
+        compression if compressed else None,
+    )
 
-    # Parse input globs
-    input_globs = [ glob( p.as_posix() )
-                    for p in inputs ]
-    
-    input_paths = []
-    for g in input_globs:
-        input_paths += [ Path( p )
-                         for p in g ]
+    cache = MetadataCache( metadata_cache ) if metadata_cache is not None else None
+
+    # Discover inputs, listing each directory once. Recordings are
+    # fingerprinted here, before loading, so that changes made while the
+    # export runs are picked up by the next resume
+    if plan is None:
+        plan = plan_export( inputs,
+            frame_pattern_full = frame_pattern_full,
+            frame_pattern = frame_pattern,
+            read_headers = plan_shards,
+            metadata_cache = cache,
+        )
+    elif not isinstance( plan, ExportPlan ):
+        plan = ExportPlan.load( plan )
+
+    input_paths = plan.paths
+    planned = dict( zip( input_paths, plan.recordings ) )
+    fingerprints: dict[Path, dict[str, int]] = dict()
+    stack_paths: dict[Path, Path | list[Path]] = dict()
+    for cur_path, cur_recording in planned.items():
+        fingerprints[cur_path] = cur_recording.fingerprint
+        if channels == 'all':
+            # Plans saved without channel files leave `load_tiff` to find them
+            if len( cur_recording.channel_paths ) > 0:
+                stack_paths[cur_path] = [ Path( x ) for x in cur_recording.channel_paths ]
+        elif cur_recording.stack_path is not None:
+            stack_paths[cur_path] = Path( cur_recording.stack_path )
+    _printv( f'🗺️ Planned {len( input_paths )} recordings' )
+
+    manifest = ExportManifest( _manifest_path( output_dir, stem ),
+        resume = resume,
+        index_path = _index_path( output_dir, stem ),
+    )
+
+    n_skipped = 0
+    if resume:
+        pending_paths = [ cur_path
+                          for cur_path in input_paths
+                          if not manifest.is_current( _recording_id( cur_path ),
+                                                      fingerprints[cur_path] ) ]
+        n_skipped = len( input_paths ) - len( pending_paths )
+        input_paths = pending_paths
+
+        # Shards that were never finalized hold incomplete data
+        for cur_removed in _remove_shards_from( output_dir, stem, manifest.next_shard ):
+            _printv( f'🗑️ Removed unfinished shard {cur_removed}' )
+
+        # Recordings exported again (because they changed, or not all of
+        # their shards were finalized) replace their earlier samples
+        for cur_path in input_paths:
+            cur_entry = manifest.recordings.get( _recording_id( cur_path ) )
+            if cur_entry is not None and cur_entry['shards'] is not None and 'index' in cur_entry:
+                manifest.drop_recording( recording_key_template.format( i_recording = cur_entry['index'] ),
+                    cur_entry['shards'][0],
+                )
+        _printv( f'⏩ Skipping {n_skipped} already-exported recordings' )
+
+    # Skip recordings whose content was already exported, judging by cheap
+    # digests of their raw frames (see `toile._dedup`). Digests are taken
+    # from the movies loaded for writing, unless those are normalized, or
+    # shards are planned (which needs the final set of recordings up front);
+    # then they are taken beforehand, opening recordings concurrently
+    digests: dict[Path, str] = dict()
+    seen_recordings: dict[str, str] = dict()
+    n_duplicates = 0
+    digest_early = dedup != 'none' and ( plan_shards or to_uint8 )
+    digest_late = dedup != 'none' and not digest_early
+    if dedup != 'none':
+        for cur_id, cur_entry in manifest.recordings.items():
+            if 'digest' in cur_entry and manifest.is_current( cur_id, cur_entry['fingerprint'] ):
+                seen_recordings.setdefault( cur_entry['digest'], cur_id )
+
+    def _is_duplicate( cur_path: Path, cur_digest: str ) -> bool:
+        """Record a recording's digest, or, if its content was already
+        exported, record it as a duplicate."""
+        nonlocal n_duplicates
+        cur_id = _recording_id( cur_path )
+        if cur_digest in seen_recordings and seen_recordings[cur_digest] != cur_id:
+            _printv( f'♻️ Skipping {cur_path}, a duplicate of {seen_recordings[cur_digest]}' )
+            manifest.record_duplicate( cur_id, fingerprints[cur_path],
+                duplicate_of = seen_recordings[cur_digest],
+                digest = cur_digest,
+            )
+            n_duplicates += 1
+            return True
+
+        seen_recordings[cur_digest] = cur_id
+        digests[cur_path] = cur_digest
+        return False
+
+    if digest_early:
+        unique_paths = []
+        for cur_path, cur_digest in zip( input_paths, _recording_digests( input_paths, stack_paths,
+                    channels = channels,
+                    metadata_cache = cache,
+                    frame_pattern_full = frame_pattern_full,
+                    frame_pattern = frame_pattern,
+                ) ):
+            # Recordings that can't be digested are left for the export to report
+            if isinstance( cur_digest, Exception ) or not _is_duplicate( cur_path, cur_digest ):
+                unique_paths.append( cur_path )
+
+        input_paths = unique_paths
+        _printv( f'♻️ Skipped {n_duplicates} duplicate recordings' )
+
+    # Never reuse recording indices, so that keys are unique across runs
+    i_recording_start = manifest.reserve_indices( len( input_paths ) )
+    recording_kwargs = []
+    for i in range( len( input_paths ) ):
+        cur_i_recording = i_recording_start + i
+        recording_kwargs.append( dict(
+            i_recording = cur_i_recording,
+            recording_key = recording_key_template.format( i_recording = cur_i_recording ),
+            movie_metadata = movie_metadata,
+        ) )
+
+    # Choose shard boundaries up front from the predicted sample sizes
+    shard_counts = None
+    if plan_shards:
+        sample_nbytes = []
+        for cur_path in input_paths:
+            sample_nbytes += _predict_sample_nbytes( planned[cur_path], kind, sample_kwargs, to_uint8, channels )
+        shard_counts = _plan_shard_counts( sample_nbytes,
+            shard_size = shard_size,
+            samples_per_shard = samples_per_shard if samples_per_shard > 0 else None,
+        )
+        _printv( f'⚖️ Planned {len( shard_counts )} shards for {len( sample_nbytes )} samples' )
+
+    load_kwargs = dict(
+        frame_pattern_full = frame_pattern_full,
+        frame_pattern = frame_pattern,
+        to_uint8 = to_uint8,
+        normalization = normalization,
+        percentiles = tuple( percentiles ),
+        lazy = lazy,
+        channels = channels,
+        filename_parser = filename_parser,
+        metadata_cache = cache,
+    )
 
     # Start building dataset
     n_succeeded = 0
     n_failed = 0
 
-    with wds.writer.ShardWriter( output_pattern,
+    def _report_failure( action: str, cur_input_path: Path, e: Exception ):
+        _printv( ' Failed 🔴' )
+        _printv( 8 * ' ', e )
+        if not verbose:
+            print( f'Failed to {action} movie {cur_input_path}:' )
+            print( 4 * ' ', e )
+
+    recordings_path = output_dir / f'{stem}-recordings.jsonl'
+
+    def _write_recording_entry( entry: dict[str, Any] ):
+        if recordings_file is not None:
+            recordings_file.write( json.dumps( entry, default = str ) + '\n' )
+
+    # Keys of the frames written so far, by frame digest
+    seen_frames: Optional[dict[str, str]] = dict() if dedup == 'frames' else None
+
+    # Recordings whose samples are being written, until committed, with the
+    # shard each started in (see `ExportManifest.drop_recording`)
+    uncommitted: dict[str, int] = dict()
+
+    def _commit_recording( cur_input_path: Path,
+                cur_kwargs: dict[str, Any],
+                keys: list[str],
+                shards: Optional[tuple[int, int]],
+                duplicates: list[tuple[str, str]],
+            ):
+        if recordings_file is not None:
+            recordings_file.flush()
+        uncommitted.pop( cur_kwargs['recording_key'], None )
+
+        extra: dict[str, Any] = dict()
+        if cur_input_path in digests:
+            extra['digest'] = digests[cur_input_path]
+        if len( duplicates ) > 0:
+            _printv( f' (skipped {len( duplicates )} duplicate frames)', end = '' )
+            extra['duplicate_frames'] = [ list( x ) for x in duplicates ]
+
+        manifest.record_recording( _recording_id( cur_input_path ),
+            fingerprints[cur_input_path],
+            shards,
+            keys,
+            index = cur_kwargs['i_recording'],
+            **extra,
+        )
+
+    def _write_recording( cur_input_path: Path,
+                cur_kwargs: dict[str, Any],
+                cur_entry: dict[str, Any],
+                cur_samples: Iterable[dict[str, Any]],
+            ):
+        manifest.describe_recording( cur_entry )
+        cur_key = cur_kwargs['recording_key']
+        uncommitted[cur_key] = manifest.next_shard
+        n_seen = 0 if seen_frames is None else len( seen_frames )
+
+        try:
+            if shuffler is None:
+                cur_keys, cur_shards, cur_duplicates = _write_samples( dest, cur_samples, seen_frames )
+                _write_recording_entry( cur_entry )
+                _commit_recording( cur_input_path, cur_kwargs, cur_keys, cur_shards, cur_duplicates )
+                return
+
+            # Committed once the buffer has written all of its samples
+            cur_duplicates: list[tuple[str, str]] = []
+            if seen_frames is not None:
+                cur_samples = _skip_duplicates( cur_samples, seen_frames, cur_duplicates )
+            shuffler.add_recording( cur_samples,
+                lambda keys, shards: _commit_recording( cur_input_path, cur_kwargs, keys, shards, cur_duplicates ),
+            )
+            _write_recording_entry( cur_entry )
+
+        except Exception:
+            # Samples it already wrote are dropped from the indices, and
+            # can't be what later frames duplicate
+            if cur_key in uncommitted:
+                manifest.drop_recording( cur_key, uncommitted.pop( cur_key ) )
+            if seen_frames is not None:
+                for cur_digest in list( seen_frames )[n_seen:]:
+                    del seen_frames[cur_digest]
+            raise
+
+    with manifest, ShardWriter( output_pattern,
         maxsize = shard_size,
-    ) as dest:
-        
-        for i_input, cur_input_path in enumerate( input_paths ):
-            cur_input_path = Path( cur_input_path )
+        shard_counts = shard_counts,
+        compression = compression if compressed else None,
+        compression_level = compression_level,
+        compression_threads = compression_threads,
+        start_shard = manifest.next_shard,
+        post = lambda fname: manifest.record_shard( dest.current_shard, fname, dest.samples ),
+    ) as dest, (
+        open( recordings_path, 'a' if resume else 'w' ) if movie_metadata == 'sidecar'
+        else nullcontext()
+    ) as recordings_file, _dropping_uncommitted( manifest, uncommitted ):
+
+        shuffler = (
+            _ShuffleBuffer( dest, shuffle_buffer, shuffle_seed ) if shuffle_buffer > 0
+            else None
+        )
+
+        if workers > 1:
+            # Decode and serialize in worker processes; write here, in order
+
+            for (cur_input_path, cur_result), cur_kwargs in zip(
+                _iter_prepared_recordings( input_paths, workers,
+                    kind, key_template, load_kwargs, sample_kwargs,
+                    recording_kwargs = [ dict( cur_kwargs, stack_path = stack_paths.get( cur_path ), digest = digest_late )
+                                         for cur_path, cur_kwargs in zip( input_paths, recording_kwargs ) ],
+                    memory = prefetch_memory,
+                    # Serialized samples hold every frame, however loaded
+                    estimate_nbytes = lambda x: _estimate_recording_nbytes( x, load_kwargs,
+                        stack_paths.get( x ),
+                        lazy = False,
+                    ),
+                ),
+                recording_kwargs,
+            ):
+                _printv( f'🤔 Working on {cur_input_path} ...' )
 
-            _printv( f'🤔 Working on {cur_input_path} ...' )
+                #
+                _printv( '    💽 Loading ...', end = '' )
 
-            #
-            _printv( '    💽 Loading ...', end = '' )
+                if isinstance( cur_result, Exception ):
+                    _report_failure( 'export', cur_input_path, cur_result )
+                    n_failed += 1
+                    continue
+                cur_entry, cur_samples, cur_digest = cur_result
 
-            try:
-                cur_ds = load_tiff( cur_input_path,
-                    to_uint8 = to_uint8,
-                    filename_parser = filename_parser,
-                )
                 _printv( ' Done 🟢' )
-            
-            except Exception as e:
-                _printv( ' Failed 🔴' )
-                _printv( 8 * ' ', e )
-                if not verbose:
-                    print( f'Failed to load movie {cur_input_path}:' )
-                    print( 4 * ' ', e )
 
-                n_failed += 1
-                continue
+                if cur_digest is not None and _is_duplicate( cur_input_path, cur_digest ):
+                    continue
 
-            #
-            _printv( '    📝 Writing to archive ...', end = '' )
+                #
+                _printv( '    📝 Writing to archive ...', end = '' )
 
-            try:
+                try:
+                    _write_recording( cur_input_path, cur_kwargs, cur_entry, cur_samples )
+                    _printv( ' Done 🟢' )
 
-                if kind == 'movies':
-                    raise NotImplementedError()
-                    # _write_movie_entire( cur_ds, i_sample, dest )
-                    # cur_final = i_sample + 1
+                except Exception as e:
+                    _report_failure( 'export', cur_input_path, e )
+                    n_failed += 1
+                    continue
 
-                elif kind == 'frames':
-                    cur_final = _write_movie_frames( cur_ds, dest,
-                        key_template = key_template,
-                        # i_start = i_dataset,
-                    )
+                #
+
+                _printv( '    ✅ Done.' )
+                n_succeeded += 1
+
+        else:
+            for (cur_input_path, cur_ds), cur_kwargs in zip(
+                _iter_loaded_recordings( input_paths, load_kwargs,
+                    prefetch, prefetch_memory,
+                    stack_paths = stack_paths,
+                ),
+                recording_kwargs,
+            ):
+                _printv( f'🤔 Working on {cur_input_path} ...' )
+
+                #
+                _printv( '    💽 Loading ...', end = '' )
+
+                if isinstance( cur_ds, Exception ):
+                    _report_failure( 'load', cur_input_path, cur_ds )
+                    n_failed += 1
+                    continue
 
-                elif kind == 'clips':
-                    raise NotImplementedError()
-                
-                else:
-                    raise ValueError( f'Unrecognized export kind: {kind}' )
-                
                 _printv( ' Done 🟢' )
+
+                if digest_late:
+                    try:
+                        # Sampled from the movie as loaded for writing
+                        cur_duplicate = _is_duplicate( cur_input_path, _movie_digest( cur_ds ) )
+                    except Exception as e:
+                        close_movie( cur_ds )
+                        _report_failure( 'load', cur_input_path, e )
+                        n_failed += 1
+                        continue
+                    if cur_duplicate:
+                        close_movie( cur_ds )
+                        continue
+
+                #
+                _printv( '    📝 Writing to archive ...', end = '' )
+
+                try:
+                    cur_entry = _recording_entry( cur_ds, cur_kwargs['recording_key'], cur_input_path )
+                    _write_recording( cur_input_path, cur_kwargs, cur_entry,
+                        # Shuffled samples outlive the movie, so can't reference it
+                        _iter_recording_samples( cur_ds, kind, key_template, sample_kwargs,
+                            zero_copy = shuffler is None,
+                            **cur_kwargs,
+                        ),
+                    )
+                
+                    _printv( ' Done 🟢' )
             
-            except Exception as e:
-                _printv( ' Failed 🔴' )
-                _printv( 8 * ' ', e )
-                if not verbose:
-                    print( f'Failed to export movie {cur_input_path}:' )
-                    print( 4 * ' ', e )
+                except Exception as e:
+                    _report_failure( 'export', cur_input_path, e )
+                    n_failed += 1
+                    continue
 
-                n_failed += 1
-                continue
+                finally:
+                    close_movie( cur_ds )
 
-            #
+                #
         
-            _printv( '    ✅ Done.' )
-            n_succeeded += 1
+                _printv( '    ✅ Done.' )
+                n_succeeded += 1
+
+        if shuffler is not None:
+            _printv( '🔀 Writing the rest of the shuffle buffer ...' )
+            shuffler.flush()
+
+    if digest_late:
+        _printv( f'♻️ Skipped {n_duplicates} duplicate recordings' )
 
 ##
 
@@ -380,6 +1913,9 @@ def export_test(
         kind: ExportKind = 'frames',
         #
         compressed: bool = False,
+        compression: ShardCompression = 'gzip',
+        compression_level: int | None = 4,
+        compression_threads: int = 0,
         #
         **kwargs
     ) -> None:
@@ -388,12 +1924,18 @@ def export_test(
     Creates random image data for testing WebDataset pipelines without
     requiring actual microscopy data. Useful for development and testing.
 
+    Shards are compressed inline as they are written, so memory use does not
+    grow with shard size and no separate compression pass is needed.
+
     Args:
         output_dir: Directory to write test dataset
         stem: Optional stem for output filenames (default: output directory name)
         kind: Dataset type - currently only 'frames' is supported
-        compressed: Enable gzip compression of tar files
-        **kwargs: Additional arguments passed to WebDataset ShardWriter
+        compressed: Enable compression of tar files
+        compression: Shard compression codec - 'gzip' or 'zstd' (requires `zstandard`)
+        compression_level: Codec compression level (codec default if None)
+        compression_threads: Worker threads for zstd compression (0 for none)
+        **kwargs: Additional arguments passed to the ShardWriter
 
     Returns:
         None (writes files to disk)
@@ -410,19 +1952,20 @@ def export_test(
     
     Path( output_dir ).mkdir( parents = True, exist_ok = True )
 
-    # wds_extension = '.tar.gz' if compressed else '.tar'
-    wds_extension = '.tar'
-
-    wds_pattern = (
-        Path( output_dir )
-        / f'{stem}-%06d{wds_extension}'
-    ).as_posix()
+    wds_pattern = _shard_pattern( output_dir, stem,
+        compression if compressed else None,
+    )
 
     if kind == 'frames':
 
         print( 'Exporting frames ...' )
 
-        with wds.writer.ShardWriter( wds_pattern, **kwargs ) as sink:
+        with ShardWriter( wds_pattern,
+            compression = compression if compressed else None,
+            compression_level = compression_level,
+            compression_threads = compression_threads,
+            **kwargs
+        ) as sink:
             for i in tqdm( range( image_planes ) ):
                 cur_frame = schema.ImageSample(
                     data = np.random.randint( 32,767, size = image_size )
@@ -431,26 +1974,6 @@ def export_test(
     
     else:
         raise NotImplementedError()
-
-    if compressed:
-
-        print( 'Compressing outputs ...' )
-
-        shard_glob = (
-            Path( output_dir )
-            / f'{stem}-*{wds_extension}'
-        ).as_posix()
-
-        for p in glob( shard_glob ):
-            print( f'    {p}', end = '', flush = True )
-            with open( p, 'rb' ) as f_src:
-                p_dest = p + '.gz'
-                print( f' -> {p_dest} ...', end = '', flush = True )
-                with gzip.open( p_dest, 'wb', compresslevel = 4 ) as f_dest:
-                    f_dest.write( f_src.read() )
-                print( ' Done.' )
-            
-            os.remove( p )
     
     print( 'Done' )
 
@@ -464,90 +1987,410 @@ def _cli_export_test_frames(
             output: str,
             stem: str = '',
             compressed: bool = False,
+            compression: str = 'gzip',
+            compression_level: int = 4,
+            compression_threads: int = 0,
         ):
     """CLI command: Generate a synthetic test dataset of random frames.
 
     Usage: toile export test-frames OUTPUT [--stem STEM] [--compressed]
+        [--compression gzip|zstd] [--compression-level N] [--compression-threads N]
     """
+    if compression not in get_args( ShardCompression ):
+        raise ValueError( f'Unrecognized shard compression: {compression}' )
+
     export_test( output, stem,
         compressed = compressed,
+        compression = compression,
+        compression_level = compression_level,
+        compression_threads = compression_threads,
         #
         kind = 'frames',
     )
 
-def _standardize_config_args(
-                input: _Pathable,
-                stem: str = '',
-                #
-                shard_size: int = -1,
-                pds: bool = False,
-                #
-                uint8: bool = False,
-                compressed: bool = False,
-            ) -> ExportConfig:
+class _CliOption( NamedTuple ):
+    """An option shared by `toile export` commands."""
+    annotation: Any
+    """Type of the option's value"""
+    default: Any
+    """Value of the option when it isn't given"""
+    help: str
+    """Help text of the option"""
+
+_EXPORT_OPTIONS: dict[str, _CliOption] = dict(
+    stem = _CliOption( str, '',
+        'Output filename stem (default: output directory name)' ),
+    shard_size = _CliOption( int, -1,
+        'Maximum shard size in bytes (-1 for auto)' ),
+    pds = _CliOption( bool, False,
+        'Use PDS-compatible shard size (38MB for Bluesky)' ),
+    balance_shards = _CliOption( bool, ExportConfig.balance_shards,
+        'Plan shards of about equal size (within the shard size) from sample sizes'
+        ' predicted from the TIFF headers, instead of filling each in turn' ),
+    samples_per_shard = _CliOption( int, ExportConfig.samples_per_shard,
+        'Put exactly this many samples in each shard (0 to disable)' ),
+    uint8 = _CliOption( bool, ExportConfig.to_uint8,
+        'Normalize images to uint8 (0-255) range' ),
+    compressed = _CliOption( bool, ExportConfig.compressed,
+        'Compress shards as they are written' ),
+    lazy = _CliOption( bool, ExportConfig.lazy,
+        'Stream frames from disk (memory-mapped where possible) to bound memory use' ),
+    workers = _CliOption( int, ExportConfig.workers,
+        'Number of worker processes for decoding and serializing recordings' ),
+    prefetch = _CliOption( int, ExportConfig.prefetch,
+        'Number of upcoming recordings to load while the current one is written' ),
+    prefetch_memory = _CliOption( int, ExportConfig.prefetch_memory,
+        'Memory budget in bytes for prefetched recordings, or for serialized'
+        ' recordings in flight from worker processes' ),
+    normalization = _CliOption( str, ExportConfig.normalization,
+        "uint8 normalization mode - 'max', 'percentile', or 'frame'" ),
+    percentile_low = _CliOption( float, ExportConfig.percentiles[0],
+        "Percentile mapped to 0 by 'percentile' normalization" ),
+    percentile_high = _CliOption( float, ExportConfig.percentiles[1],
+        "Percentile mapped to 255 by 'percentile' normalization" ),
+    compression = _CliOption( str, ExportConfig.compression,
+        "Shard compression codec - 'gzip' or 'zstd' (requires `zstandard`)" ),
+    compression_level = _CliOption( Optional[int], ExportConfig.compression_level,
+        'Codec compression level (codec default if unset)' ),
+    compression_threads = _CliOption( int, ExportConfig.compression_threads,
+        'Worker threads for zstd compression (0 for none)' ),
+    movie_metadata = _CliOption( str, ExportConfig.movie_metadata,
+        "'inline' to copy movie metadata into every sample (or each movie's"
+        " header), or 'sidecar' to write it once per recording to"
+        ' `{stem}-recordings.jsonl`' ),
+    resume = _CliOption( bool, ExportConfig.resume,
+        'Continue an interrupted or earlier export into OUTPUT, skipping'
+        ' recordings already exported and unchanged' ),
+    dedup = _CliOption( str, ExportConfig.dedup,
+        "Skip duplicates - 'none', 'recordings' (recordings with the same content"
+        " as one already exported), or 'frames' (also frames identical to one"
+        ' already written; frame exports only)' ),
+    channels = _CliOption( str, ExportConfig.channels,
+        "Channels of multi-channel recordings to export - 'first' (the"
+        " lowest-numbered channel), or 'all' (every channel, stacked into"
+        ' (channel, height, width) images)' ),
+    metadata_cache = _CliOption( Optional[str], ExportConfig.metadata_cache,
+        'SQLite cache of stack headers and OME metadata to consult and update'
+        ' (see `toile metadata build`)' ),
+    verbose = _CliOption( bool, False,
+        'Print detailed progress information' ),
+)
+"""Options of every `toile export` command exporting recordings"""
+
+_SHUFFLE_OPTIONS: dict[str, _CliOption] = dict(
+    shuffle_buffer = _CliOption( int, ExportConfig.shuffle_buffer,
+        'Shuffle samples across recordings as they are written, holding back'
+        ' this many samples (0 to disable)' ),
+    shuffle_seed = _CliOption( Optional[int], ExportConfig.shuffle_seed,
+        'Seed of the shuffle (random if unset)' ),
+)
+"""Options of the `toile export` commands writing many samples per recording"""
+
+_IMAGE_CODEC_OPTIONS: dict[str, _CliOption] = dict(
+    image_codec = _CliOption( str, ExportConfig.image_codec,
+        "Encoding of each sample's image - 'atdata' (default whole-sample"
+        " msgpack), 'raw', 'npy', 'zstd', 'lz4', or 'png16'" ),
+    image_codec_level = _CliOption( Optional[int], ExportConfig.image_codec_level,
+        'Compression level for the image codec (codec default if unset)' ),
+)
+"""Options of the `toile export` commands writing one image per sample"""
+
+def _export_options( *groups: dict[str, _CliOption] ) -> Callable[[Callable], Callable]:
+    """Give a `toile export` command the shared options in `groups`.
+
+    The options take the place of the command's `**options` in its
+    signature, after its own parameters, so that Typer parses them (with
+    their help text) like the command's own, and passes them on in
+    `**options`.
+    """
+    def _decorate( f: Callable ) -> Callable:
+        signature = inspect.signature( f )
+        params = [ x for x in signature.parameters.values()
+                   if x.kind is not inspect.Parameter.VAR_KEYWORD ]
+        params += [
+            inspect.Parameter( k, inspect.Parameter.KEYWORD_ONLY,
+                default = x.default,
+                annotation = Annotated[x.annotation, Option( help = x.help )],
+            )
+            for group in groups
+            for k, x in group.items()
+        ]
+        f.__signature__ = signature.replace( parameters = params )
+        f.__annotations__ = { x.name: x.annotation for x in params
+                              if x.annotation is not inspect.Parameter.empty }
+        return f
+    return _decorate
+
+def _run_export_command( ctx: Context,
+            kind: ExportKind,
+            input: Path,
+            output: Path,
+            verbose: bool = False,
+            **options: Any,
+        ) -> None:
+    """Run a `toile export` command, applying only the options given on the
+    command line over the settings of a YAML config, so that options left
+    at their defaults don't override it (see `_standardize_config_args`)."""
+    # By name, as later Typer versions bring their own copy of click's
+    # `ParameterSource`
+    given = { k: v for k, v in options.items()
+              if ctx.get_parameter_source( k ).name != 'DEFAULT' }
+    config = _standardize_config_args( input, **given )
+    _export_config( config, output, kind, verbose )
+
+# CLI options setting ExportConfig attributes of other names
+_CLI_SETTINGS = dict(
+    stem = 'output_stem',
+    uint8 = 'to_uint8',
+)
+
+def _standardize_config_args( input: _Pathable, **options: Any ) -> ExportConfig:
     """Normalize CLI arguments into an ExportConfig object.
 
-    Handles both YAML config files and direct file path inputs. Sets
-    appropriate default shard sizes based on target platform.
+    Handles both YAML config files and direct file path inputs. The options
+    given are applied over the settings of a YAML config, or over the
+    ExportConfig defaults for a direct input; options that are None are
+    taken as not given.
 
     Args:
         input: Path to YAML config file or direct input file/glob pattern
-        stem: Optional output filename stem
-        shard_size: Maximum shard size in bytes (-1 for auto-selection)
-        pds: If True, use PDS-compatible shard size (38MB for Bluesky)
-        uint8: Normalize images to uint8 range
-        compressed: Enable compression
+        options: Settings given on the command line, named as the options of
+            the export commands (see `_EXPORT_OPTIONS`) or as ExportConfig
+            attributes. `percentile_low` and `percentile_high` each set one
+            of the `percentiles`; a negative `shard_size` leaves it as it
+            is, or, with `pds`, sets the PDS-compatible shard size (38MB for
+            Bluesky)
 
     Returns:
         ExportConfig object with normalized settings
-    """
 
-    if shard_size < 0:
-        # Set default shard sizes based on target
+    Raises:
+        ValueError: If an option isn't an export setting, or a setting has
+            an unrecognized value
+    """
 
-        if pds:
-            # Limit for Bsky default PDS blob limit
-            shard_size = 38_000_000
-        else:
-            # Keep to `wds` standard of ≤ 1GB per shard (with overhead)
-            shard_size = 850_000_000
+    options = { _CLI_SETTINGS.get( k, k ): v for k, v in options.items()
+                if v is not None }
+    pds = options.pop( 'pds', False )
+    if options.get( 'shard_size', 0 ) < 0:
+        del options['shard_size']
+    if options.get( 'output_stem' ) == '':
+        del options['output_stem']
 
     input_path = Path( input )
     if input_path.suffix in ('.yaml', '.yml'):
         ret = _parse_config( input_path )
-
     else:
-        ret = ExportConfig(
-            inputs = [ input_path.as_posix() ],
-            output_stem = None if len( stem ) == 0 else stem,
-            shard_size = shard_size,
-            to_uint8 = uint8,
-            compressed = compressed,
+        ret = ExportConfig( inputs = [ input_path.as_posix() ] )
+
+    if 'percentile_low' in options or 'percentile_high' in options:
+        low, high = ret.percentiles
+        options['percentiles'] = (
+            options.pop( 'percentile_low', low ),
+            options.pop( 'percentile_high', high ),
         )
-    
+    if pds and 'shard_size' not in options:
+        # Limit for Bsky default PDS blob limit
+        options['shard_size'] = 38_000_000
+
+    unrecognized = set( options ) - { x.name for x in fields( ExportConfig ) }
+    if len( unrecognized ) > 0:
+        raise ValueError( f'Unrecognized export settings: {", ".join( sorted( unrecognized ) )}' )
+    ret = replace( ret, **options )
+
+    if ret.normalization not in get_args( NormalizationMode ):
+        raise ValueError( f'Unrecognized normalization mode: {ret.normalization}' )
+    if ret.compression not in get_args( ShardCompression ):
+        raise ValueError( f'Unrecognized shard compression: {ret.compression}' )
+    if ret.movie_metadata not in get_args( MovieMetadataMode ):
+        raise ValueError( f'Unrecognized movie metadata mode: {ret.movie_metadata}' )
+    if ret.clip_padding not in get_args( ClipPadding ):
+        raise ValueError( f'Unrecognized clip padding: {ret.clip_padding}' )
+    if ret.image_codec not in get_args( ImageCodecName ):
+        raise ValueError( f'Unrecognized image codec: {ret.image_codec}' )
+    if ret.dedup not in get_args( DedupMode ):
+        raise ValueError( f'Unrecognized dedup mode: {ret.dedup}' )
+    if ret.channels not in get_args( ChannelMode ):
+        raise ValueError( f'Unrecognized channel mode: {ret.channels}' )
+
     return ret
 
-# @app.command( 'movies' )
-# def _cli_export_movies(
-#             input: str,
-#             output: str,
-#             stem: str = '',
-#         ):
-#     export_tiffs( input, output, stem, kind = 'movies' )
+def _config_inputs( config: ExportConfig ) -> list[str]:
+    """Inputs to export with an ExportConfig: its `inputs`, or, if it has a
+    `catalog`, the paths of the cataloged recordings satisfying `where`."""
+    if config.catalog is None:
+        if config.where is not None:
+            raise ValueError( 'A `where` filter needs a `catalog` to select recordings from' )
+        return config.inputs
+    # Selected paths are literal, not patterns
+    return [ glob.escape( x ) for x in select_recordings( config.catalog, config.where ) ]
+
+def _export_config( config: ExportConfig,
+            output: _Pathable,
+            kind: ExportKind,
+            verbose: bool = False,
+        ) -> None:
+    """Run `export_tiffs` with the settings from an ExportConfig.
+
+    Args:
+        config: Export settings
+        output: Output directory for tar archives
+        kind: Export type (see `export_tiffs`)
+        verbose: Print detailed progress information
+    """
+    export_tiffs(
+        _config_inputs( config ),
+        output,
+        config.output_stem,
+        #
+        to_uint8 = config.to_uint8,
+        normalization = config.normalization,
+        percentiles = config.percentiles,
+        lazy = config.lazy,
+        channels = config.channels,
+        shard_size = float( config.shard_size ),
+        balance_shards = config.balance_shards,
+        samples_per_shard = config.samples_per_shard,
+        shuffle_buffer = config.shuffle_buffer,
+        shuffle_seed = config.shuffle_seed,
+        compressed = config.compressed,
+        compression = config.compression,
+        compression_level = config.compression_level,
+        compression_threads = config.compression_threads,
+        filename_parser = config.filename_parser,
+        frame_pattern_full = config.frame_pattern_full,
+        frame_pattern = config.frame_pattern,
+        movie_metadata = config.movie_metadata,
+        resume = config.resume,
+        #
+        clip_length = config.clip_length,
+        clip_stride = config.clip_stride,
+        clip_padding = config.clip_padding,
+        chunk_frames = config.chunk_frames,
+        chunk_tile = config.chunk_tile,
+        patch_size = config.patch_size,
+        patch_overlap = config.patch_overlap,
+        patch_min_foreground = config.patch_min_foreground,
+        image_codec = config.image_codec,
+        image_codec_level = config.image_codec_level,
+        dedup = config.dedup,
+        metadata_cache = config.metadata_cache,
+        #
+        workers = config.workers,
+        prefetch = config.prefetch,
+        prefetch_memory = config.prefetch_memory,
+        verbose = verbose,
+        #
+        kind = kind,
+    )
+
+@app.command( 'plan' )
+def _cli_export_plan(
+            input: Path,
+            output: Optional[Path] = None,
+            headers: bool = True,
+            threads: int = 16,
+            metadata_cache: Optional[str] = None,
+        ):
+    """CLI command: Show the recordings an export would include, without running it.
+
+    Expands the inputs (or selects them from a config's `catalog`), resolves
+    each recording's stack file, and reads its TIFF header, listing each
+    recording's stack shape, dtype, and size (or the reason it can't be
+    exported), followed by totals. Directories are listed and headers read
+    concurrently.
+
+    Usage: toile export plan INPUT [--output PLAN.json] [--no-headers] [--threads N]
+        [--metadata-cache CACHE]
+
+    Args:
+        input: Path to TIFF directory, glob pattern, or YAML config file
+        output: Optional JSON file to save the plan to (see `toile.plan.ExportPlan`)
+        headers: Read each stack's TIFF header for its shape and size
+        threads: Number of threads listing directories and reading headers
+        metadata_cache: SQLite cache of stack headers to consult and update
+            (see `toile metadata build`)
+
+    Example:
+        toile export plan config.yaml --output plan.json
+    """
+
+    config = _standardize_config_args( input, metadata_cache = metadata_cache )
+    plan = plan_export( _config_inputs( config ),
+        frame_pattern_full = config.frame_pattern_full,
+        frame_pattern = config.frame_pattern,
+        read_headers = headers,
+        threads = threads,
+        metadata_cache = (
+            MetadataCache( config.metadata_cache ) if config.metadata_cache is not None
+            else None
+        ),
+    )
+
+    for cur_recording in plan.recordings:
+        if cur_recording.error is not None:
+            print( f'🔴 {cur_recording.path}: {cur_recording.error}' )
+        elif cur_recording.shape is not None:
+            n_channels = len( cur_recording.channel_paths )
+            print( f'🟢 {cur_recording.path}: {tuple( cur_recording.shape )} {cur_recording.dtype}'
+                   f' ({cur_recording.nbytes / 1e6:.1f} MB)'
+                   + ( f' × {n_channels} channel files' if n_channels > 1 else '' ) )
+        else:
+            print( f'🟢 {cur_recording.path}: {cur_recording.file_nbytes / 1e6:.1f} MB on disk' )
+
+    n_failed = sum( x.error is not None for x in plan.recordings )
+    print( f'{len( plan.recordings )} recordings ({n_failed} with errors),'
+           f' {plan.file_nbytes / 1e9:.2f} GB on disk'
+           + ( f', {plan.nbytes / 1e9:.2f} GB of pixels' if headers else '' ) )
+
+    if output is not None:
+        plan.save( output )
+        print( f'Saved plan to {output}' )
+
+@app.command( 'movies' )
+@_export_options( _EXPORT_OPTIONS )
+def _cli_export_movies(
+            ctx: Context,
+            input: Path,
+            output: Path,
+            chunk_frames: int = ExportConfig.chunk_frames,
+            chunk_tile: int = ExportConfig.chunk_tile,
+            **options,
+        ):
+    """CLI command: Export TIFF stacks to WebDataset format as whole movies.
+
+    Stores each recording as one sample, with its stack cut into fixed-size
+    (time × tile) chunks so that readers can fetch a time range or spatial
+    crop without decoding the whole movie. Takes the options shared by the
+    export commands, plus the chunk settings below; a movie larger than the
+    shard size gets a shard to itself.
+
+    Usage: toile export movies INPUT OUTPUT [OPTIONS]
+
+    Args:
+        input: Path to TIFF directory or YAML config file, whose settings
+            the options given override
+        output: Output directory for tar archives
+        chunk_frames: Frames per chunk
+        chunk_tile: Height and width of each chunk's spatial tile (0 for full frames)
+        options: Options shared by the export commands (see `_EXPORT_OPTIONS`)
+
+    Example:
+        toile export movies /data/recordings /output/movies --chunk-frames 64 --chunk-tile 256
+    """
+    _run_export_command( ctx, 'movies', input, output,
+        chunk_frames = chunk_frames,
+        chunk_tile = chunk_tile,
+        **options,
+    )
 
 @app.command( 'frames' )
+@_export_options( _EXPORT_OPTIONS, _SHUFFLE_OPTIONS, _IMAGE_CODEC_OPTIONS )
 def _cli_export_frames(
+            ctx: Context,
             input: Path,
             output: Path,
-            stem: str = '',
-            #
-            shard_size: int = -1,
-            pds: bool = False,
-            #
-            uint8: bool = False,
-            compressed: bool = False,
-            #
-            verbose: bool = False,
+            **options,
         ):
     """CLI command: Export TIFF stacks to WebDataset format as individual frames.
 
@@ -557,40 +2400,98 @@ def _cli_export_frames(
     Usage: toile export frames INPUT OUTPUT [OPTIONS]
 
     Args:
-        input: Path to TIFF directory or YAML config file
+        input: Path to TIFF directory or YAML config file, whose settings
+            the options given override
         output: Output directory for tar archives
-        stem: Optional output filename stem
-        shard_size: Maximum shard size in bytes (-1 for auto)
-        pds: Use PDS-compatible shard size (38MB for Bluesky)
-        uint8: Normalize images to uint8 (0-255) range
-        compressed: Enable compression (not yet implemented)
-        verbose: Print detailed progress information
+        options: Options shared by the export commands (see
+            `_EXPORT_OPTIONS`, `_SHUFFLE_OPTIONS`, and `_IMAGE_CODEC_OPTIONS`)
 
     Example:
         toile export frames /data/recordings /output/dataset --uint8 --verbose
         toile export frames config.yaml /output/dataset --pds
+        toile export frames /data/recordings /output/dataset --image-codec zstd
     """
+    _run_export_command( ctx, 'frames', input, output, **options )
+
+@app.command( 'clips' )
+@_export_options( _EXPORT_OPTIONS, _SHUFFLE_OPTIONS )
+def _cli_export_clips(
+            ctx: Context,
+            input: Path,
+            output: Path,
+            clip_length: int = ExportConfig.clip_length,
+            clip_stride: int = ExportConfig.clip_stride,
+            clip_padding: str = ExportConfig.clip_padding,
+            **options,
+        ):
+    """CLI command: Export TIFF stacks to WebDataset format as fixed-length clips.
+
+    Cuts each recording into sliding windows of consecutive frames. Takes the
+    options shared by the export commands, plus the clip settings below.
 
-    config = _standardize_config_args(
-        input, stem, shard_size, pds, uint8, compressed,
+    Usage: toile export clips INPUT OUTPUT [OPTIONS]
+
+    Args:
+        input: Path to TIFF directory or YAML config file, whose settings
+            the options given override
+        output: Output directory for tar archives
+        clip_length: Frames per clip
+        clip_stride: Frames between the starts of consecutive clips
+        clip_padding: Clips running past the end of a recording are dropped
+            ('none'), or padded with zero frames ('zero') or copies of the
+            last frame ('edge')
+        options: Options shared by the export commands (see
+            `_EXPORT_OPTIONS` and `_SHUFFLE_OPTIONS`)
+
+    Example:
+        toile export clips /data/recordings /output/clips --clip-length 16 --clip-stride 4
+    """
+    _run_export_command( ctx, 'clips', input, output,
+        clip_length = clip_length,
+        clip_stride = clip_stride,
+        clip_padding = clip_padding,
+        **options,
     )
 
-    # TODO Implement compresison
-    if config.compressed:
-        warnings.warn( '* Compression not yet implemented' )
+@app.command( 'patches' )
+@_export_options( _EXPORT_OPTIONS, _SHUFFLE_OPTIONS, _IMAGE_CODEC_OPTIONS )
+def _cli_export_patches(
+            ctx: Context,
+            input: Path,
+            output: Path,
+            patch_size: int = ExportConfig.patch_size,
+            patch_overlap: int = ExportConfig.patch_overlap,
+            patch_min_foreground: float = ExportConfig.patch_min_foreground,
+            **options,
+        ):
+    """CLI command: Export TIFF stacks to WebDataset format as square patches of each frame.
 
-    export_tiffs(
-        config.inputs,
-        output,
-        config.output_stem,
-        #
-        to_uint8 = config.to_uint8,
-        shard_size = float( config.shard_size ),
-        filename_parser = config.filename_parser,
-        #
-        verbose = verbose,
-        #
-        kind = 'frames'
+    Tiles every frame with fixed-size patches, optionally dropping patches
+    with little foreground. Takes the options shared by the export commands,
+    plus the patch settings below.
+
+    Usage: toile export patches INPUT OUTPUT [OPTIONS]
+
+    Args:
+        input: Path to TIFF directory or YAML config file, whose settings
+            the options given override
+        output: Output directory for tar archives
+        patch_size: Height and width of each patch
+        patch_overlap: Pixels shared by neighbouring patches
+        patch_min_foreground: Minimum fraction of a patch's pixels brighter
+            than its frame's mean intensity for the patch to be exported
+            (0 exports every patch)
+        options: Options shared by the export commands (see
+            `_EXPORT_OPTIONS`, `_SHUFFLE_OPTIONS`, and `_IMAGE_CODEC_OPTIONS`)
+
+    Example:
+        toile export patches /data/recordings /output/patches --patch-size 128 --patch-min-foreground 0.1
+    """
+    _run_export_command( ctx, 'patches', input, output,
+        patch_size = patch_size,
+        patch_overlap = patch_overlap,
+        patch_min_foreground = patch_min_foreground,
+        **options,
     )
 
 
@@ -0,0 +1,242 @@
+"""
+Building and inspecting persistent metadata caches.
+
+A `MetadataCache` holds the stack headers and collated OME metadata of
+recordings in an SQLite database (see `toile._metadata_cache`), so that
+planning, estimating, and loading recordings that haven't changed skips
+reading and parsing their metadata. Caches fill up as recordings are read
+with one (e.g., `export_tiffs( ..., metadata_cache = ... )`), or in bulk,
+ahead of time, with `build_metadata_cache` (`toile metadata build`).
+"""
+
+##
+# Imports
+
+import json
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from typer import Typer
+
+from ._common import (
+    _Pathable,
+)
+from ._metadata_cache import (
+    MetadataCache,
+)
+from .export import (
+    _config_inputs,
+    _standardize_config_args,
+)
+from .plan import (
+    plan_export,
+)
+from .tiff_import import (
+    MetadataParser,
+    _inspect_stack,
+    _read_ome_metadata,
+)
+
+from typing import (
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    get_args,
+)
+
+
+##
+# Building
+
+class CachedStack( NamedTuple ):
+    """Outcome of caching a single stack file."""
+    path: str
+    """Stack file"""
+    status: Literal['cached', 'read', 'failed']
+    """Whether the stack's entries were already current ('cached'), were
+    read and stored ('read'), or couldn't be read ('failed')"""
+    error: Optional[str] = None
+    """Why the stack couldn't be read, if it couldn't"""
+
+def _cache_stack( cache: MetadataCache,
+            stack_path: Path,
+            frame_pattern: str,
+            metadata_parser: MetadataParser,
+            refresh: bool,
+        ) -> CachedStack:
+    """Store the header and collated OME metadata of a stack file in `cache`."""
+    try:
+        identity = cache.identify( stack_path )
+        if (
+            not refresh
+            and cache.header( identity, frame_pattern ) is not None
+            and cache.metadata( identity, frame_pattern, metadata_parser ) is not None
+        ):
+            return CachedStack( stack_path.as_posix(), 'cached' )
+
+        # Header and OME-XML from a single read of the stack file
+        inspected = _inspect_stack( stack_path, frame_pattern )
+        cache.put_header( identity, frame_pattern, *inspected.header )
+        cache.put_metadata( identity, frame_pattern, metadata_parser,
+            _read_ome_metadata( inspected.ome_metadata, metadata_parser ),
+            inspected.header.frames,
+        )
+        return CachedStack( stack_path.as_posix(), 'read' )
+
+    except Exception as e:
+        return CachedStack( stack_path.as_posix(), 'failed', str( e ) )
+
+def build_metadata_cache( inputs: Sequence[_Pathable],
+            cache: MetadataCache | _Pathable,
+            frame_pattern_full: str = '*_*0001.ome.tif*',
+            frame_pattern: str = '*.ome.tif*',
+            metadata_parser: MetadataParser = 'fast',
+            refresh: bool = False,
+            threads: int = 16,
+        ) -> list[CachedStack]:
+    """Cache the headers and OME metadata of every recording matching `inputs`.
+
+    Recordings are discovered as for an export (see `toile.plan.plan_export`),
+    and the stack file of every channel of each is cached. Stack files are
+    read concurrently; those whose entries are already current are skipped.
+
+    Args:
+        inputs: Recording directories or glob patterns matching them (as
+            for `export_tiffs`)
+        cache: Cache to fill, or the location of its database
+        frame_pattern_full: Glob pattern for full stack files (as for `load_tiff`)
+        frame_pattern: Glob pattern for the files of a split stack (as for `load_tiff`)
+        metadata_parser: OME-XML parser whose output is cached (as for `load_tiff`)
+        refresh: Read and store every stack, even if already cached
+        threads: Number of threads listing directories and reading files
+
+    Returns:
+        Outcome for each stack file, in export order
+    """
+    if metadata_parser not in get_args( MetadataParser ):
+        raise ValueError( f'Unrecognized metadata parser: {metadata_parser}' )
+    if not isinstance( cache, MetadataCache ):
+        cache = MetadataCache( cache )
+
+    plan = plan_export( inputs,
+        frame_pattern_full = frame_pattern_full,
+        frame_pattern = frame_pattern,
+        read_headers = False,
+        threads = threads,
+    )
+    stack_paths = [ Path( x ) for cur_recording in plan.recordings
+                    for x in cur_recording.channel_paths ]
+
+    with ThreadPoolExecutor( max_workers = max( 1, threads ) ) as pool:
+        return list( pool.map(
+            lambda x: _cache_stack( cache, x, frame_pattern, metadata_parser, refresh ),
+            stack_paths,
+        ) )
+
+
+##
+# Typer app
+
+app = Typer()
+
+@app.command( 'build' )
+def _cli_metadata_build(
+            input: Path,
+            cache: Optional[str] = None,
+            metadata_parser: str = 'fast',
+            refresh: bool = False,
+            threads: int = 16,
+            verbose: bool = False,
+        ):
+    """CLI command: Cache the headers and OME metadata of many recordings at once.
+
+    Discovers recordings as `toile export plan` does (from a config's
+    `catalog` if it has one, and with its frame patterns), and reads the stack
+    file of every channel of each concurrently, storing its shape, dtype,
+    and collated OME metadata. Exports and plans given the same cache then
+    skip reading the metadata of recordings that haven't changed since.
+
+    Usage: toile metadata build INPUT [--cache CACHE] [--metadata-parser fast|xmltodict]
+        [--refresh] [--threads N] [--verbose]
+
+    Args:
+        input: Path to TIFF directory, glob pattern, or YAML config file
+        cache: SQLite database to fill (default: `metadata_cache` of a YAML config)
+        metadata_parser: OME-XML parser whose output is cached - 'fast' or 'xmltodict'
+        refresh: Read every stack again, even if its cached entries are current
+        threads: Number of threads listing directories and reading files
+        verbose: List the outcome for every stack file
+
+    Example:
+        toile metadata build '/data/experiment*/TSeries-*' --cache metadata.sqlite
+    """
+    if metadata_parser not in get_args( MetadataParser ):
+        raise ValueError( f'Unrecognized metadata parser: {metadata_parser}' )
+
+    config = _standardize_config_args( input, metadata_cache = cache )
+    if config.metadata_cache is None:
+        raise ValueError( 'No metadata cache given (pass --cache, or set `metadata_cache` in the config)' )
+
+    with MetadataCache( config.metadata_cache ) as metadata_cache:
+        results = build_metadata_cache( _config_inputs( config ), metadata_cache,
+            frame_pattern_full = config.frame_pattern_full,
+            frame_pattern = config.frame_pattern,
+            metadata_parser = metadata_parser,
+            refresh = refresh,
+            threads = threads,
+        )
+
+    for cur_result in results:
+        if cur_result.status == 'failed':
+            print( f'🔴 {cur_result.path}: {cur_result.error}' )
+        elif verbose:
+            print( f'🟢 {cur_result.path} ({cur_result.status})' )
+
+    n_read = sum( x.status == 'read' for x in results )
+    n_cached = sum( x.status == 'cached' for x in results )
+    n_failed = sum( x.status == 'failed' for x in results )
+    print( f'{len( results )} stack files: {n_read} read, {n_cached} already cached, {n_failed} failed' )
+
+@app.command( 'dump' )
+def _cli_metadata_dump(
+            cache: str,
+            output: Optional[Path] = None,
+        ):
+    """CLI command: Write every entry of a metadata cache as JSON Lines.
+
+    Each line describes one cached stack file: its path, size, and
+    modification time when cached, the frame pattern and parser the entry
+    was made with, its shape and dtype, OME UUID, number of frames, and
+    collated movie-level metadata.
+
+    Usage: toile metadata dump CACHE [--output FILE.jsonl]
+
+    Args:
+        cache: SQLite database to read
+        output: File to write to (default: standard output)
+    """
+    with MetadataCache( cache ) as metadata_cache:
+        lines = ( json.dumps( x ) + '\n' for x in metadata_cache.entries() )
+        if output is None:
+            for line in lines:
+                print( line, end = '' )
+        else:
+            with open( output, 'w' ) as f:
+                f.writelines( lines )
+
+@app.command( 'prune' )
+def _cli_metadata_prune( cache: str ):
+    """CLI command: Remove the entries of stack files that changed or no longer exist.
+
+    Usage: toile metadata prune CACHE
+
+    Args:
+        cache: SQLite database to prune
+    """
+    with MetadataCache( cache ) as metadata_cache:
+        n_removed = metadata_cache.prune()
+    print( f'Removed {n_removed} stale entries' )
+
+
+#
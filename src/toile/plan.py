@@ -0,0 +1,356 @@
+"""
+Planning of exports: discovering and sizing recordings before loading any.
+
+`plan_export` expands the input globs of an export, lists each recording
+directory, resolves the files holding its stack (one per channel), and
+(optionally) reads the first channel's TIFF header for the stack's shape and dtype. Directory listings are
+cached and shared by every step, so each directory is listed once; listings
+and headers are fetched from a thread pool, which hides the latency of
+network filesystems.
+
+The result is an `ExportPlan`, which can be saved as JSON, inspected (e.g.,
+with `toile export plan`), and passed to `export_tiffs` to run the export
+without discovering its inputs again.
+"""
+
+##
+# Imports
+
+import os
+import json
+import fnmatch
+from glob import has_magic
+from pathlib import Path
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ._common import (
+    _Pathable,
+)
+from ._manifest import (
+    _fingerprint_stats,
+    _is_recording_file,
+)
+from ._metadata_cache import (
+    MetadataCache,
+)
+from .tiff_import import (
+    _find_channel_files,
+    _stack_header,
+)
+
+from typing import (
+    Any,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+
+##
+# Directory listings
+
+class _ListingEntry( NamedTuple ):
+    name: str
+    """Name of the entry within its directory"""
+    is_dir: bool
+    """Whether the entry is a directory (following symlinks)"""
+    stat: Optional[tuple[int, int]]
+    """`(size, mtime_ns)` of recording files (see `_is_recording_file`); None for others"""
+
+class _DirectoryCache:
+    """Cache of directory listings, safe to share between threads.
+
+    Each directory is listed by a single `os.scandir` pass, which also stats
+    the recording files in it, so that fingerprints need no further calls.
+    """
+
+    def __init__( self ):
+        self._listings: dict[str, Optional[list[_ListingEntry]]] = dict()
+
+    def listdir( self, path: str ) -> Optional[list[_ListingEntry]]:
+        """Entries of a directory, in `os.scandir` order.
+
+        Args:
+            path: Directory to list ('' for the working directory)
+
+        Returns:
+            The directory's entries, or None if it can't be listed
+        """
+        if path in self._listings:
+            return self._listings[path]
+
+        ret: Optional[list[_ListingEntry]] = []
+        try:
+            with os.scandir( path or os.curdir ) as it:
+                for entry in it:
+                    try:
+                        stat = None
+                        if _is_recording_file( entry.name ) and entry.is_file():
+                            st = entry.stat()
+                            stat = (st.st_size, st.st_mtime_ns)
+                        ret.append( _ListingEntry( entry.name, entry.is_dir(), stat ) )
+                    except OSError:
+                        # Vanished or unreadable while listing
+                        continue
+        except OSError:
+            ret = None
+
+        # Concurrent listings of the same directory are equivalent; either wins
+        self._listings[path] = ret
+        return ret
+
+def _visible( names: list[str], pattern: str ) -> list[str]:
+    """Names that `glob` would consider for `pattern` (hidden only if it asks)."""
+    if pattern.startswith( '.' ):
+        return names
+    return [ x for x in names
+             if not x.startswith( '.' ) ]
+
+def _expand_glob( pattern: str,
+            cache: _DirectoryCache,
+            pool: ThreadPoolExecutor,
+        ) -> list[str]:
+    """Expand a glob pattern as `glob.glob` (non-recursive) would.
+
+    Directories are listed through `cache`, and all directories at the same
+    depth of the pattern are listed concurrently. Matches come out in the
+    same order as from `glob.glob`.
+
+    Args:
+        pattern: Glob pattern
+        cache: Directory listings
+        pool: Thread pool for listing directories
+
+    Returns:
+        Matching paths
+    """
+    if not has_magic( pattern ):
+        return [ pattern ] if os.path.lexists( pattern ) else []
+
+    parts = Path( pattern ).parts
+    i_magic = next( i for i, x in enumerate( parts )
+                    if has_magic( x ) )
+
+    cur_paths = [ os.path.join( *parts[:i_magic] ) if i_magic > 0 else '' ]
+    for i_part in range( i_magic, len( parts ) ):
+        cur_part = parts[i_part]
+        is_last = i_part == len( parts ) - 1
+
+        if not has_magic( cur_part ):
+            cur_paths = [ os.path.join( x, cur_part ) for x in cur_paths ]
+            if is_last:
+                cur_paths = [ x for x in cur_paths
+                              if os.path.lexists( x ) ]
+            continue
+
+        next_paths = []
+        for cur_path, cur_listing in zip( cur_paths, pool.map( cache.listdir, cur_paths ) ):
+            if cur_listing is None:
+                continue
+            names = _visible( [ x.name for x in cur_listing
+                                if is_last or x.is_dir ], cur_part )
+            next_paths += [ os.path.join( cur_path, x )
+                            for x in fnmatch.filter( names, cur_part ) ]
+        cur_paths = next_paths
+
+    return cur_paths
+
+
+##
+# Plans
+
+@dataclass
+class PlannedRecording:
+    """A recording directory included in an export plan."""
+    ##
+
+    path: str
+    """Recording directory"""
+    stack_path: Optional[str] = None
+    """File holding the recording's full stack (None if it couldn't be resolved)"""
+    channel_paths: list[str] = field( default_factory = list )
+    """Files holding the full stack of each channel, in channel order (the
+    first is `stack_path`)"""
+    fingerprint: dict[str, int] = field( default_factory = dict )
+    """Change-detection fingerprint of the recording's files (see `toile._manifest`)"""
+    file_nbytes: int = 0
+    """Total size in bytes of the recording's TIFF files on disk"""
+    shape: Optional[list[int]] = None
+    """Shape of the (first channel's) stack (None if its header wasn't read)"""
+    dtype: Optional[str] = None
+    """Data type of the stack, as a NumPy dtype string (None if its header wasn't read)"""
+    nbytes: Optional[int] = None
+    """Size in bytes of the (first channel's) stack's pixel data (None if its header wasn't read)"""
+    error: Optional[str] = None
+    """Why the recording can't be exported, if known before loading it"""
+
+@dataclass
+class ExportPlan:
+    """Recordings an export will include, in export order.
+
+    Example:
+        >>> plan = plan_export( ['/data/experiment*/TSeries-*'] )
+        >>> plan.save( 'plan.json' )
+        >>> export_tiffs( [], '/output/dataset', plan = ExportPlan.load( 'plan.json' ) )
+    """
+    ##
+
+    inputs: list[str]
+    """Input paths or glob patterns the plan was made from"""
+    frame_pattern_full: str
+    """Glob pattern used to resolve each recording's stack file"""
+    recordings: list[PlannedRecording] = field( default_factory = list )
+    """Recordings matching `inputs`, in export order"""
+
+    ##
+
+    @property
+    def paths( self ) -> list[Path]:
+        """Recording directories, in export order."""
+        return [ Path( x.path ) for x in self.recordings ]
+
+    @property
+    def nbytes( self ) -> int:
+        """Total size in bytes of the pixel data of recordings whose header was read."""
+        return sum( x.nbytes for x in self.recordings
+                    if x.nbytes is not None )
+
+    @property
+    def file_nbytes( self ) -> int:
+        """Total size in bytes of the recordings' TIFF files on disk."""
+        return sum( x.file_nbytes for x in self.recordings )
+
+    ##
+
+    def to_dict( self ) -> dict[str, Any]:
+        """JSON-serializable representation of the plan."""
+        return asdict( self )
+
+    @classmethod
+    def from_dict( cls, data: dict[str, Any] ) -> 'ExportPlan':
+        """Inverse of `to_dict`."""
+        return cls(
+            inputs = list( data['inputs'] ),
+            frame_pattern_full = data['frame_pattern_full'],
+            recordings = [ PlannedRecording( **x ) for x in data['recordings'] ],
+        )
+
+    def save( self, path: _Pathable ) -> None:
+        """Write the plan to a JSON file."""
+        with open( path, 'w' ) as f:
+            json.dump( self.to_dict(), f, indent = 2 )
+            f.write( '\n' )
+
+    @classmethod
+    def load( cls, path: _Pathable ) -> 'ExportPlan':
+        """Read a plan written by `save`."""
+        with open( path, 'r' ) as f:
+            return cls.from_dict( json.load( f ) )
+
+def _plan_recording( path: str,
+            cache: _DirectoryCache,
+            frame_pattern_full: str,
+            read_headers: bool,
+            metadata_cache: Optional[MetadataCache] = None,
+            frame_pattern: str = '*.ome.tif*',
+        ) -> PlannedRecording:
+    """Resolve, fingerprint, and optionally size a single recording."""
+    ret = PlannedRecording( path = Path( path ).as_posix() )
+
+    listing = cache.listdir( path )
+    if listing is None:
+        ret.error = f'Cannot list recording directory {ret.path}'
+        return ret
+
+    stats = [ x.stat for x in listing
+              if x.stat is not None ]
+    ret.fingerprint = _fingerprint_stats( stats )
+    ret.file_nbytes = ret.fingerprint['size']
+
+    # Patterns reaching into subdirectories can't be matched from the listing
+    candidates = None
+    if not any( sep in frame_pattern_full for sep in ('/', os.sep) ):
+        candidates = fnmatch.filter( _visible( [ x.name for x in listing ], frame_pattern_full ),
+            frame_pattern_full,
+        )
+
+    try:
+        channel_paths = _find_channel_files( Path( path ), frame_pattern_full, candidates )
+    except RuntimeError as e:
+        ret.error = str( e )
+        return ret
+    stack_path = channel_paths[0]
+    ret.stack_path = stack_path.as_posix()
+    ret.channel_paths = [ x.as_posix() for x in channel_paths ]
+
+    if read_headers:
+        try:
+            header = _stack_header( stack_path, frame_pattern, metadata_cache )
+        except Exception as e:
+            ret.error = f'Unreadable stack header: {e}'
+            return ret
+
+        ret.shape = list( header.shape )
+        ret.dtype = header.dtype.str
+        ret.nbytes = int( np.prod( header.shape ) ) * header.dtype.itemsize
+
+    return ret
+
+
+##
+# API
+
+def plan_export( inputs: Sequence[_Pathable],
+            frame_pattern_full: str = '*_*0001.ome.tif*',
+            read_headers: bool = True,
+            threads: int = 16,
+            metadata_cache: Optional[MetadataCache] = None,
+            frame_pattern: str = '*.ome.tif*',
+        ) -> ExportPlan:
+    """Discover the recordings an export of `inputs` would include.
+
+    No pixel data is read. Recordings that can't be exported as far as
+    planning can tell (e.g., no stack file matches `frame_pattern_full`)
+    are kept in the plan, with their `error` set, so that the export reports
+    them as it would have without a plan.
+
+    Args:
+        inputs: Recording directories or glob patterns matching them (as
+            for `export_tiffs`)
+        frame_pattern_full: Glob pattern for full stack files (as for `load_tiff`)
+        read_headers: Read each stack file's TIFF header for the stack's
+            shape, dtype, and size
+        threads: Number of threads listing directories and reading headers
+        metadata_cache: Cache of stack headers to consult first, and to add
+            headers read to (see `toile.metadata.MetadataCache`)
+        frame_pattern: Glob pattern for the files of a stack split across
+            several files (as for `load_tiff`), counted in its header
+
+    Returns:
+        Plan of the export
+    """
+    inputs = [ Path( x ).as_posix() for x in inputs ]
+    cache = _DirectoryCache()
+
+    with ThreadPoolExecutor( max_workers = max( 1, threads ) ) as pool:
+        paths = []
+        for cur_input in inputs:
+            paths += _expand_glob( cur_input, cache, pool )
+
+        recordings = list( pool.map(
+            lambda x: _plan_recording( x, cache, frame_pattern_full, read_headers, metadata_cache,
+                frame_pattern ),
+            paths,
+        ) )
+
+    return ExportPlan(
+        inputs = inputs,
+        frame_pattern_full = frame_pattern_full,
+        recordings = recordings,
+    )
+
+
+#
@@ -0,0 +1,305 @@
+"""
+Random-access reading of exported shards.
+
+Uses the per-shard indices written by `export_tiffs` to fetch individual
+samples by key without scanning the tar archives. Uncompressed shards are
+memory-mapped, so a lookup touches only the bytes of the requested member;
+compressed shards are decompressed up to the requested sample (reusing the
+open stream for lookups in increasing order within a shard).
+
+Movies exported as chunks can be read in part (see `ShardReader.read_movie`),
+decoding only the chunks overlapping the requested region.
+"""
+
+##
+# Imports
+
+import json
+import mmap
+import gzip
+from pathlib import Path
+
+import atdata
+
+import toile.schema as schema
+from ._common import (
+    _Pathable,
+)
+from .codecs import (
+    decode_sample,
+    sample_codec,
+)
+from ._chunks import (
+    MOVIE_HEADER_MEMBER,
+    _read_chunked,
+)
+from ._shards import (
+    ShardCompression,
+    ShardSample,
+    _SHARD_INDEX_EXTENSION,
+    shard_compression,
+)
+
+from typing import (
+    Any,
+    BinaryIO,
+    Iterator,
+    Optional,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+##
+# Helpers
+
+class _ShardFile:
+    """Open shard supporting reads at offsets of its uncompressed tar stream."""
+
+    def __init__( self, path: Path, compression: ShardCompression | None ):
+        self.path = path
+        self.compression = compression
+
+        self._f: Optional[BinaryIO] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._stream: Any = None
+
+        if compression is None:
+            self._f = open( path, 'rb' )
+            self._mm = mmap.mmap( self._f.fileno(), 0, access = mmap.ACCESS_READ )
+
+    def _open_stream( self ) -> Any:
+        if self.compression == 'gzip':
+            return gzip.open( self.path, 'rb' )
+
+        if self.compression == 'zstd':
+            if zstandard is None:
+                raise ImportError( 'Reading zstd shards requires `zstandard` (pip install toile[zstd])' )
+            self._f = open( self.path, 'rb' )
+            return zstandard.ZstdDecompressor().stream_reader( self._f )
+
+        raise ValueError( f'Unrecognized shard compression: {self.compression}' )
+
+    def _close_stream( self ) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if self._f is not None and self._mm is None:
+            self._f.close()
+            self._f = None
+
+    def read( self, offset: int, size: int ) -> bytes:
+        """Read `size` bytes at `offset` of the uncompressed tar stream."""
+
+        if self._mm is not None:
+            return self._mm[offset:offset + size]
+
+        # Compressed streams only seek forward; restart for earlier offsets
+        if self._stream is None or self._stream.tell() > offset:
+            self._close_stream()
+            self._stream = self._open_stream()
+
+        self._stream.seek( offset )
+        return self._stream.read( size )
+
+    def close( self ) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._close_stream()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+##
+# Reader
+
+class ShardReader:
+    """Random access to the samples of an export, by key.
+
+    Example:
+        >>> with ShardReader( '/output/dataset' ) as reader:
+        ...     frame = reader['tseries-000012-frame-000345']
+        ...     frame.image.shape
+        (512, 512)
+    """
+
+    def __init__( self, output_dir: _Pathable,
+                stem: Optional[str] = None,
+                sample_type: type[atdata.PackableSample] = schema.Frame,
+            ):
+        """Load the shard indices of an export.
+
+        Args:
+            output_dir: Directory the export was written to
+            stem: Stem of the export's filenames (default: output directory
+                name, as for `export_tiffs`)
+            sample_type: Sample class to decode samples as (e.g.,
+                `schema.Clip` for clip exports)
+        """
+        self.output_dir = Path( output_dir )
+        self.stem = self.output_dir.stem if stem is None else stem
+        self.sample_type = sample_type
+
+        self._samples: dict[str, tuple[Path, ShardSample]] = dict()
+        self._recordings: dict[str, dict[str, Any]] = dict()
+        self._shards: dict[Path, _ShardFile] = dict()
+
+        index_paths = sorted( self.output_dir.glob( f'{self.stem}-[0-9]*{_SHARD_INDEX_EXTENSION}' ) )
+        for cur_index_path in index_paths:
+            with open( cur_index_path, 'r' ) as f:
+                cur_index = json.load( f )
+
+            cur_shard_path = cur_index_path.with_name( cur_index['shard'] )
+            for cur_sample in cur_index['samples']:
+                cur_sample['members'] = { k: tuple( v )
+                                          for k, v in cur_sample['members'].items() }
+                # Later shards supersede earlier ones (e.g., after a resume)
+                self._samples[cur_sample['key']] = (cur_shard_path, ShardSample( **cur_sample ))
+            self._recordings.update( cur_index['recordings'] )
+
+    ##
+
+    def __len__( self ) -> int:
+        return len( self._samples )
+
+    def __contains__( self, key: str ) -> bool:
+        return key in self._samples
+
+    def __iter__( self ) -> Iterator[str]:
+        return iter( self._samples )
+
+    def keys( self ) -> list[str]:
+        """Keys of all indexed samples, in write order."""
+        return list( self._samples )
+
+    def locate( self, key: str ) -> tuple[Path, ShardSample]:
+        """Shard file and location within it of the sample with key `key`."""
+        return self._samples[key]
+
+    def recording( self, key: str ) -> Optional[dict[str, Any]]:
+        """Description of the recording a sample belongs to, if known.
+
+        Args:
+            key: Sample key
+
+        Returns:
+            The recording's entry (with 'recording', 'path', 'n_frames', and
+            'metadata' keys), or None if the sample has no recording
+        """
+        _, sample = self._samples[key]
+        if sample.recording is None:
+            return None
+        return self._recordings.get( sample.recording )
+
+    def read_member( self, key: str, ext: str = 'msgpack' ) -> bytes:
+        """Raw bytes of one member of a sample.
+
+        Args:
+            key: Sample key
+            ext: Member extension (e.g., 'msgpack')
+
+        Returns:
+            The member's data
+        """
+        shard_path, sample = self._samples[key]
+        offset, size = sample.members[ext]
+
+        if shard_path not in self._shards:
+            self._shards[shard_path] = _ShardFile( shard_path, shard_compression( shard_path ) )
+        return self._shards[shard_path].read( offset, size )
+
+    def __getitem__( self, key: str ) -> Any:
+        """Decode the sample with key `key` as `sample_type`.
+
+        Samples exported with an image codec are decoded member by member
+        (see `toile.codecs`). Samples exported with 'sidecar' movie metadata
+        have their movie-level metadata restored from the recording's
+        description.
+        """
+        _, sample = self._samples[key]
+        if sample_codec( sample.members ) is None:
+            ret = self.sample_type.from_bytes( self.read_member( key, 'msgpack' ) )
+        else:
+            ret = self.sample_type( **decode_sample( { k: self.read_member( key, k )
+                                                       for k in sample.members } ) )
+
+        metadata = getattr( ret, 'metadata', None )
+        if isinstance( metadata, dict ) and isinstance( metadata.get( 'recording' ), str ):
+            recording = self._recordings.get( metadata['recording'] )
+            if recording is not None:
+                ret.metadata = dict( recording['metadata'],
+                    **{ k: v for k, v in metadata.items()
+                        if k != 'recording' }
+                )
+
+        return ret
+
+    def movie_header( self, key: str ) -> dict[str, Any]:
+        """Header of a chunked movie sample (see `toile._chunks`).
+
+        Sidecar movie metadata is restored as for `__getitem__`.
+
+        Args:
+            key: Sample key of the movie
+
+        Returns:
+            Dict with 'shape', 'dtype', 'chunk_shape', 'grid', 'metadata',
+            and 'frame_metadata' keys
+        """
+        ret = json.loads( self.read_member( key, MOVIE_HEADER_MEMBER ) )
+
+        metadata = ret['metadata']
+        if isinstance( metadata, dict ) and isinstance( metadata.get( 'recording' ), str ):
+            recording = self._recordings.get( metadata['recording'] )
+            if recording is not None:
+                ret['metadata'] = recording['metadata']
+
+        return ret
+
+    def read_movie( self, key: str,
+                t: slice = slice( None ),
+                y: slice = slice( None ),
+                x: slice = slice( None ),
+            ) -> Any:
+        """Read a time range and spatial crop of a chunked movie.
+
+        Only the chunks overlapping the region are read and decoded.
+
+        Args:
+            key: Sample key of the movie
+            t: Frames to read
+            y: Rows to read
+            x: Columns to read
+
+        Returns:
+            Array of shape (frames, rows, columns), or (frames, channels,
+            rows, columns) for multi-channel movies
+
+        Example:
+            >>> reader.read_movie( 'tseries-000003', t = slice( 100, 200 ),
+            ...     y = slice( 0, 64 ), x = slice( 0, 64 ) ).shape
+            (100, 64, 64)
+        """
+        header = json.loads( self.read_member( key, MOVIE_HEADER_MEMBER ) )
+        return _read_chunked( header, lambda ext: self.read_member( key, ext ), t, y, x )
+
+    ##
+
+    def close( self ) -> None:
+        for cur_shard in self._shards.values():
+            cur_shard.close()
+        self._shards = dict()
+
+    def __enter__( self ) -> 'ShardReader':
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ) -> None:
+        self.close()
+
+
+#
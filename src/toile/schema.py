@@ -11,11 +11,14 @@ metadata, along with lens transformations for data conversion.
 # Imports
 
 import atdata
+import numpy as np
 
 from dataclasses import dataclass
 
 from typing import (
     Any,
+    Iterable,
+    Iterator,
     Literal,
     TypeAlias,
 )
@@ -43,6 +46,140 @@ TimeUnit: TypeAlias = Literal[
 
 Identifier: TypeAlias = int | str
 
+## Columnar metadata
+
+class FrameMetadataTable:
+    """Array-backed per-frame metadata for a movie.
+
+    Stores the per-frame fields extracted from OME-TIFF metadata as a single
+    `numpy` structured array (one column per field) plus a matching mask of
+    which fields are present for each frame, avoiding a small dict per frame.
+
+    For compatibility with code expecting a list of dicts, indexing with an
+    integer returns the same dict as before (only present fields, with plain
+    Python values), and iterating yields those dicts in order. Indexing with
+    a slice returns a new table sharing the underlying arrays.
+
+    Attributes:
+        data: Structured array with one record per frame (see `FIELDS`)
+        present: Structured boolean array marking which fields are set
+    """
+
+    ##
+
+    DTYPE = np.dtype( [
+        ('position_x', np.float64),
+        ('position_y', np.float64),
+        ('position_z', np.float64),
+        ('t_index', np.int64),
+        ('t', np.float64),
+        ('uuid', 'S36'),
+    ] )
+    """Record layout; field order matches the dict view"""
+
+    FIELDS = DTYPE.names
+    """Names of the per-frame fields, in dict-view order"""
+
+    ##
+
+    def __init__( self, data: np.ndarray, present: np.ndarray ):
+        """Wrap existing record and presence arrays.
+
+        Args:
+            data: Structured array with dtype `FrameMetadataTable.DTYPE`
+            present: Structured boolean array with the same fields and shape
+        """
+        if data.shape != present.shape:
+            raise ValueError( 'Frame metadata and presence mask shapes differ' )
+        self.data = data
+        self.present = present
+
+    @classmethod
+    def empty( cls, n_frames: int ) -> 'FrameMetadataTable':
+        """Create a table of `n_frames` frames with no fields present."""
+        return cls(
+            np.zeros( n_frames, dtype = cls.DTYPE ),
+            np.zeros( n_frames, dtype = [ (k, np.bool_) for k in cls.FIELDS ] ),
+        )
+
+    @classmethod
+    def from_dicts( cls, frames: Iterable[dict[str, Any] | None] ) -> 'FrameMetadataTable':
+        """Build a table from per-frame metadata dicts.
+
+        Keys other than `FIELDS` are ignored; `None` entries have no fields.
+        """
+        frames = list( frames )
+        ret = cls.empty( len( frames ) )
+
+        for k in cls.FIELDS:
+            mask = np.array( [ f is not None and k in f for f in frames ], dtype = np.bool_ )
+            if not mask.any():
+                continue
+            values = [ f[k] for f, m in zip( frames, mask ) if m ]
+            if k == 'uuid':
+                values = [ v.encode( 'ascii' ) for v in values ]
+            ret.data[k][mask] = values
+            ret.present[k] = mask
+
+        return ret
+
+    @classmethod
+    def concatenate( cls, tables: Iterable['FrameMetadataTable'] ) -> 'FrameMetadataTable':
+        """Join tables end to end (e.g., those of consecutive files of a stack)."""
+        tables = list( tables )
+        if len( tables ) == 0:
+            return cls.empty( 0 )
+        return cls(
+            np.concatenate( [ x.data for x in tables ] ),
+            np.concatenate( [ x.present for x in tables ] ),
+        )
+
+    ##
+
+    def __len__( self ) -> int:
+        return self.data.shape[0]
+
+    def column( self, name: str ) -> np.ndarray:
+        """Values of a single field for all frames (unset entries are zero)."""
+        return self.data[name]
+
+    def has( self, name: str ) -> np.ndarray:
+        """Boolean mask of frames for which field `name` is set."""
+        return self.present[name]
+
+    def _row( self, i: int ) -> dict[str, Any]:
+        ret = dict()
+        for k, v, m in zip( self.FIELDS, self.data[i].item(), self.present[i].item() ):
+            if m:
+                ret[k] = v.decode( 'ascii' ) if k == 'uuid' else v
+        return ret
+
+    def __getitem__( self, key: int | slice ) -> 'dict[str, Any] | FrameMetadataTable':
+        if isinstance( key, slice ):
+            return FrameMetadataTable( self.data[key], self.present[key] )
+        return self._row( key )
+
+    def __iter__( self ) -> Iterator[dict[str, Any]]:
+        for i in range( len( self ) ):
+            yield self._row( i )
+
+    def to_dicts( self ) -> list[dict[str, Any]]:
+        """Convert to the list-of-dicts representation."""
+        return list( self )
+
+    def __eq__( self, other: Any ) -> bool:
+        if isinstance( other, FrameMetadataTable ):
+            return (
+                bool( np.array_equal( self.present, other.present ) )
+                and self.to_dicts() == other.to_dicts()
+            )
+        if isinstance( other, list ):
+            return self.to_dicts() == other
+        return NotImplemented
+
+    def __repr__( self ) -> str:
+        return f'FrameMetadataTable(n_frames={len( self )})'
+
 ## Convenience stores for intermediate handling
 
 @dataclass
@@ -53,13 +190,16 @@ class Movie( atdata.PackableSample ):
     microscopy recordings before splitting into individual frames.
 
     Attributes:
-        frames: 3D numpy array with shape (time, height, width)
+        frames: 3D numpy array with shape (time, height, width), or 4D
+            (time, channel, height, width) for multi-channel recordings
         metadata: Dictionary of movie-level metadata (acquisition settings, etc.)
-        frame_metadata: List of per-frame metadata dictionaries (timing, position, etc.)
+        frame_metadata: Per-frame metadata (timing, position, etc.), either as a
+            columnar `FrameMetadataTable` or a list of dictionaries; both yield a
+            dictionary per frame when indexed or iterated
     """
     frames: NDArray
     metadata: dict[str, Any] | None = None
-    frame_metadata: list[dict[str, Any]] | None = None
+    frame_metadata: FrameMetadataTable | list[dict[str, Any]] | None = None
 
 @dataclass
 class Frame( atdata.PackableSample ):
@@ -69,12 +209,39 @@ class Frame( atdata.PackableSample ):
     WebDataset format.
 
     Attributes:
-        image: 2D numpy array containing the frame's image data
+        image: 2D numpy array containing the frame's image data, or 3D
+            (channel, height, width) for multi-channel recordings
         metadata: Combined movie and frame-level metadata dictionary
     """
     image: NDArray
     metadata: dict[str, Any] | None = None
 
+@dataclass
+class Clip( atdata.PackableSample ):
+    """Fixed-length run of consecutive frames cut from a movie.
+
+    Attributes:
+        frames: 3D numpy array with shape (time, height, width), or 4D
+            (time, channel, height, width) for multi-channel recordings
+        metadata: Movie-level metadata plus the clip's position in the
+            recording ('clip') and its per-frame metadata ('frames')
+    """
+    frames: NDArray
+    metadata: dict[str, Any] | None = None
+
+@dataclass
+class Patch( atdata.PackableSample ):
+    """Spatial tile cut from a single movie frame.
+
+    Attributes:
+        image: 2D numpy array with shape (height, width), or 3D
+            (channel, height, width) for multi-channel recordings
+        metadata: Combined movie and frame-level metadata, plus the patch's
+            location in the recording ('patch')
+    """
+    image: NDArray
+    metadata: dict[str, Any] | None = None
+
 ## NEW
 
 @dataclass
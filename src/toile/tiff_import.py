@@ -17,29 +17,74 @@ import warnings
 from datetime import datetime
 from uuid import UUID
 import re
+import fnmatch
+import functools
+import threading
+from collections import OrderedDict
+from xml.parsers import expat
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
-import skimage.io as skio
 import tifffile
 import xmltodict
 
 from toile.schema import (
     Movie,
+    FrameMetadataTable,
 )
 
 from typing import (
     Optional,
     Callable,
     Any,
+    Literal,
+    NamedTuple,
+    Sequence,
+    Iterable,
     TypeAlias,
 )
+from numpy.typing import (
+    NDArray,
+)
 
 _FilenameParser: TypeAlias = Callable[[str], dict[str, Any]]
 
+MetadataParser: TypeAlias = Literal[
+    'fast',
+    'xmltodict',
+]
+
+ChannelMode: TypeAlias = Literal[
+    'first',
+    'all',
+]
+"""Which channels of a multi-channel recording (one `*Ch*` stack file per
+channel) are loaded:
+
+- 'first': only the lowest-numbered channel's file; frames are
+  (time, height, width)
+- 'all': every channel, aligned frame by frame; frames are
+  (time, channel, height, width), even for single-channel recordings
+
+When the OME-XML of the first channel's file already describes every
+channel's file, `tifffile` assembles all channels from it, and frames are
+(time, channel, height, width) either way; 'all' then reads only that file,
+and uint8 normalization spans all channels.
+"""
+
 from ._common import (
     _Pathable,
     suppress_stderr,
 )
+from ._metadata_cache import (
+    MetadataCache,
+    _StackIdentity,
+)
+from ._normalize import (
+    NormalizationMode,
+    _fit_uint8_normalizer,
+    _normalize_uint8,
+)
 
 
 ##
@@ -47,6 +92,39 @@ from ._common import (
 
 # Routines for collating OME TIFF metadata
 
+_OME_CHANNEL_KEYS = [
+    ('Name', 'name', str),
+    ('Fluor', 'fluor', str),
+    ('ExcitationWavelength', 'excitation_wavelength', float),
+    ('EmissionWavelength', 'emission_wavelength', float),
+]
+
+def _collate_channel( attrs: dict[str, str], prefix: str = '' ) -> dict[str, Any]:
+    """Extract the metadata of one OME `Channel` element from its attributes.
+
+    Args:
+        attrs: Attributes of the element
+        prefix: Prefix of attribute names ('@' for `xmltodict` output)
+
+    Returns:
+        Dictionary with whichever of name, fluor, and excitation/emission
+        wavelengths are present
+    """
+    ret = dict()
+    for k, k_new, convert in _OME_CHANNEL_KEYS:
+        if prefix + k in attrs:
+            ret[k_new] = convert( attrs[prefix + k] )
+    return ret
+
+def _is_first_channel( raw: dict[str, Any] ) -> bool:
+    """Whether parsed OME TiffData/Plane XML describes a plane of channel 0.
+
+    Planes record their channel as `TheC`, TiffData blocks as `FirstC`;
+    planes without either are taken to be of channel 0.
+    """
+    c = raw.get( '@TheC', raw.get( '@FirstC' ) )
+    return c is None or int( c ) == 0
+
 def _collate_frame_metadata( raw: dict[str, Any] ) -> dict[str, Any]:
     """Extract and normalize per-frame metadata from OME-TIFF XML.
 
@@ -108,7 +186,7 @@ def _collate_metadata( raw: dict[str, Any],
             - scale_x/y/z: Physical pixel sizes in microns
             - size_x/y/z/t: Image dimensions
             - channels: List of channel metadata dictionaries
-            - frames: List of per-frame metadata dictionaries
+            - frames: Per-frame metadata as a `FrameMetadataTable`
     """
 
     ret = dict()
@@ -165,17 +243,13 @@ def _collate_metadata( raw: dict[str, Any],
             #
 
             if 'Channel' in pixels:
-                channel = pixels['Channel']
-
-                # TODO Check metadata structure for multi-channel recordings
-                if 'channels' not in ret:
-                    ret['channels'] = []
-                
-                new_channel = dict()
-                if '@Name' in channel:
-                    new_channel['name'] = channel['@Name']
-                
-                ret['channels'].append( new_channel )
+                channels = pixels['Channel']
+                # `xmltodict` only makes a list of repeated elements
+                if isinstance( channels, dict ):
+                    channels = [ channels ]
+
+                ret['channels'] = [ _collate_channel( x, '@' )
+                                    for x in channels ]
             
             #
 
@@ -198,14 +272,432 @@ def _collate_metadata( raw: dict[str, Any],
                 frame_iterator = None
 
             if frame_iterator is not None:
-                ret['frames'] = []
-                for frame_data in frame_iterator:
-                    ret['frames'].append( _collate_frame_metadata( frame_data ) )
+                # Frames of multi-channel recordings are listed per channel
+                ret['frames'] = FrameMetadataTable.from_dicts(
+                    _collate_frame_metadata( frame_data )
+                    for frame_data in frame_iterator
+                    if _is_first_channel( frame_data )
+                )
 
     #
 
     return ret
 
+# Streaming OME-XML parsing
+
+_OME_SCALE_KEYS = [
+    ('PhysicalSizeX', 'scale_x'),
+    ('PhysicalSizeY', 'scale_y'),
+    ('PhysicalSizeZ', 'scale_z'),
+]
+_OME_SIZE_KEYS = [
+    ('SizeX', 'size_x'),
+    ('SizeY', 'size_y'),
+    ('SizeZ', 'size_z'),
+    ('SizeT', 'size_t'),
+]
+_OME_PLANE_COLUMNS = [
+    ('PositionX', 'position_x'),
+    ('PositionY', 'position_y'),
+    ('PositionZ', 'position_z'),
+    ('TheT', 't_index'),
+    ('DeltaT', 't'),
+]
+
+# Already-canonical UUIDs, which can skip `uuid.UUID` round-tripping
+_CANONICAL_UUID = re.compile(
+    r'(?:urn:uuid:)?([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})'
+)
+
+def _normalize_uuid( x: str ) -> str:
+    """Equivalent to `str( UUID( x ) )`, with a fast path for canonical input."""
+    match = _CANONICAL_UUID.fullmatch( x )
+    if match is not None:
+        return match.group( 1 )
+    return str( UUID( x ) )
+
+class _OMEMetadataHandler:
+    """Expat callbacks collecting exactly the fields `_collate_metadata` uses.
+
+    Elements are never materialized; only the attributes and text of the
+    handful of relevant elements are kept, so memory stays proportional to
+    the collated output rather than to the XML tree.
+    """
+
+    def __init__( self ):
+        self.path: list[str] = []
+        self.n_images = 0
+
+        self.ome_uuid: Optional[str] = None
+        self.acquisition_date: Optional[str] = None
+        self.pixels: Optional[dict[str, str]] = None
+        self.channels: list[dict[str, Any]] = []
+        self.tiff_data: list[Optional[str]] = []
+        self.tiff_data_attrs: list[dict[str, str]] = []
+        self.tiff_data_files: list[Optional[str]] = []
+        self.planes: list[dict[str, str]] = []
+
+        self._text: Optional[list[str]] = None
+
+    def _in_first_image( self ) -> bool:
+        return self.n_images == 1
+
+    def start( self, name: str, attrs: dict[str, str] ) -> None:
+        # Strip any namespace prefix
+        name = name[name.rfind( ':' ) + 1:]
+        parent = self.path[-1] if len( self.path ) > 0 else None
+        self.path.append( name )
+
+        if parent is None:
+            if name == 'OME' and 'UUID' in attrs:
+                self.ome_uuid = attrs['UUID']
+
+        elif parent == 'OME':
+            if name == 'Image':
+                self.n_images += 1
+
+        elif parent == 'Image':
+            if not self._in_first_image():
+                return
+            if name == 'Pixels':
+                self.pixels = attrs
+            elif name == 'AcquisitionDate':
+                self._text = []
+
+        elif parent == 'Pixels':
+            if not self._in_first_image():
+                return
+            if name == 'Channel':
+                self.channels.append( _collate_channel( attrs ) )
+            elif name == 'TiffData':
+                self.tiff_data.append( None )
+                self.tiff_data_attrs.append( attrs )
+                self.tiff_data_files.append( None )
+            elif name == 'Plane':
+                self.planes.append( attrs )
+
+        elif parent == 'TiffData':
+            if name == 'UUID' and self._in_first_image():
+                self.tiff_data_files[-1] = attrs.get( 'FileName' )
+                self._text = []
+
+    def end( self, name: str ) -> None:
+        name = self.path.pop()
+
+        if self._text is None:
+            return
+
+        if name == 'AcquisitionDate':
+            self.acquisition_date = ''.join( self._text )
+            self._text = None
+        elif name == 'UUID':
+            text = ''.join( self._text ).strip()
+            self.tiff_data[-1] = text if len( text ) > 0 else None
+            self._text = None
+
+    def text( self, data: str ) -> None:
+        if self._text is not None:
+            self._text.append( data )
+
+def _parse_ome_xml( xml: str | bytes ) -> _OMEMetadataHandler:
+    """Run a single expat pass of `_OMEMetadataHandler` over OME-XML."""
+    handler = _OMEMetadataHandler()
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.text
+    parser.Parse( xml, True )
+
+    return handler
+
+class _ParsedOMEXML( NamedTuple ):
+    """OME-XML along with the result of parsing it with `_parse_ome_xml`.
+
+    Lets a stack's OME-XML be parsed once, when locating its frames (see
+    `_inspect_stack`), and collated from that same pass.
+    """
+    xml: str
+    """OME-XML, for parsers other than the streaming one"""
+    handler: _OMEMetadataHandler
+    """Fields picked out of `xml`"""
+
+def _collate_ome_xml( xml: str | bytes,
+        date_format: str = '%Y-%m-%dT%H:%M:%S'
+    ) -> dict[str, Any]:
+    """Extract and normalize movie-level metadata directly from OME-XML.
+
+    Streaming equivalent of `_collate_metadata( xmltodict.parse( xml ) )`:
+    a single expat pass picks out only the fields that are collated, without
+    building a dict per XML element. Produces the same output for
+    well-formed recordings; unlike the dict-based path, it also handles a
+    single TiffData/Plane element and multiple Image elements (only the
+    first is used).
+
+    Args:
+        xml: Complete OME-TIFF XML metadata
+        date_format: strptime format string for parsing acquisition dates
+
+    Returns:
+        Normalized dictionary with the same keys as `_collate_metadata`
+    """
+    return _collate_ome_handler( _parse_ome_xml( xml ), date_format )
+
+def _collate_ome_handler( handler: _OMEMetadataHandler,
+        date_format: str = '%Y-%m-%dT%H:%M:%S'
+    ) -> dict[str, Any]:
+    """Collate the fields picked out of OME-XML by `_parse_ome_xml` (see
+    `_collate_ome_xml`)."""
+
+    ret = dict()
+
+    if handler.ome_uuid is not None:
+        try:
+            ret['uuid'] = str( UUID( handler.ome_uuid ) )
+        except Exception as e:
+            print( f'Invalid frame UUID: "{handler.ome_uuid}"' )
+
+    if handler.acquisition_date is not None:
+        # TODO Better way of validating
+        try:
+            ret['date_acquired'] = (
+                datetime
+                    .strptime( handler.acquisition_date, date_format )
+                    .strftime( date_format )
+            )
+        except Exception as e:
+            print( f'** Invalid acquisition date: "{handler.acquisition_date}"' )
+
+    pixels = handler.pixels
+    if pixels is not None:
+
+        for k, k_new in _OME_SCALE_KEYS:
+            if k in pixels:
+                ret[k_new] = float( pixels[k] )
+                # TODO Determine
+                ret['scale_unit'] = 'um'
+        
+        # TODO Determine
+        ret['t_unit'] = 's'
+
+        for k, k_new in _OME_SIZE_KEYS:
+            if k in pixels:
+                ret[k_new] = int( pixels[k] )
+
+        if len( handler.channels ) > 0:
+            ret['channels'] = handler.channels
+
+        #
+
+        tiff_data, planes = handler.tiff_data, handler.planes
+        tiff_data_c = [ x.get( 'FirstC' ) for x in handler.tiff_data_attrs ]
+        if len( tiff_data ) > 0 and len( planes ) > 0:
+            n_frames = min( len( tiff_data ), len( planes ) )
+        elif len( tiff_data ) > 0:
+            n_frames = len( tiff_data )
+            planes = [ dict() ] * n_frames
+        elif len( planes ) > 0:
+            n_frames = len( planes )
+            tiff_data = [ None ] * n_frames
+            tiff_data_c = [ None ] * n_frames
+        else:
+            n_frames = None
+
+        if n_frames is not None:
+            # Frames of multi-channel recordings are listed per channel
+            keep = [ i for i, (plane, first_c) in enumerate( zip( planes[:n_frames], tiff_data_c ) )
+                     if int( plane.get( 'TheC', first_c ) or 0 ) == 0 ]
+            if len( keep ) < n_frames:
+                tiff_data = [ tiff_data[i] for i in keep ]
+                planes = [ planes[i] for i in keep ]
+                n_frames = len( keep )
+
+            frames = FrameMetadataTable.empty( n_frames )
+            planes = planes[:n_frames]
+
+            # Fill each column with a single vectorized string conversion
+            for k, k_new in _OME_PLANE_COLUMNS:
+                raw = [ plane.get( k ) for plane in planes ]
+                mask = np.fromiter( ( v is not None for v in raw ),
+                    dtype = np.bool_, count = n_frames,
+                )
+                if mask.any():
+                    frames.data[k_new][mask] = (
+                        np.array( [ v for v in raw if v is not None ] )
+                            .astype( frames.data.dtype[k_new] )
+                    )
+                    frames.present[k_new] = mask
+
+            uuids = np.zeros( n_frames, dtype = frames.data.dtype['uuid'] )
+            uuid_mask = np.zeros( n_frames, dtype = np.bool_ )
+            for i, frame_uuid in enumerate( tiff_data[:n_frames] ):
+                if frame_uuid is None:
+                    continue
+                try:
+                    uuids[i] = _normalize_uuid( frame_uuid )
+                    uuid_mask[i] = True
+                except Exception as e:
+                    print( f'Invalid frame UUID: "{frame_uuid}"' )
+            frames.data['uuid'] = uuids
+            frames.present['uuid'] = uuid_mask
+
+            ret['frames'] = frames
+
+    #
+
+    return ret
+
+class _SplitOMEMetadata( NamedTuple ):
+    """OME-XML of a stack split across files that each describe only their own frames."""
+    xml: list[Optional[str | _ParsedOMEXML]]
+    """OME-XML of each file, in frame order"""
+    n_frames: list[int]
+    """Number of frames in each file"""
+
+_StackOMEMetadata: TypeAlias = Optional[str | _ParsedOMEXML | _SplitOMEMetadata]
+
+def _read_ome_metadata( ome_metadata: _StackOMEMetadata,
+        parser: MetadataParser = 'fast',
+    ) -> dict[str, Any]:
+    """Collate OME-XML metadata with the selected parser.
+
+    Args:
+        ome_metadata: OME-XML string from `TiffFile.ome_metadata`, if any,
+            possibly already parsed, or the OME-XML of each file of a split
+            stack. Movie-level fields of a split stack come from its first
+            file, and its frames from every file in turn
+        parser: 'fast' for the streaming parser, or 'xmltodict' for the
+            original dict-based path
+
+    Returns:
+        Collated metadata (empty if `ome_metadata` is None)
+    """
+    if ome_metadata is None:
+        return dict()
+    if isinstance( ome_metadata, _SplitOMEMetadata ):
+        files = [ _read_ome_metadata( x, parser ) for x in ome_metadata.xml ]
+        ret = files[0]
+        ret['frames'] = FrameMetadataTable.concatenate(
+            x['frames'] if 'frames' in x and len( x['frames'] ) == n else FrameMetadataTable.empty( n )
+            for x, n in zip( files, ome_metadata.n_frames )
+        )
+        ret['size_t'] = sum( ome_metadata.n_frames )
+        return ret
+    if isinstance( ome_metadata, _ParsedOMEXML ):
+        if parser == 'fast':
+            return _collate_ome_handler( ome_metadata.handler )
+        ome_metadata = ome_metadata.xml
+    if parser == 'fast':
+        return _collate_ome_xml( ome_metadata )
+    if parser == 'xmltodict':
+        return _collate_metadata( xmltodict.parse( ome_metadata ) )
+    raise ValueError( f'Unrecognized metadata parser: {parser}' )
+
+
+# Filename parsing
+
+def _set_identity( vals: dict[str, Any], k: str, x: str ) -> None:
+    vals[k] = x
+
+def _set_float( vals: dict[str, Any], k: str, x: str ) -> None:
+    vals[k] = float( x )
+
+def _set_int( vals: dict[str, Any], k: str, x: str ) -> None:
+    vals[k] = int( x )
+
+def _set_split_age_sex( vals: dict[str, Any], k: str, x: str ) -> None:
+    k_age, k_sex = k.split( '_' )[:2]
+    vals[k_age] = int( x[:-1] )
+    vals[k_sex] = x[-1]
+
+def _set_date_compact( vals: dict[str, Any], k: str, x: str ) -> None:
+    vals[k] = datetime.strptime( x, '%Y%m%d' ).isoformat()
+
+class _FilenameTransform( NamedTuple ):
+    """Conversion of a placeholder's text into metadata values."""
+    pattern: str
+    """Regex matched by the placeholder when its type is given in the template"""
+    apply: Callable[[dict[str, Any], str, str], None]
+    """Stores the values converted from the text `x` of placeholder `k` in `vals`"""
+
+_filename_parser_transforms = {
+    'identity': _FilenameTransform( r'.+?', _set_identity ),
+    'float': _FilenameTransform( r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?', _set_float ),
+    'int': _FilenameTransform( r'[-+]?\d+', _set_int ),
+    'split_age_sex': _FilenameTransform( r'\d+[A-Za-z]', _set_split_age_sex ),
+    'date_compact': _FilenameTransform( r'\d{8}', _set_date_compact ),
+}
+
+# `{key}` or `{key:type}`
+_PLACEHOLDER = re.compile( r'{([^{}:]+)(?::([^{}]+))?}' )
+
+class _CompiledFilenameTemplate( NamedTuple ):
+    """Matcher and conversions compiled from a filename template."""
+    regex: re.Pattern
+    """Matches filenames, with one named group per placeholder"""
+    steps: tuple[tuple[int, str, Callable[[dict[str, Any], str, str], None]], ...]
+    """For each value to extract, in output order: index of its group (from
+    1), placeholder name, and conversion"""
+
+@functools.lru_cache( maxsize = 64 )
+def _compile_filename_template( template: str,
+            transforms: tuple[tuple[str, str], ...],
+        ) -> _CompiledFilenameTemplate:
+    """Compile a filename template (see `_make_filename_parser`) once.
+
+    Untyped placeholders match as much text as they can (`.+`), as they
+    always have; typed placeholders match only text of their type, and
+    `{key:identity}` as little text as it can (except at the end of the
+    template, where it takes the rest of the filename). Literal text is
+    matched verbatim: before templates were compiled, it was used as a regex
+    as it stood, so that, e.g., a literal '.' matched any character.
+    """
+    transforms = dict( transforms )
+
+    parts = []
+    types = dict()
+    groups = []
+    pos = 0
+    placeholders = list( _PLACEHOLDER.finditer( template ) )
+    for i, m in enumerate( placeholders ):
+        k, k_type = m.group( 1 ), m.group( 2 )
+        if k in types:
+            raise ValueError( f'Placeholder {{{k}}} appears more than once in filename template {template!r}' )
+        if k_type is not None and k_type not in _filename_parser_transforms:
+            raise ValueError( f'Unrecognized type of placeholder {{{k}:{k_type}}}' )
+        if k_type is not None and transforms.get( k, k_type ) != k_type:
+            raise ValueError( f'Placeholder {{{k}:{k_type}}} conflicts with transform {transforms[k]!r}' )
+
+        if k_type is None:
+            cur_pattern = r'.+'
+        elif k_type == 'identity' and i == len( placeholders ) - 1 and m.end() == len( template ):
+            cur_pattern = r'.+'
+        else:
+            cur_pattern = _filename_parser_transforms[k_type].pattern
+
+        parts.append( re.escape( template[pos:m.start()] ) )
+        parts.append( f'(?P<_{len( groups )}>{cur_pattern})' )
+        pos = m.end()
+        types[k] = k_type
+        groups.append( k )
+    parts.append( re.escape( template[pos:] ) )
+
+    for k, cur_transform in transforms.items():
+        if cur_transform not in _filename_parser_transforms:
+            raise ValueError( f'Unrecognized filename transform: {cur_transform}' )
+
+    # Transformed placeholders in the order of `transforms`, then typed
+    # placeholders in template order
+    keys = [ k for k in transforms if k in types ]
+    keys += [ k for k in groups if k not in transforms and types[k] is not None ]
+    steps = tuple(
+        (groups.index( k ) + 1, k, _filename_parser_transforms[transforms.get( k ) or types[k]].apply)
+        for k in keys
+    )
+
+    return _CompiledFilenameTemplate( re.compile( ''.join( parts ) ), steps )
+
 def _unformat( string, pattern ):
     """Reverse of string formatting - extract values from a formatted string.
 
@@ -214,52 +706,110 @@ def _unformat( string, pattern ):
 
     Args:
         string: The formatted string to parse
-        pattern: Format pattern with {key} placeholders (e.g., "mouse_{mouse_id}_slice_{slice_id}.tif")
+        pattern: Format pattern with {key} or {key:type} placeholders (e.g., "mouse_{mouse_id}_slice_{slice_id}.tif")
 
     Returns:
         Dictionary mapping placeholder names to extracted values
 
+    Raises:
+        ValueError: If `string` doesn't match `pattern` (formerly an
+            AssertionError)
+
     Example:
         >>> _unformat("mouse_123_slice_A5.tif", "mouse_{mouse_id}_slice_{slice_id}.tif")
         {'mouse_id': '123', 'slice_id': 'A5'}
     """
-    regex = re.sub( r'{(.+?)}', r'(?P<_\1>.+)', pattern )
-    search_res = re.search( regex, string )
-    assert search_res is not None
-    values = list( search_res.groups() )
-    keys = re.findall(r'{(.+?)}', pattern)
-    _dict = dict(zip(keys, values))
-    return _dict
+    regex = _compile_filename_template( pattern, () ).regex
+    search_res = regex.search( string )
+    if search_res is None:
+        raise ValueError( f'{string!r} does not match filename template {pattern!r}' )
+    keys = [ m.group( 1 ) for m in _PLACEHOLDER.finditer( pattern ) ]
+    return dict( zip( keys, search_res.groups() ) )
+
+class _TemplateFilenameParser:
+    """Filename parser built from a format template and named transforms.
+
+    Implemented as a class (rather than a closure) so that parsers can be
+    pickled and shipped to worker processes; the template is compiled when a
+    parser is constructed or unpickled, not per filename.
+    """
 
-_filename_parser_transforms = {
-    'identity': lambda d, k, x: dict( **d, **{ k: x } ),
-    'float': lambda d, k, x: dict( **d, **{ k: float( x ) } ),
-    'int': lambda d, k, x: dict( **d, **{ k: int( x ) } ),
-    'split_age_sex': lambda d, k, x: (
-        dict( **d,
-            **{
-                k.split( '_' )[0]: int( x[:-1] ),
-                k.split( '_' )[1]: x[-1],
-            }
-        )
-    ),
-    'date_compact': lambda d, k, x: dict( **d, **{ k: datetime.strptime( x, '%Y%m%d' ).isoformat() } ),
-}
+    def __init__( self, template: str, transforms: dict[str, str] ):
+        """Construct a new parser; see `_make_filename_parser`."""
+        self.template = template
+        self.transforms = dict( transforms )
+        self._compiled = _compile_filename_template( template, tuple( self.transforms.items() ) )
+
+    def __getstate__( self ) -> dict[str, Any]:
+        return { 'template': self.template, 'transforms': self.transforms }
+
+    def __setstate__( self, state: dict[str, Any] ) -> None:
+        self.__init__( state['template'], state['transforms'] )
 
-def _make_filename_parser( template: str, transforms: dict[str, str] ) -> _FilenameParser:
+    def __call__( self, x: str ) -> dict[str, Any]:
+        m = self._compiled.regex.search( x )
+        if m is None:
+            raise ValueError( f'{x!r} does not match filename template {self.template!r}' )
+
+        vals = { '_source_filename': x }
+        for i, k, apply in self._compiled.steps:
+            apply( vals, k, m.group( i ) )
+        return vals
+
+    def parse_many( self, xs: Iterable[str] ) -> list[dict[str, Any]]:
+        """Parse many filenames in one call.
+
+        Args:
+            xs: Filenames to parse
+
+        Returns:
+            Metadata of each filename, in order
+
+        Raises:
+            ValueError: If any filename doesn't match the template
+        """
+        search = self._compiled.regex.search
+        steps = self._compiled.steps
+
+        ret = []
+        for x in xs:
+            m = search( x )
+            if m is None:
+                raise ValueError( f'{x!r} does not match filename template {self.template!r}' )
+            vals = { '_source_filename': x }
+            for i, k, apply in steps:
+                apply( vals, k, m.group( i ) )
+            ret.append( vals )
+        return ret
+
+def _make_filename_parser( template: str, transforms: dict[str, str] | None = None ) -> _FilenameParser:
     """Create a custom filename parser from a template and transforms.
 
     Builds a function that extracts structured metadata from filenames
-    using a format template and type conversions.
+    using a format template and type conversions. The template is compiled
+    into a single regex once; the returned parser is picklable, so it can be
+    used with multi-process exports, and parses lists of filenames at once
+    with its `parse_many` method.
+
+    Placeholders are `{key}`, which matches as much text as it can, or
+    `{key:type}`, which matches only text of the given type (e.g., digits
+    for 'int') and converts it accordingly, so that adjacent placeholders
+    aren't ambiguous. Only typed placeholders and those with a transform
+    are extracted. Text outside placeholders is matched literally (it used
+    to be taken as a regex, so that a '.' matched any character), and the
+    parser raises a ValueError for filenames that don't match.
 
     Args:
-        template: Format pattern with {key} placeholders (e.g., "{date}_{mouse_id}_{slice_id}.tif")
+        template: Format pattern with {key} or {key:type} placeholders (e.g., "{date:date_compact}_{mouse_id:int}_{slice_id}.tif")
         transforms: Dictionary mapping placeholder names to transform functions
-            Available transforms: 'identity', 'float', 'int', 'split_age_sex', 'date_compact'
+            Available transforms (and placeholder types): 'identity', 'float', 'int', 'split_age_sex', 'date_compact'
 
     Returns:
         A parser function that takes a filename string and returns a metadata dictionary
 
+    Raises:
+        ValueError: If the template or transforms are malformed
+
     Example:
         >>> parser = _make_filename_parser(
         ...     "mouse_{mouse_id}_age_{age}.tif",
@@ -267,22 +817,915 @@ def _make_filename_parser( template: str, transforms: dict[str, str] ) -> _Filen
         ... )
         >>> parser("mouse_42_age_120.tif")
         {'_source_filename': 'mouse_42_age_120.tif', 'mouse_id': 42, 'age': 120}
+        >>> parser = _make_filename_parser( "{mouse_id:int}_{region:identity}_{slice_id:int}.tif" )
+        >>> parser.parse_many( ["7_CA1_2.tif", "8_V1_L23_3.tif"] )
+        [{'_source_filename': '7_CA1_2.tif', 'mouse_id': 7, 'region': 'CA1', 'slice_id': 2},
+         {'_source_filename': '8_V1_L23_3.tif', 'mouse_id': 8, 'region': 'V1_L23', 'slice_id': 3}]
     """
-    ##
-    def _ret( x: str ) -> dict[str, Any]:
-        vals_raw = _unformat( x, template )
-
-        vals = dict()
-        vals['_source_filename'] = x
-        for k, cur_transform in transforms.items():
-            if k not in vals_raw:
-                continue
-            cur_v = vals_raw[k]
-            vals = _filename_parser_transforms[cur_transform](vals, k, cur_v )
+    return _TemplateFilenameParser( template, transforms or dict() )
+
+
+# Multi-file series
+
+# Threads decoding the files of a multi-file series concurrently
+_SERIES_THREADS = 8
+# Files of a multi-file series kept open by a frame source at once
+_SERIES_MAX_OPEN = 64
+
+# Frame number at the end of a filename's stem (e.g., `..._Ch2_000001.ome.tif`)
+_FRAME_NUMBER = re.compile( r'(.*?)(\d+)(\D*)' )
+
+class _StackHeader( NamedTuple ):
+    """Shape, dtype, and file layout of the stack in a TIFF file."""
+    shape: tuple[int, ...]
+    """Shape of the stack"""
+    dtype: np.dtype
+    """Data type of the stack"""
+    frames: Optional[list[tuple[str, int]]] = None
+    """For a stack split across several TIFF files, the name of the file
+    (in the stack file's directory) and index of the page holding each
+    frame, in time order; None for a stack stored in a single file"""
+
+class _InspectedStack( NamedTuple ):
+    """What a single pass over a stack file's header and OME-XML finds."""
+    header: _StackHeader
+    """Shape, dtype, and layout of the stack"""
+    ome_metadata: _StackOMEMetadata
+    """OME-XML describing the stack (see `_read_ome_metadata`)"""
+
+def _page_ome_xml( tif: tifffile.TiffFile ) -> Optional[str]:
+    """OME-XML of a TIFF file's first page, whether or not `tif` was opened as OME."""
+    page = tif.pages.first
+    return page.description if page.is_ome else None
+
+def _ome_series_frames( handler: _OMEMetadataHandler, filename: str ) -> Optional[list[tuple[str, int]]]:
+    """Frame locations of a multi-file OME series, from its TiffData references.
+
+    Only frames of the channel stored in `filename` are kept, so that each
+    channel's file of a multi-channel recording locates its own frames.
+
+    Args:
+        handler: Fields of the series' OME-XML (see `_parse_ome_xml`)
+        filename: Name of the file the OME-XML was read from (that of
+            TiffData entries without a UUID FileName)
+
+    Returns:
+        File name and page index of each frame, or None if the series is
+        stored in a single file or its layout isn't one this handles (e.g.,
+        channels interleaved within each file)
+    """
+    if not any( x is not None and x != filename for x in handler.tiff_data_files ):
+        return None
+
+    attrs = handler.tiff_data_attrs
+    files = [ x if x is not None else filename
+              for x in handler.tiff_data_files ]
+
+    own = [ x.get( 'FirstC' ) for x, f in zip( attrs, files )
+            if f == filename ]
+    channel = int( own[0] or 0 ) if len( own ) > 0 else 0
+    size_c = int( ( handler.pixels or dict() ).get( 'SizeC', 1 ) )
+
+    entries = sorted( ( (int( x.get( 'FirstT', 0 ) ), int( x.get( 'IFD', 0 ) ), int( x.get( 'PlaneCount', 1 ) ), f)
+                        for x, f in zip( attrs, files )
+                        if int( x.get( 'FirstC', 0 ) ) == channel ),
+        key = lambda x: x[0],
+    )
+
+    ret = []
+    for _, ifd, plane_count, cur_file in entries:
+        if plane_count > 1 and size_c > 1:
+            return None
+        ret += [ (cur_file, ifd + i) for i in range( plane_count ) ]
+
+    if len( set( x for x, _ in ret ) ) < 2:
+        return None
+    return ret
+
+def _series_siblings( stack_path: Path, frame_pattern: str ) -> list[Path]:
+    """Files continuing the stack in `stack_path`, numbered after it (including itself).
+
+    Siblings match `frame_pattern` and differ from `stack_path` only in the
+    number at the end of their stem, which counts up from that of
+    `stack_path` without gaps (and with the same zero padding). They are
+    found by checking for each next name in turn, so a stack stored in a
+    single file costs a single `stat`, and the directory is never listed.
+    """
+    match = _FRAME_NUMBER.fullmatch( stack_path.name )
+    if match is None:
+        return [ stack_path ]
+    prefix, digits, suffix = match.group( 1 ), match.group( 2 ), match.group( 3 )
+
+    ret = [ stack_path ]
+    number = int( digits )
+    while True:
+        number += 1
+        name = f'{prefix}{number:0{len( digits )}d}{suffix}'
+        if not fnmatch.fnmatch( name, frame_pattern ) or not ( stack_path.parent / name ).is_file():
+            return ret
+        ret.append( stack_path.parent / name )
+
+def _file_pages( path: Path ) -> tuple[int, Optional[str]]:
+    """Number of pages and OME-XML of a TIFF file, read without assembling any series."""
+    with tifffile.TiffFile( path, is_ome = False ) as tif:
+        return len( tif.pages ), _page_ome_xml( tif )
+
+def _inspect_stack( stack_path: Path,
+        frame_pattern: str = '*.ome.tif*',
+        tif: Optional[tifffile.TiffFile] = None,
+    ) -> _InspectedStack:
+    """Size a stack and locate its frames, parsing its OME-XML once.
+
+    Stacks split across several TIFF files are recognized in two layouts:
+
+    - The OME-XML of `stack_path` references other files by their UUID
+      FileName (e.g., Bruker's one file per frame); frames are located from
+      its TiffData entries
+    - Otherwise, other files matching `frame_pattern` continue the
+      numbering of `stack_path` (one OME-TIFF per frame or block of frames,
+      each describing only itself); every page of each file, in order, is a
+      frame, and each file's OME-XML describes its own frames
+
+    Either is sized from the first frame's page and the number of frames
+    located; a stack in a single file, from its first series. The OME-XML
+    parsed here is returned parsed, so collating it (see
+    `_read_ome_metadata`) doesn't parse it again.
+
+    Args:
+        stack_path: First file of the stack (as resolved by
+            `frame_pattern_full`)
+        frame_pattern: Glob pattern matching the files of a stack
+        tif: `stack_path`, if already open; it is left open
+
+    Returns:
+        Header and OME-XML metadata of the stack
+    """
+    if tif is None:
+        with warnings.catch_warnings():
+            warnings.simplefilter( 'ignore' )
+            with tifffile.TiffFile( stack_path ) as tif:
+                return _inspect_stack( stack_path, frame_pattern, tif )
+
+    xml = _page_ome_xml( tif )
+    ome_metadata = None
+    if xml is not None:
+        ome_metadata = _ParsedOMEXML( xml, _parse_ome_xml( xml ) )
+
+        frames = _ome_series_frames( ome_metadata.handler, stack_path.name )
+        if frames is not None:
+            page = tif.pages.first
+            return _InspectedStack(
+                _StackHeader( (len( frames ), *page.shape), np.dtype( page.dtype ), frames ),
+                ome_metadata,
+            )
+
+    siblings = _series_siblings( stack_path, frame_pattern )
+    if len( siblings ) < 2:
+        series = tif.series[0]
+        return _InspectedStack(
+            _StackHeader( tuple( series.shape ), np.dtype( series.dtype ) ),
+            ome_metadata,
+        )
+
+    # Count the pages of the other files concurrently
+    with ThreadPoolExecutor( max_workers = _SERIES_THREADS ) as pool:
+        pages = [ (len( tif.pages ), ome_metadata) ] + list( pool.map( _file_pages, siblings[1:] ) )
+
+    page = tif.pages.first
+    frames = [ (x.name, i) for x, (n, _) in zip( siblings, pages )
+               for i in range( n ) ]
+    return _InspectedStack(
+        _StackHeader( (len( frames ), *page.shape), np.dtype( page.dtype ), frames ),
+        _SplitOMEMetadata(
+            xml = [ x for _, x in pages ],
+            n_frames = [ n for n, _ in pages ],
+        ),
+    )
+
+
+# Locating and sizing stacks
+
+_CHANNEL_TOKEN = re.compile( r'Ch(\d+)' )
+
+def _channel_number( filename: str ) -> int:
+    """Channel number in the `*_Ch{n}_*` token of a stack filename (0 if none)."""
+    match = _CHANNEL_TOKEN.search( filename.split( '_' )[-2] )
+    return int( match.group( 1 ) ) if match is not None else 0
+
+def _find_channel_files( path: Path,
+        frame_pattern_full: str = '*_*0001.ome.tif*',
+        candidates: Optional[list[str]] = None,
+    ) -> list[Path]:
+    """Locate the files holding the full stack of each channel of a recording.
+
+    Args:
+        path: Recording directory to search
+        frame_pattern_full: Glob pattern for full stack files
+        candidates: Names of the files in `path` matching
+            `frame_pattern_full`, if already known (e.g., from a cached
+            directory listing); globbed from `path` if None
+
+    Returns:
+        Paths of the full stack files, one per channel, ordered by channel number
+
+    Raises:
+        RuntimeError: If no matching TIFF files found or unsupported multi-channel format
+    """
+    raw_input_full = (
+        glob( frame_pattern_full, root_dir = path ) if candidates is None
+        else candidates
+    )
+
+    #
+    if len( raw_input_full ) == 1:
+        return [ path / raw_input_full[0] ]
         
-        return vals
+    elif len( raw_input_full ) > 1:
+
+        if all( 'Ch' in x.split( '_' )[-2]
+                for x in raw_input_full ):
+            return [ path / x
+                     for x in sorted( raw_input_full, key = lambda x: (_channel_number( x ), x) ) ]
+
+        else:
+            raise RuntimeError( f'Unsupported multi-channel format in {path.as_posix()}' )
     
-    return _ret
+    else:
+        raise RuntimeError( f'No matching image stack for {(path / frame_pattern_full).as_posix()}' )
+
+def _stack_header( stack_path: _Pathable,
+        frame_pattern: str = '*.ome.tif*',
+        metadata_cache: Optional[MetadataCache] = None,
+    ) -> _StackHeader:
+    """Shape, dtype, and layout of the stack in a TIFF file, read from its header only.
+
+    The file is opened once (see `_inspect_stack`). With a `metadata_cache`,
+    the header is read from (and stored in) the cache.
+    """
+    stack_path = Path( stack_path )
+
+    if metadata_cache is not None:
+        identity = metadata_cache.identify( stack_path )
+        ret = metadata_cache.header( identity, frame_pattern )
+        if ret is None:
+            ret = _stack_header( stack_path, frame_pattern )
+            metadata_cache.put_header( identity, frame_pattern, *ret )
+        return _StackHeader( *ret )
+
+    return _inspect_stack( stack_path, frame_pattern ).header
+
+def _resolve_stack_paths( path: _Pathable,
+        frame_pattern_full: str = '*_*0001.ome.tif*',
+        channels: ChannelMode = 'first',
+        stack_path: Optional[_Pathable | Sequence[_Pathable]] = None,
+    ) -> list[Path]:
+    """Full stack files that `load_tiff` reads for a recording, one per loaded channel."""
+    if stack_path is None:
+        ret = _find_channel_files( Path( path ), frame_pattern_full )
+    elif isinstance( stack_path, (str, Path) ):
+        ret = [ Path( stack_path ) ]
+    else:
+        ret = [ Path( x ) for x in stack_path ]
+
+    if channels == 'first':
+        return ret[:1]
+    if channels == 'all':
+        return ret
+    raise ValueError( f'Unrecognized channel mode: {channels}' )
+
+def estimate_movie_nbytes( path: _Pathable,
+        frame_pattern_full: str = '*_*0001.ome.tif*',
+        frame_pattern: str = '*.ome.tif*',
+        #
+        to_uint8: bool = False,
+        lazy: bool = False,
+        stack_path: Optional[_Pathable | Sequence[_Pathable]] = None,
+        channels: ChannelMode = 'first',
+        metadata_cache: Optional[MetadataCache] = None,
+    ) -> int:
+    """Estimate the resident size of the Movie that `load_tiff` would return.
+
+    Only the TIFF header is read, so this is cheap relative to loading.
+
+    Args:
+        path: Recording directory, as passed to `load_tiff`
+        frame_pattern_full: Glob pattern for full stack files
+        frame_pattern: Glob pattern for the files of a stack split across
+            several files (as for `load_tiff`)
+        to_uint8: Whether frames will be normalized to uint8
+        lazy: Whether frames will be loaded lazily; only a single frame is
+            then counted as resident
+        stack_path: Full stack file of the recording (or one per channel),
+            if already resolved (e.g., by `toile.plan.plan_export`)
+        channels: Which channels will be loaded (see `ChannelMode`)
+        metadata_cache: Cache of stack headers to consult first (see
+            `toile.metadata.MetadataCache`)
+
+    Returns:
+        Estimated size of the loaded frames in bytes
+    """
+    stack_paths = _resolve_stack_paths( path, frame_pattern_full, channels, stack_path )
+
+    # Channels are assumed to share the first one's shape, as `load_tiff` requires
+    header = _stack_header( stack_paths[0], frame_pattern, metadata_cache )
+    shape, dtype = header.shape, header.dtype
+    itemsize = 1 if to_uint8 else dtype.itemsize
+    # ... unless the first file's series already holds every channel
+    n_files = 1 if len( shape ) == 4 else len( stack_paths )
+
+    if lazy:
+        shape = shape[1:]
+
+    return int( np.prod( shape ) ) * itemsize * n_files
+
+
+# Lazy frame access
+
+class TiffFrameSource:
+    """Lazy, array-like view over the frames of a TIFF stack.
+
+    Opens the file once with `tifffile.TiffFile`. When the first series is
+    stored as a single contiguous, uncompressed block, frames are served from
+    a read-only memory map; otherwise each requested frame is decoded from its
+    pages on demand. Either way, only the frames being accessed are resident,
+    so peak memory is bounded by a few frames rather than the whole movie.
+
+    Supports the subset of the `numpy` interface used by the export
+    pipeline: `shape`, `dtype`, `ndim`, `len()`, and indexing with an integer,
+    slice, or tuple whose first element selects frames along time.
+
+    Attributes:
+        path: Path of the TIFF file backing this source
+        shape: Shape of the full stack (time, height, width)
+        dtype: Data type of frames produced by this source
+        transform: Optional function applied to each decoded block of frames
+            (e.g., uint8 normalization); if set, `dtype` reflects its output
+    """
+
+    def __init__( self, path: _Pathable,
+            tif: Optional[tifffile.TiffFile] = None,
+        ):
+        """Open a lazy frame source for the first series of a TIFF file.
+
+        Args:
+            path: Path of the TIFF file to read
+            tif: Optional already-open `TiffFile` for `path`; ownership is
+                transferred to this source, which closes it in `close()`
+        """
+        self.path = Path( path )
+        self.transform: Optional[Callable[[NDArray], NDArray]] = None
+        self._out_dtype: Optional[np.dtype] = None
+
+        if tif is None:
+            tif = tifffile.TiffFile( self.path )
+        self._tif: Optional[tifffile.TiffFile] = tif
+
+        series = tif.series[0]
+        self._shape = tuple( series.shape )
+        self._dtype = np.dtype( series.dtype )
+
+        # Number of pages making up a single frame (e.g., interleaved planes)
+        self._pages_per_frame = max( 1, len( series.pages ) // max( 1, self._shape[0] ) )
+
+        self._mmap: Optional[np.memmap] = None
+        if series.dataoffset is not None:
+            # Contiguous, uncompressed layout; map it directly
+            self._mmap = np.memmap( self.path,
+                dtype = self._dtype.newbyteorder( tif.byteorder ),
+                mode = 'r',
+                offset = series.dataoffset,
+                shape = self._shape,
+            )
+            # The map holds its own reference to the file
+            tif.close()
+            self._tif = None
+
+    ##
+
+    @property
+    def shape( self ) -> tuple[int, ...]:
+        """Shape of the full stack (time, height, width)."""
+        return self._shape
+
+    @property
+    def dtype( self ) -> np.dtype:
+        """Data type of the frames produced by this source."""
+        if self.transform is not None and self._out_dtype is not None:
+            return self._out_dtype
+        return self._dtype
+
+    @property
+    def ndim( self ) -> int:
+        """Number of dimensions of the full stack."""
+        return len( self._shape )
+
+    @property
+    def is_memmapped( self ) -> bool:
+        """Whether frames are served from a memory map rather than decoded."""
+        return self._mmap is not None
+
+    def __len__( self ) -> int:
+        return self._shape[0]
+
+    def set_transform( self, transform: Callable[[NDArray], NDArray],
+            dtype: np.dtype | type,
+        ) -> None:
+        """Apply `transform` to every block of frames read from this source.
+
+        Args:
+            transform: Function mapping a block of frames to a new block
+            dtype: Data type of the arrays produced by `transform`
+        """
+        self.transform = transform
+        self._out_dtype = np.dtype( dtype )
+
+    def _read( self, start: int, stop: int ) -> NDArray:
+        """Read frames `[start, stop)` as an array of shape (n, ...)."""
+        if self._mmap is not None:
+            return self._mmap[start:stop]
+
+        if self._tif is None:
+            raise ValueError( f'Frame source for {self.path.as_posix()} is closed' )
+
+        n = stop - start
+        if n <= 0:
+            return np.empty( (0, *self._shape[1:]), dtype = self._dtype )
+
+        ppf = self._pages_per_frame
+        key = start * ppf if n * ppf == 1 else slice( start * ppf, stop * ppf )
+        with warnings.catch_warnings():
+            # `tifffile` complains when reopening referenced OME files
+            warnings.simplefilter( 'ignore' )
+            ret = self._tif.asarray( key = key, series = 0 )
+        return ret.reshape( (n, *self._shape[1:]) )
+
+    def __getitem__( self, key: Any ) -> NDArray:
+        """Read frames lazily; the first index selects frames along time."""
+        if isinstance( key, tuple ):
+            key_t, key_rest = key[0], key[1:]
+        else:
+            key_t, key_rest = key, ()
+
+        n_frames = self._shape[0]
+
+        if isinstance( key_t, slice ):
+            start, stop, step = key_t.indices( n_frames )
+            if step == 1:
+                ret = self._read( start, max( start, stop ) )
+            else:
+                ret = np.stack( [ self._read( i, i + 1 )[0]
+                                  for i in range( start, stop, step ) ] )
+            scalar = False
+
+        else:
+            i = int( key_t )
+            if i < 0:
+                i += n_frames
+            if not 0 <= i < n_frames:
+                raise IndexError( f'Frame index {key_t} out of range for {n_frames} frames' )
+            ret = self._read( i, i + 1 )
+            scalar = True
+
+        if self.transform is not None:
+            ret = self.transform( ret )
+        if scalar:
+            ret = ret[0]
+        if len( key_rest ) > 0:
+            ret = ret[(slice( None ),) * (0 if scalar else 1) + key_rest]
+
+        return ret
+
+    def __array__( self, dtype = None, copy = None ) -> NDArray:
+        """Materialize the full stack in memory."""
+        ret = self[:]
+        if dtype is not None:
+            ret = ret.astype( dtype )
+        return np.asarray( ret )
+
+    def iter_blocks( self, block_size: int = 32 ):
+        """Iterate over the stack in blocks of at most `block_size` frames.
+
+        Transforms are not applied; this is intended for stack-wide statistics.
+
+        Yields:
+            Arrays of shape (n, ...) covering the stack in order
+        """
+        for start in range( 0, self._shape[0], block_size ):
+            yield self._read( start, min( start + block_size, self._shape[0] ) )
+
+    ##
+
+    def close( self ) -> None:
+        """Release the memory map and underlying file handle."""
+        self._mmap = None
+        if self._tif is not None:
+            self._tif.close()
+            self._tif = None
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ):
+        self.close()
+
+class OMESeriesFrameSource( TiffFrameSource ):
+    """Lazy, array-like view over a stack split across several TIFF files.
+
+    Frames are decoded from the pages located by `_inspect_stack`, rather
+    than through `tifffile`'s own assembly of multi-file OME series, which
+    opens every referenced file up front and decodes them one after
+    another. Here, files are opened on first access (at most `max_open` are
+    kept open), and blocks of frames spanning several files are decoded
+    concurrently, one thread per file, directly into the returned block.
+
+    Supports the same interface as `TiffFrameSource`; frames are never
+    memory-mapped.
+
+    Attributes:
+        path: Path of the stack's first file
+        frames: File name (in the directory of `path`) and page index of
+            each frame, in time order
+        shape: Shape of the full stack (time, height, width)
+        dtype: Data type of frames produced by this source
+        transform: Optional function applied to each decoded block of frames
+    """
+
+    def __init__( self, path: _Pathable,
+            frames: Sequence[tuple[str, int]],
+            threads: int = _SERIES_THREADS,
+            max_open: int = _SERIES_MAX_OPEN,
+        ):
+        """Open a lazy frame source for a stack split across files.
+
+        Args:
+            path: Path of the stack's first file
+            frames: File name and page index of each frame (see
+                `_StackHeader.frames`)
+            threads: Number of files decoded concurrently
+            max_open: Number of files kept open between reads
+        """
+        self.path = Path( path )
+        self.frames = list( frames )
+        self.transform: Optional[Callable[[NDArray], NDArray]] = None
+        self._out_dtype: Optional[np.dtype] = None
+        self._mmap = None
+        self._tif = None
+
+        self._threads = max( 1, threads )
+        self._max_open = max( 1, max_open )
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._handles: OrderedDict[int, tifffile.TiffFile] = OrderedDict()
+        self._closed = False
+
+        self._files = list( dict.fromkeys( x for x, _ in self.frames ) )
+        i_files = { x: i for i, x in enumerate( self._files ) }
+        self._frame_file = np.array( [ i_files[x] for x, _ in self.frames ], dtype = np.int64 )
+        self._frame_page = np.array( [ x for _, x in self.frames ], dtype = np.int64 )
+
+        if len( self.frames ) == 0:
+            raise ValueError( f'No frames in the series of {self.path.as_posix()}' )
+        tif, cached = self._acquire( int( self._frame_file[0] ) )
+        try:
+            page = tif.pages[int( self._frame_page[0] )]
+            self._shape = (len( self.frames ), *page.shape)
+            self._dtype = np.dtype( page.dtype ).newbyteorder( '=' )
+        finally:
+            if not cached:
+                tif.close()
+
+    ##
+
+    def _acquire( self, i_file: int ) -> tuple[tifffile.TiffFile, bool]:
+        """Handle of a file of the series, and whether it is kept open."""
+        with self._lock:
+            tif = self._handles.get( i_file )
+            if tif is not None:
+                self._handles.move_to_end( i_file )
+                return tif, True
+
+        tif = tifffile.TiffFile( self.path.parent / self._files[i_file], is_ome = False )
+        with self._lock:
+            if len( self._handles ) < self._max_open:
+                self._handles[i_file] = tif
+                return tif, True
+        return tif, False
+
+    def _make_room( self, needed: set[int] ) -> None:
+        """Close the least recently used files not in `needed`, to keep those open."""
+        with self._lock:
+            n_missing = len( needed.difference( self._handles ) )
+            for i_file in list( self._handles ):
+                if len( self._handles ) + n_missing <= self._max_open:
+                    break
+                if i_file not in needed:
+                    self._handles.pop( i_file ).close()
+
+    def _read( self, start: int, stop: int ) -> NDArray:
+        """Read frames `[start, stop)` as an array of shape (n, ...)."""
+        if self._closed:
+            raise ValueError( f'Frame source for {self.path.as_posix()} is closed' )
+
+        n = max( 0, stop - start )
+        ret = np.empty( (n, *self._shape[1:]), dtype = self._dtype )
+        if n == 0:
+            return ret
+
+        # Group the block's frames by file, keeping time order within each
+        block_files = self._frame_file[start:stop]
+        block_pages = self._frame_page[start:stop]
+        order = np.argsort( block_files, kind = 'stable' )
+        groups = np.split( order, np.flatnonzero( np.diff( block_files[order] ) ) + 1 )
+
+        self._make_room( set( int( block_files[x[0]] ) for x in groups ) )
+
+        def _read_group( group: NDArray ) -> None:
+            tif, cached = self._acquire( int( block_files[group[0]] ) )
+            try:
+                for i in group:
+                    tif.pages[int( block_pages[i] )].asarray( out = ret[i] )
+            finally:
+                if not cached:
+                    tif.close()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter( 'ignore' )
+            if len( groups ) == 1 or self._threads == 1:
+                for group in groups:
+                    _read_group( group )
+            else:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor( max_workers = self._threads )
+                # Consume the results to surface any error
+                list( self._pool.map( _read_group, groups ) )
+
+        return ret
+
+    ##
+
+    def close( self ) -> None:
+        """Release every open file of the series."""
+        self._closed = True
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        with self._lock:
+            for tif in self._handles.values():
+                tif.close()
+            self._handles.clear()
+
+class MultiChannelFrameSource:
+    """Lazy, array-like view stacking the frames of per-channel TIFF stacks.
+
+    Wraps one `TiffFrameSource` per channel (each memory-mapped where its
+    layout allows, and each with its own transform), presenting them as a
+    single (time, channel, height, width) stack. Indexing follows
+    `TiffFrameSource`: the first index selects frames along time, and only
+    the selected frames of each channel are read.
+
+    Attributes:
+        sources: Frame source of each channel, in channel order
+        shape: Shape of the full stack (time, channel, height, width)
+    """
+
+    def __init__( self, sources: Sequence[TiffFrameSource] ):
+        """Stack per-channel frame sources.
+
+        Args:
+            sources: Frame source of each channel; ownership is transferred
+                to this source, which closes them in `close()`
+
+        Raises:
+            RuntimeError: If the channels' stacks differ in shape
+        """
+        self.sources = list( sources )
+
+        shapes = [ x.shape for x in self.sources ]
+        if len( set( shapes ) ) != 1:
+            raise RuntimeError( f'Channel stacks differ in shape: {shapes}' )
+        self._shape = (shapes[0][0], len( self.sources ), *shapes[0][1:])
+
+    ##
+
+    @property
+    def shape( self ) -> tuple[int, ...]:
+        """Shape of the full stack (time, channel, height, width)."""
+        return self._shape
+
+    @property
+    def dtype( self ) -> np.dtype:
+        """Data type of the frames produced by this source."""
+        return self.sources[0].dtype
+
+    @property
+    def ndim( self ) -> int:
+        """Number of dimensions of the full stack."""
+        return len( self._shape )
+
+    @property
+    def is_memmapped( self ) -> bool:
+        """Whether every channel's frames are served from a memory map."""
+        return all( x.is_memmapped for x in self.sources )
+
+    def __len__( self ) -> int:
+        return self._shape[0]
+
+    def __getitem__( self, key: Any ) -> NDArray:
+        """Read frames lazily; the first index selects frames along time."""
+        if isinstance( key, tuple ):
+            key_t, key_rest = key[0], key[1:]
+        else:
+            key_t, key_rest = key, ()
+
+        scalar = not isinstance( key_t, slice )
+        ret = np.stack( [ x[key_t] for x in self.sources ],
+            axis = 0 if scalar else 1,
+        )
+        if len( key_rest ) > 0:
+            ret = ret[(slice( None ),) * (0 if scalar else 1) + key_rest]
+
+        return ret
+
+    def __array__( self, dtype = None, copy = None ) -> NDArray:
+        """Materialize the full stack in memory."""
+        ret = self[:]
+        if dtype is not None:
+            ret = ret.astype( dtype )
+        return np.asarray( ret )
+
+    def iter_blocks( self, block_size: int = 32 ):
+        """Iterate over the stack in blocks of at most `block_size` frames.
+
+        Transforms are not applied; this is intended for stack-wide statistics.
+
+        Yields:
+            Arrays of shape (n, channel, ...) covering the stack in order
+        """
+        for blocks in zip( *( x.iter_blocks( block_size ) for x in self.sources ) ):
+            yield np.stack( blocks, axis = 1 )
+
+    ##
+
+    def close( self ) -> None:
+        """Release every channel's memory map and file handle."""
+        for x in self.sources:
+            x.close()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ):
+        self.close()
+
+def close_movie( movie: Movie ) -> None:
+    """Release any file resources held by a lazily-loaded Movie.
+
+    This is a no-op for movies whose frames are plain in-memory arrays.
+
+    Args:
+        movie: Movie returned by `load_tiff`
+    """
+    close = getattr( movie.frames, 'close', None )
+    if callable( close ) and not isinstance( movie.frames, np.ndarray ):
+        close()
+
+
+# Loading stacks
+
+def _read_stack( stack_path: Path,
+        frame_pattern: str,
+        to_uint8: bool,
+        normalization: NormalizationMode,
+        percentiles: tuple[float, float],
+        inspected: Optional[_InspectedStack] = None,
+    ) -> tuple[NDArray, _InspectedStack]:
+    """Read a full stack into memory, along with its header and OME-XML metadata.
+
+    The stack file is opened once, and serves its header, OME-XML, and
+    frames; `inspected` (see `_inspect_stack`), if already known (e.g.,
+    from a metadata cache), saves reading the header again.
+    """
+    if inspected is None or inspected.header.frames is None:
+        with warnings.catch_warnings():
+            warnings.simplefilter( 'ignore' )
+            with tifffile.TiffFile( stack_path ) as tif:
+                if inspected is None:
+                    inspected = _inspect_stack( stack_path, frame_pattern, tif )
+                if inspected.header.frames is None:
+                    stack = tif.asarray()
+
+    if inspected.header.frames is not None:
+        # Decode every file's frames straight into the one stack
+        with OMESeriesFrameSource( stack_path, inspected.header.frames ) as source:
+            stack = source[:]
+
+    if to_uint8:
+        # Perform stack-wide image normalization
+        stack = _normalize_uint8( stack, normalization, percentiles )
+
+    return stack, inspected
+
+def _open_stack( stack_path: Path,
+        frame_pattern: str,
+        to_uint8: bool,
+        normalization: NormalizationMode,
+        percentiles: tuple[float, float],
+        inspected: Optional[_InspectedStack] = None,
+    ) -> tuple[TiffFrameSource, _InspectedStack]:
+    """Open a stack lazily, along with its header and OME-XML metadata.
+
+    As for `_read_stack`, a stack in a single file is opened once, and the
+    same handle serves its header, OME-XML, and frames.
+    """
+    if inspected is None or inspected.header.frames is None:
+        tif = tifffile.TiffFile( stack_path )
+        try:
+            if inspected is None:
+                inspected = _inspect_stack( stack_path, frame_pattern, tif )
+        except Exception:
+            tif.close()
+            raise
+        if inspected.header.frames is None:
+            stack = TiffFrameSource( stack_path, tif = tif )
+        else:
+            tif.close()
+
+    if inspected.header.frames is not None:
+        stack = OMESeriesFrameSource( stack_path, inspected.header.frames )
+
+    if to_uint8:
+        try:
+            # Stack-wide statistics from a streaming pass, then scale frames on access
+            normalizer = _fit_uint8_normalizer( stack.iter_blocks(),
+                normalization, percentiles,
+            )
+        except Exception:
+            stack.close()
+            raise
+        stack.set_transform( normalizer, np.uint8 )
+
+    return stack, inspected
+
+def _load_channels( load: Callable[[Path], tuple[Any, _InspectedStack]],
+        stack_paths: list[Path],
+        release: Optional[Callable[[Any], Any]] = None,
+    ) -> tuple[list[Any], list[_InspectedStack]]:
+    """Load the stack file of each channel concurrently.
+
+    Args:
+        load: Function loading a stack file into its frames, along with
+            its header and OME-XML metadata (see `_inspect_stack`)
+        stack_paths: Stack file of each channel
+        release: Function releasing the frames of a channel, called for the
+            channels that did load if any other failed
+
+    Returns:
+        Frames, and header and OME-XML metadata, of each channel, in order
+    """
+    if len( stack_paths ) == 1:
+        frames, inspected = load( stack_paths[0] )
+        return [ frames ], [ inspected ]
+
+    with ThreadPoolExecutor( max_workers = len( stack_paths ) ) as pool:
+        futures = [ pool.submit( load, x ) for x in stack_paths ]
+
+    errors = [ x.exception() for x in futures
+               if x.exception() is not None ]
+    if len( errors ) > 0:
+        if release is not None:
+            for x in futures:
+                if x.exception() is None:
+                    release( x.result()[0] )
+        raise errors[0]
+
+    return [ x.result()[0] for x in futures ], [ x.result()[1] for x in futures ]
+
+def _collate_channels( image_metadata: dict[str, Any],
+        n_files: int,
+        collate_file: Callable[[int], dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+    """Channel entries of a recording loaded from one stack file per channel.
+
+    The first file's entries are used if there is one per file (as when each
+    file's OME-XML describes the whole acquisition); otherwise the entries
+    of every file are concatenated.
+
+    Args:
+        image_metadata: Collated OME metadata of the first channel's file
+        n_files: Number of channel files
+        collate_file: Function collating the OME metadata of a channel's
+            file, by index
+
+    Returns:
+        Channel metadata dictionaries
+    """
+    ret = list( image_metadata.get( 'channels', [] ) )
+    if len( ret ) == n_files:
+        return ret
+
+    for i in range( 1, n_files ):
+        ret += collate_file( i ).get( 'channels', [] )
+    return ret
 
 
 ##
@@ -294,6 +1737,13 @@ def load_tiff( path: _Pathable,
         filename_parser: Optional[_FilenameParser] = None,
         #
         to_uint8: bool = False,
+        normalization: NormalizationMode = 'max',
+        percentiles: tuple[float, float] = (0.1, 99.9),
+        lazy: bool = False,
+        metadata_parser: MetadataParser = 'fast',
+        stack_path: Optional[_Pathable | Sequence[_Pathable]] = None,
+        channels: ChannelMode = 'first',
+        metadata_cache: Optional[MetadataCache] = None,
     ) -> Movie:
     """Load a TIFF stack from a directory with OME-TIFF metadata extraction.
 
@@ -302,19 +1752,50 @@ def load_tiff( path: _Pathable,
     Supports optional filename parsing for batch processing and uint8 normalization
     for ML pipelines.
 
+    Stacks split across several files (one OME-TIFF per frame or per block
+    of frames) are assembled from the file matched by `frame_pattern_full`:
+    from the files its OME-XML references by UUID FileName, or else from
+    the files matching `frame_pattern` that continue its numbering. Files
+    are read concurrently, and lazily if `lazy` is set (see
+    `OMESeriesFrameSource`).
+
     Args:
         path: Directory path containing TIFF files
         frame_pattern_full: Glob pattern for full stack files (default: first frame pattern)
-        frame_pattern: Fallback glob pattern for TIFF files
+        frame_pattern: Glob pattern for the files of a stack split across
+            several files
         filename_parser: Optional function to extract metadata from filenames
             If None, only filename is stored in metadata
         to_uint8: If True, normalize stack to uint8 (0-255) based on stack-wide max value
+        normalization: How to map intensities to uint8 when `to_uint8` is set:
+            'max' (stack-wide max), 'percentile' (stack-wide low/high
+            percentiles, clipped), or 'frame' (each frame's own max)
+        percentiles: Low and high percentiles used by 'percentile' normalization
+        lazy: If True, open the stack once and return frames as a lazy
+            `TiffFrameSource` (memory-mapped where the layout allows, or an
+            `OMESeriesFrameSource` for split stacks) instead of reading the
+            whole stack into memory; release it with `close_movie`
+        metadata_parser: OME-XML parser - 'fast' (streaming) or 'xmltodict'
+        stack_path: Full stack file of the recording (or one per channel),
+            if already resolved (e.g., by `toile.plan.plan_export`); skips
+            searching `path`
+        channels: Which channels to load (see `ChannelMode`). With 'all',
+            the channels' stack files are read concurrently, and each is
+            normalized on its own when `to_uint8` is set
+        metadata_cache: Cache of collated OME metadata and stack headers
+            (see `toile.metadata.MetadataCache`); stacks whose files are
+            unchanged since they were cached are opened only to read their
+            frames, with their header, layout, and metadata taken from the
+            cache, and other stacks are added to it
 
     Returns:
         Movie object containing:
-            - frames: 3D numpy array (time, height, width)
+            - frames: 3D numpy array (time, height, width), or 4D (time,
+              channel, height, width) if `channels` is 'all'; if `lazy` is
+              set, a `TiffFrameSource` (or `MultiChannelFrameSource`) with
+              the same shape
             - metadata: Combined filename and OME-TIFF metadata
-            - frame_metadata: List of per-frame metadata dictionaries
+            - frame_metadata: Per-frame metadata as a `FrameMetadataTable`
 
     Raises:
         RuntimeError: If no matching TIFF files found or unsupported multi-channel format
@@ -338,74 +1819,104 @@ def load_tiff( path: _Pathable,
     #
 
     # Try full-stack load
-    raw_input_full = glob( frame_pattern_full, root_dir = path )
-    first_frame_path = None
-
-    # try:
-
-    #
-    if len( raw_input_full ) == 1:
-        first_frame_path = path / raw_input_full[0]
-        
-    elif len( raw_input_full ) > 1:
-
-        if all( 'Ch' in x.split( '_' )[-2]
-                for x in raw_input_full ):
-            first_frame_path = path / raw_input_full[0]
-
-        else:
-            raise RuntimeError( f'Unsupported multi-channel format in {path.as_posix()}' )
-    
-    else:
-        raise RuntimeError( f'No matching image stack for {(path / frame_pattern_full).as_posix()}' )
-
-    #
-
-    assert first_frame_path is not None
+    stack_paths = _resolve_stack_paths( path, frame_pattern_full, channels, stack_path )
+    first_frame_path = stack_paths[0]
+
+    # Stacks inspected ahead of loading, which loaders then don't inspect again
+    inspected: dict[Path, _InspectedStack] = dict()
+
+    # Identify files before reading them, so that changes made meanwhile
+    # invalidate what is cached; stacks with current entries are opened
+    # only to read their frames
+    identities: dict[Path, _StackIdentity] = dict()
+    cached_metadata: dict[Path, dict[str, Any]] = dict()
+    if metadata_cache is not None:
+        for cur_path in stack_paths:
+            identities[cur_path] = metadata_cache.identify( cur_path )
+            cur_header = metadata_cache.header( identities[cur_path], frame_pattern )
+            cur_metadata = metadata_cache.metadata( identities[cur_path], frame_pattern, metadata_parser )
+            if cur_header is not None and cur_metadata is not None:
+                inspected[cur_path] = _InspectedStack( _StackHeader( *cur_header ), None )
+                cached_metadata[cur_path] = cur_metadata
+
+    if len( stack_paths ) > 1:
+        if first_frame_path not in inspected:
+            inspected[first_frame_path] = _inspect_stack( first_frame_path, frame_pattern )
+        if len( inspected[first_frame_path].header.shape ) == 4:
+            # The first file's series already assembles every channel
+            stack_paths = stack_paths[:1]
 
     #
 
-    # We suppress stderr to hopefully avoid scikit-image's nonsense
-    with suppress_stderr():
-
+    if lazy:
         first_frame_filename = first_frame_path.name
-        # print( first_frame_filename )
-        # print( os.path.split( first_frame_filename ) )
         filename_metadata = filename_parser( os.path.split( first_frame_filename )[1] )
-        # from pprint import pprint
-        # pprint( filename_metadata )
-        stack = skio.imread( first_frame_path )
-    
-    # except Exception as e:
-    #     print( f'Issue with:' )
-    #     print( raw_input_full )
-    #     # Re-raise
-    #     raise e
 
-    #
+        with warnings.catch_warnings():
+            warnings.simplefilter( 'ignore' )
 
-    if to_uint8:
-        # Perform stack-wide image normalization
-        max_value = np.max( stack )
-        tmp = (255. / max_value) * stack.astype( float )
-        tmp = np.floor( tmp )
-        stack = tmp.astype( np.uint8 )
+            sources, loaded = _load_channels(
+                lambda x: _open_stack( x, frame_pattern, to_uint8, normalization, percentiles,
+                    inspected.get( x ) ),
+                stack_paths,
+                release = lambda x: x.close(),
+            )
 
-    #
+        if channels == 'all' and sources[0].ndim == 3:
+            try:
+                stack = MultiChannelFrameSource( sources )
+            except Exception:
+                for x in sources:
+                    x.close()
+                raise
+        else:
+            stack = sources[0]
 
-    # filename_metadata = filename_parser( os.path.split( path )[1] )
+    else:
+        # We suppress stderr to hopefully avoid scikit-image's nonsense
+        with suppress_stderr(), warnings.catch_warnings():
+            warnings.simplefilter( 'ignore' )
+
+            first_frame_filename = first_frame_path.name
+            filename_metadata = filename_parser( os.path.split( first_frame_filename )[1] )
+            stacks, loaded = _load_channels(
+                lambda x: _read_stack( x, frame_pattern, to_uint8, normalization, percentiles,
+                    inspected.get( x ) ),
+                stack_paths,
+            )
+
+        if channels == 'all' and stacks[0].ndim == 3:
+            shapes = [ x.shape for x in stacks ]
+            if len( set( shapes ) ) != 1:
+                raise RuntimeError( f'Channel stacks of {path.as_posix()} differ in shape: {shapes}' )
+            stack = np.stack( stacks, axis = 1 )
+        else:
+            stack = stacks[0]
+        del stacks
 
-    with warnings.catch_warnings():
-        warnings.simplefilter( 'ignore' )
+    #
 
-        with tifffile.TiffFile( first_frame_path ) as tif:
-            if tif.ome_metadata is not None:
-                image_metadata = _collate_metadata( xmltodict.parse( tif.ome_metadata ) )
-            else:
-                image_metadata = dict()
+    def _collate_file( i: int ) -> dict[str, Any]:
+        cur_path = stack_paths[i]
+        if cur_path in cached_metadata:
+            return cached_metadata[cur_path]
+
+        ret = _read_ome_metadata( loaded[i].ome_metadata, metadata_parser )
+        if metadata_cache is not None:
+            cur_header = loaded[i].header
+            metadata_cache.put_header( identities[cur_path], frame_pattern, *cur_header )
+            metadata_cache.put_metadata( identities[cur_path], frame_pattern, metadata_parser, ret,
+                cur_header.frames,
+            )
+        return ret
+
+    image_metadata = _collate_file( 0 )
+    if channels == 'all':
+        channel_metadata = _collate_channels( image_metadata, len( loaded ), _collate_file )
+        if len( channel_metadata ) > 0:
+            image_metadata['channels'] = channel_metadata
     
-    frame_metadata = image_metadata.get( 'frames', None )
-    del image_metadata['frames']
+    frame_metadata = image_metadata.pop( 'frames', None )
 
     movie_metadata = dict(
         **filename_metadata,
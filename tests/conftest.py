@@ -0,0 +1,118 @@
+"""Synthetic OME-TIFF recordings shared by the tests."""
+
+##
+# Imports
+
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pytest
+import tifffile
+
+from typing import (
+    NamedTuple,
+)
+
+
+##
+# Writing recordings
+
+_OME_NS = 'http://www.openmicroscopy.org/Schemas/OME/2015-01'
+
+class Recording( NamedTuple ):
+    """A synthetic recording written to disk."""
+    path: Path
+    """Recording directory"""
+    frames: np.ndarray
+    """Pixels of the recording's stack, as written"""
+
+def _ome_xml( frames: np.ndarray, files: list[tuple[str, int]] ) -> str:
+    """OME-XML of a single-channel uint16 stack whose frame `i` is IFD
+    `files[i][1]` of the file named `files[i][0]`."""
+    n_frames, height, width = frames.shape
+    tiff_data = ''.join(
+        f'<TiffData IFD="{ifd}" PlaneCount="1" FirstT="{i}" FirstZ="0" FirstC="0">'
+        f'<UUID FileName="{name}">urn:uuid:{uuid.uuid4()}</UUID></TiffData>'
+        for i, (name, ifd) in enumerate( files )
+    )
+    planes = ''.join(
+        f'<Plane TheT="{i}" TheZ="0" TheC="0" DeltaT="{0.1 * i:.3f}"'
+        ' PositionX="1.5" PositionY="-2.0" PositionZ="30.0" />'
+        for i in range( n_frames )
+    )
+    return (
+        f'<?xml version="1.0" encoding="utf-8"?><OME xmlns="{_OME_NS}" UUID="urn:uuid:{uuid.uuid4()}">'
+        '<Image ID="Image:1" Name="x"><AcquisitionDate>2024-01-15T14:30:00</AcquisitionDate>'
+        f'<Pixels ID="Pixels:1" DimensionOrder="XYCZT" Type="uint16" SizeX="{width}" SizeY="{height}"'
+        f' SizeZ="1" SizeC="1" SizeT="{n_frames}" PhysicalSizeX="0.5" PhysicalSizeY="0.5" PhysicalSizeZ="1.0">'
+        '<Channel ID="Channel:1:0" Name="Ch2" SamplesPerPixel="1" />'
+        f'{tiff_data}{planes}</Pixels></Image></OME>'
+    )
+
+def write_recording( path: Path,
+            name: str,
+            shape: tuple[int, int, int] = (12, 32, 24),
+            compression: str | None = None,
+            split: bool = False,
+            seed: int = 0,
+        ) -> Recording:
+    """Write a single-channel OME-TIFF recording to the directory `path`.
+
+    Args:
+        path: Recording directory to create
+        name: Stack filename stem (e.g., 'mouse_12_slice_A_Cycle00001_Ch2')
+        shape: Shape of the stack
+        compression: TIFF compression of its pages (e.g., 'zlib'), or None
+            for contiguous, memory-mappable pages
+        split: Write each frame to its own numbered file, rather than one
+            multi-page file
+        seed: Seed of the random pixels
+    """
+    path.mkdir( parents = True )
+    frames = np.random.default_rng( seed ).integers( 0, 4000, size = shape, dtype = np.uint16 )
+
+    if split:
+        names = [ f'{name}_{i + 1:06d}.ome.tif' for i in range( shape[0] ) ]
+        xml = _ome_xml( frames, [ (x, 0) for x in names ] )
+        for i, cur_name in enumerate( names ):
+            tifffile.imwrite( path / cur_name, frames[i],
+                description = xml if i == 0 else None,
+                metadata = None,
+            )
+    else:
+        cur_name = f'{name}_000001.ome.tif'
+        xml = _ome_xml( frames, [ (cur_name, i) for i in range( shape[0] ) ] )
+        with tifffile.TiffWriter( path / cur_name ) as tif:
+            for i in range( shape[0] ):
+                tif.write( frames[i],
+                    description = xml if i == 0 else None,
+                    metadata = None,
+                    compression = compression,
+                    contiguous = compression is None,
+                )
+
+    return Recording( path, frames )
+
+
+##
+# Fixtures
+
+@pytest.fixture( scope = 'session' )
+def recordings( tmp_path_factory ) -> list[Recording]:
+    """Recordings in each layout: a contiguous stack, a zlib-compressed
+    stack, and a stack split into one file per frame, in export order."""
+    root = tmp_path_factory.mktemp( 'recordings' )
+    return [
+        write_recording( root / 'rec1', 'mouse_12_slice_A_Cycle00001_Ch2', seed = 1 ),
+        write_recording( root / 'rec2', 'mouse_13_slice_B_Cycle00001_Ch2', seed = 2,
+            compression = 'zlib',
+        ),
+        write_recording( root / 'rec3', 'mouse_14_slice_C_Cycle00001_Ch2', seed = 3,
+            shape = (9, 20, 16),
+            split = True,
+        ),
+    ]
+
+
+#
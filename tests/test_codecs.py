@@ -0,0 +1,121 @@
+"""Tests for image codecs (`toile.codecs`)."""
+
+##
+# Imports
+
+import numpy as np
+import pytest
+
+import toile.schema as schema
+from toile.codecs import (
+    METADATA_MEMBER,
+    _encode_sample_buffers,
+    decode_image,
+    decode_sample,
+    encode_image,
+    encode_sample,
+    image_member,
+    sample_codec,
+)
+
+
+##
+# Helpers
+
+def _image( dtype: str, shape: tuple[int, ...] = (17, 23) ) -> np.ndarray:
+    rng = np.random.default_rng( 0 )
+    if np.dtype( dtype ).kind == 'f':
+        return rng.normal( size = shape ).astype( dtype )
+    return rng.integers( 0, np.iinfo( dtype ).max, size = shape, endpoint = True, dtype = dtype )
+
+def _require( codec: str ) -> None:
+    """Skip codecs whose optional dependency isn't installed."""
+    if codec == 'zstd':
+        pytest.importorskip( 'zstandard' )
+    elif codec == 'lz4':
+        pytest.importorskip( 'lz4' )
+
+_METADATA = { 'filename': 'x.ome.tif', 't_index': 3, 't': 0.25, 'channels': [ { 'name': 'Ch2' } ] }
+
+
+##
+# Round trips
+
+@pytest.mark.parametrize( 'codec', ['raw', 'npy', 'zstd', 'lz4'] )
+@pytest.mark.parametrize( 'dtype', ['uint8', 'uint16', 'int32', 'float32'] )
+@pytest.mark.parametrize( 'shape', [(17, 23), (2, 17, 23)] )
+def test_image_round_trip( codec, dtype, shape ):
+    _require( codec )
+    image = _image( dtype, shape )
+    ret = decode_image( encode_image( image, codec ), codec )
+    assert ret.dtype == image.dtype and ret.shape == image.shape
+    assert np.array_equal( ret, image )
+
+@pytest.mark.parametrize( 'dtype', ['uint8', 'uint16'] )
+def test_png16_round_trip( dtype ):
+    image = _image( dtype )
+    ret = decode_image( encode_image( image, 'png16' ), 'png16' )
+    assert ret.dtype == image.dtype and np.array_equal( ret, image )
+
+@pytest.mark.parametrize( 'codec', ['zstd', 'lz4', 'png16'] )
+def test_levels( codec ):
+    _require( codec )
+    image = _image( 'uint16' )
+    for level in (1, 9):
+        assert np.array_equal( decode_image( encode_image( image, codec, level ), codec ), image )
+
+def test_non_contiguous_image():
+    image = _image( 'uint16', (40, 30) )[::2, ::3]
+    assert np.array_equal( decode_image( encode_image( image, 'raw' ), 'raw' ), image )
+
+@pytest.mark.parametrize( 'codec', ['raw', 'npy', 'zstd', 'lz4', 'png16'] )
+def test_sample_round_trip( codec ):
+    _require( codec )
+    fields = { 'image': _image( 'uint16' ), 'metadata': _METADATA }
+    members = encode_sample( fields, codec )
+    assert set( members ) == { image_member( codec ), METADATA_MEMBER }
+    assert sample_codec( members ) == codec
+
+    ret = decode_sample( members )
+    assert np.array_equal( ret['image'], fields['image'] )
+    assert ret['metadata'] == _METADATA
+    assert schema.Frame( **ret ).metadata == _METADATA
+
+def test_unrecognized_codec():
+    with pytest.raises( ValueError ):
+        encode_image( _image( 'uint8' ), 'jpeg' )
+    with pytest.raises( ValueError ):
+        decode_sample( { METADATA_MEMBER: b'' } )
+    assert sample_codec( ['msgpack'] ) is None
+
+
+##
+# Serialization without copies
+
+def _joined( members: dict ) -> dict[str, bytes]:
+    return { k: b''.join( bytes( x ) for x in v ) if isinstance( v, tuple ) else v
+             for k, v in members.items() }
+
+@pytest.mark.parametrize( 'dtype', ['uint8', 'uint16', 'float32'] )
+@pytest.mark.parametrize( 'shape', [(17, 23), (2, 17, 23), (300, 300)] )
+def test_buffers_match_packed( dtype, shape ):
+    for metadata in (_METADATA, None):
+        frame = schema.Frame( image = _image( dtype, shape ), metadata = metadata )
+        fields = { 'image': frame.image, 'metadata': frame.metadata }
+        members = _encode_sample_buffers( fields, 'atdata' )
+        assert members is not None
+        # The pixels are a view of the image, not a copy
+        assert np.shares_memory( np.asarray( members['msgpack'][1] ), frame.image )
+        assert _joined( members ) == { 'msgpack': frame.packed }
+
+def test_buffers_match_raw():
+    fields = { 'image': _image( 'uint16' ), 'metadata': _METADATA }
+    assert _joined( _encode_sample_buffers( fields, 'raw' ) ) == encode_sample( fields, 'raw' )
+
+def test_buffers_fall_back():
+    image = _image( 'uint16', (40, 30) )
+    assert _encode_sample_buffers( { 'image': image[::2], 'metadata': None }, 'atdata' ) is None
+    assert _encode_sample_buffers( { 'image': image, 'metadata': None }, 'npy' ) is None
+
+
+#
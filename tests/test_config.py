@@ -0,0 +1,97 @@
+"""Tests for export settings given as CLI options and YAML configs."""
+
+##
+# Imports
+
+import pytest
+
+from typer.testing import CliRunner
+
+import toile.export
+from toile import app
+from toile.export import (
+    ExportConfig,
+    _standardize_config_args,
+)
+
+
+##
+# Fixtures
+
+@pytest.fixture
+def config_path( tmp_path ):
+    ret = tmp_path / 'config.yaml'
+    ret.write_text(
+        'inputs:\n'
+        '  - "/data/*"\n'
+        'to_uint8: true\n'
+        'workers: 2\n'
+        'shard_size: 1000\n'
+        'percentiles: [1.0, 99.0]\n'
+    )
+    return ret
+
+@pytest.fixture
+def exported( monkeypatch ):
+    """Configs the CLI would export with, in place of exporting."""
+    ret = []
+    monkeypatch.setattr( toile.export, '_export_config',
+        lambda config, output, kind, verbose = False: ret.append( (kind, config) ) )
+    return ret
+
+
+##
+# Merging
+
+def test_yaml_without_options( config_path ):
+    config = _standardize_config_args( config_path )
+    assert config.to_uint8 and config.workers == 2 and config.shard_size == 1000
+    assert config.lazy == ExportConfig.lazy
+
+def test_options_override_yaml( config_path ):
+    config = _standardize_config_args( config_path,
+        workers = 8,
+        lazy = True,
+        percentile_high = 98.,
+        stem = 'S',
+    )
+    assert config.workers == 8 and config.lazy and config.output_stem == 'S'
+    assert config.to_uint8 and config.shard_size == 1000
+    assert tuple( config.percentiles ) == (1., 98.)
+
+def test_pds_and_shard_size( config_path ):
+    assert _standardize_config_args( config_path, pds = True ).shard_size == 38_000_000
+    assert _standardize_config_args( config_path, pds = True, shard_size = 5 ).shard_size == 5
+    assert _standardize_config_args( config_path, shard_size = -1 ).shard_size == 1000
+    assert _standardize_config_args( '/data/rec' ).shard_size == ExportConfig.shard_size
+
+def test_invalid_settings( config_path ):
+    with pytest.raises( ValueError ):
+        _standardize_config_args( config_path, normalization = 'bogus' )
+    with pytest.raises( ValueError ):
+        _standardize_config_args( config_path, not_a_setting = 1 )
+
+
+##
+# CLI
+
+def test_cli_given_options_override_yaml( config_path, exported, tmp_path ):
+    res = CliRunner().invoke( app, [
+        'export', 'clips', str( config_path ), str( tmp_path / 'out' ),
+        '--clip-length', '8', '--workers', '4', '--no-uint8',
+    ] )
+    assert res.exit_code == 0, res.output
+    [(kind, config)] = exported
+    assert kind == 'clips'
+    assert config.clip_length == 8 and config.workers == 4 and not config.to_uint8
+    # Left at their defaults, so not overriding the config
+    assert config.shard_size == 1000 and tuple( config.percentiles ) == (1., 99.)
+
+def test_cli_direct_input_defaults( exported, tmp_path ):
+    res = CliRunner().invoke( app, [ 'export', 'frames', '/data/rec', str( tmp_path / 'out' ) ] )
+    assert res.exit_code == 0, res.output
+    [(kind, config)] = exported
+    assert config == ExportConfig( inputs = [ '/data/rec' ] )
+
+
+#
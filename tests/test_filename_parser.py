@@ -0,0 +1,52 @@
+"""Tests for filename templates (`toile.tiff_import._make_filename_parser`)."""
+
+##
+# Imports
+
+import pytest
+
+from toile.tiff_import import (
+    _make_filename_parser,
+    _unformat,
+)
+
+
+##
+# Literal text
+
+# Literal '.' and '_' between placeholders, and in the extension
+_TEMPLATE = '{date:date_compact}_m{mouse_id:int}.s{slice_id:identity}_{region}.ome.tif'
+
+def test_literals_parse():
+    parser = _make_filename_parser( _TEMPLATE, { 'region': 'identity' } )
+    assert parser( '20240131_m12.sA_2_CA1.ome.tif' ) == {
+        '_source_filename': '20240131_m12.sA_2_CA1.ome.tif',
+        'date': '2024-01-31T00:00:00',
+        'mouse_id': 12,
+        'slice_id': 'A',
+        'region': '2_CA1',
+    }
+
+def test_literal_dot_is_not_a_wildcard():
+    # Matched before templates were compiled, when '.' matched any character
+    parser = _make_filename_parser( _TEMPLATE, { 'region': 'identity' } )
+    with pytest.raises( ValueError ):
+        parser( '20240131_m12xsA_2_CA1.ome.tif' )
+    with pytest.raises( ValueError ):
+        parser( '20240131_m12.sA_2_CA1_ome_tif' )
+
+def test_parse_many_matches_call():
+    parser = _make_filename_parser( _TEMPLATE, { 'region': 'identity' } )
+    names = [ '20240131_m12.sA_2_CA1.ome.tif', '20231105_m3.sB_V1.ome.tif' ]
+    assert parser.parse_many( names ) == [ parser( x ) for x in names ]
+
+def test_unformat():
+    assert _unformat( 'mouse_123_slice_A5.tif', 'mouse_{mouse_id}_slice_{slice_id}.tif' ) == {
+        'mouse_id': '123',
+        'slice_id': 'A5',
+    }
+    with pytest.raises( ValueError ):
+        _unformat( 'mouse_123_slice_A5xtif', 'mouse_{mouse_id}_slice_{slice_id}.tif' )
+
+
+#
@@ -0,0 +1,73 @@
+"""Tests for random access to exported shards (`toile.reader.ShardReader`)."""
+
+##
+# Imports
+
+import re
+
+import numpy as np
+import pytest
+
+from toile.export import export_tiffs
+from toile.reader import ShardReader
+
+
+##
+# Helpers
+
+_KEY = re.compile( r'tseries-\d+-frame-(\d+)' )
+
+def _truth( recordings, reader: ShardReader, key: str ) -> np.ndarray:
+    """Frame of the recordings that a frame export's sample key refers to."""
+    path = reader.recording( key )['path']
+    [frames] = [ x.frames for x in recordings if str( x.path ) == path ]
+    return frames[int( _KEY.fullmatch( key ).group( 1 ) )]
+
+def _export( recordings, output, **kwargs ) -> None:
+    export_tiffs( [ x.path for x in recordings ], output, 'ds',
+        kind = 'frames',
+        shard_size = 20_000,
+        **kwargs,
+    )
+
+
+##
+# Lookups
+
+@pytest.mark.parametrize( 'compression', [None, 'gzip', 'zstd'] )
+def test_lookups( recordings, tmp_path, compression ):
+    if compression == 'zstd':
+        pytest.importorskip( 'zstandard' )
+    _export( recordings, tmp_path,
+        compressed = compression is not None,
+        compression = compression or 'gzip',
+    )
+    assert len( list( tmp_path.glob( 'ds-[0-9]*.index.json' ) ) ) > 1
+
+    with ShardReader( tmp_path, 'ds' ) as reader:
+        keys = reader.keys()
+        assert len( keys ) == sum( x.frames.shape[0] for x in recordings )
+        # Out of order, and back to earlier samples of open shards
+        for key in keys[::-1] + keys[::3]:
+            frame = reader[key]
+            assert np.array_equal( frame.image, _truth( recordings, reader, key ) )
+            assert frame.metadata['frame']['t_index'] == int( _KEY.fullmatch( key ).group( 1 ) )
+
+def test_lookups_with_image_codec( recordings, tmp_path ):
+    pytest.importorskip( 'zstandard' )
+    _export( recordings, tmp_path, image_codec = 'zstd', compressed = True )
+    with ShardReader( tmp_path, 'ds' ) as reader:
+        for key in reader.keys()[::2]:
+            assert np.array_equal( reader[key].image, _truth( recordings, reader, key ) )
+
+def test_sidecar_metadata( recordings, tmp_path ):
+    _export( recordings, tmp_path / 'inline' )
+    _export( recordings, tmp_path / 'sidecar', movie_metadata = 'sidecar' )
+    with ShardReader( tmp_path / 'inline', 'ds' ) as inline, \
+            ShardReader( tmp_path / 'sidecar', 'ds' ) as sidecar:
+        assert inline.keys() == sidecar.keys()
+        for key in inline.keys()[::4]:
+            assert sidecar[key].metadata == inline[key].metadata
+
+
+#
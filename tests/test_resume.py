@@ -0,0 +1,153 @@
+"""Tests for resuming interrupted exports (`export_tiffs( ..., resume = True )`)."""
+
+##
+# Imports
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import toile.export
+from toile.export import export_tiffs
+from toile.reader import ShardReader
+
+from typing import (
+    Optional,
+)
+
+
+##
+# Helpers
+
+def _export( recordings, output, **kwargs ) -> None:
+    export_tiffs( [ x.path for x in recordings ], output, 'ds',
+        kind = 'frames',
+        shard_size = 20_000,
+        **kwargs,
+    )
+
+def _samples( output ) -> dict[tuple[str, int], tuple[np.ndarray, dict]]:
+    """Samples of an export by recording path and frame index, as resumed
+    runs give recordings new indices (and so keys)."""
+    ret = dict()
+    with ShardReader( output, 'ds' ) as reader:
+        for k in reader.keys():
+            frame = reader[k]
+            cur_id = (reader.recording( k )['path'], frame.metadata['frame']['t_index'])
+            # Each frame is exported once, whatever its key
+            assert cur_id not in ret
+            ret[cur_id] = (frame.image, frame.metadata)
+        assert len( reader ) == len( ret )
+    return ret
+
+@pytest.fixture
+def loads( monkeypatch ):
+    """Recordings loaded by exports, in order."""
+    ret = []
+    load_tiff = toile.export.load_tiff
+    def _load_tiff( path, *args, **kwargs ):
+        ret.append( str( path ) )
+        return load_tiff( path, *args, **kwargs )
+    monkeypatch.setattr( toile.export, 'load_tiff', _load_tiff )
+    return ret
+
+
+##
+# Resuming
+
+def _interrupt( monkeypatch, path: str,
+            n_samples: Optional[int] = None,
+            error: type[BaseException] = KeyboardInterrupt,
+        ) -> None:
+    """Make exports raise `error` at the recording at `path`: as they load
+    it if `n_samples` is None, else after writing `n_samples` of its frames."""
+    if n_samples is None:
+        load_tiff = toile.export.load_tiff
+        def _load_tiff( cur_path, *args, **kwargs ):
+            if str( cur_path ) == path:
+                raise error()
+            return load_tiff( cur_path, *args, **kwargs )
+        monkeypatch.setattr( toile.export, 'load_tiff', _load_tiff )
+        return
+
+    filenames = { x.name for x in Path( path ).glob( '*.ome.tif' ) }
+    iter_movie_frames = toile.export._iter_movie_frames
+    def _iter_frames( ds, *args, **kwargs ):
+        for i, cur_sample in enumerate( iter_movie_frames( ds, *args, **kwargs ) ):
+            if i == n_samples and ds.metadata['filename'] in filenames:
+                raise error()
+            yield cur_sample
+    monkeypatch.setattr( toile.export, '_iter_movie_frames', _iter_frames )
+
+@pytest.mark.parametrize( 'compressed', [False, True] )
+# While loading, while writing the first of its shards, and after closing it
+@pytest.mark.parametrize( 'n_samples', [None, 4, 11] )
+def test_resume_after_interrupt( recordings, tmp_path, monkeypatch, loads, compressed, n_samples ):
+    _export( recordings, tmp_path / 'clean', compressed = compressed )
+    expected = _samples( tmp_path / 'clean' )
+    assert len( expected ) == sum( x.frames.shape[0] for x in recordings )
+
+    # Interrupted at the second recording
+    with monkeypatch.context() as m:
+        _interrupt( m, str( recordings[1].path ), n_samples )
+        with pytest.raises( KeyboardInterrupt ):
+            _export( recordings, tmp_path / 'resumed', compressed = compressed )
+    # Only samples of the first recording in closed shards are indexed
+    interrupted = _samples( tmp_path / 'resumed' )
+    assert { x[0] for x in interrupted } <= { str( recordings[0].path ) }
+
+    loads.clear()
+    _export( recordings, tmp_path / 'resumed', compressed = compressed, resume = True )
+    # The first recording is exported again unless all of its shards were closed
+    assert ( str( recordings[0].path ) in loads ) == ( len( interrupted ) < recordings[0].frames.shape[0] )
+    assert str( recordings[1].path ) in loads
+
+    ret = _samples( tmp_path / 'resumed' )
+    assert sorted( ret ) == sorted( expected )
+    for k, (image, metadata) in ret.items():
+        assert np.array_equal( image, expected[k][0] )
+        assert metadata == expected[k][1]
+    # Unfinished shards were deleted, not kept
+    for cur_path in (tmp_path / 'resumed').glob( 'ds-[0-9]*.tar*' ):
+        assert cur_path.with_name( cur_path.name.split( '.' )[0] + '.index.json' ).exists()
+
+@pytest.mark.parametrize( 'shuffle_buffer', [0, 5] )
+def test_resume_after_failure( recordings, tmp_path, monkeypatch, loads, shuffle_buffer ):
+    n_frames = [ x.frames.shape[0] for x in recordings ]
+
+    # The second recording fails part way through, and the export goes on
+    with monkeypatch.context() as m:
+        _interrupt( m, str( recordings[1].path ), 11, error = RuntimeError )
+        _export( recordings, tmp_path, shuffle_buffer = shuffle_buffer )
+    ret = _samples( tmp_path )
+    assert len( ret ) == n_frames[0] + n_frames[2]
+    assert { x[0] for x in ret } == { str( recordings[0].path ), str( recordings[2].path ) }
+
+    loads.clear()
+    _export( recordings, tmp_path, shuffle_buffer = shuffle_buffer, resume = True )
+    assert loads == [ str( recordings[1].path ) ]
+    assert len( _samples( tmp_path ) ) == sum( n_frames )
+
+def test_resume_complete_export( recordings, tmp_path, loads ):
+    _export( recordings, tmp_path )
+    expected = _samples( tmp_path )
+    files = sorted( tmp_path.iterdir() )
+    loads.clear()
+
+    _export( recordings, tmp_path, resume = True )
+    assert loads == []
+    assert _samples( tmp_path ).keys() == expected.keys()
+    # No new (empty) shards
+    assert sorted( tmp_path.iterdir() ) == files
+
+def test_resume_picks_up_new_recordings( recordings, tmp_path, loads ):
+    _export( recordings[:2], tmp_path )
+    loads.clear()
+
+    _export( recordings, tmp_path, resume = True )
+    assert loads == [ str( recordings[2].path ) ]
+    assert len( _samples( tmp_path ) ) == sum( x.frames.shape[0] for x in recordings )
+
+
+#
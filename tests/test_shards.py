@@ -0,0 +1,41 @@
+"""Tests for shard writing (`toile._shards`)."""
+
+##
+# Imports
+
+import io
+import tarfile
+
+import pytest
+
+from toile._shards import _TarStream
+
+
+##
+# Tar stream
+
+@pytest.mark.parametrize( 'mtime', [0, 1234.5] )
+def test_tar_stream_matches_tarfile( mtime ):
+    members = [ ('a.image.raw', b'x' * 2581), ('a.metadata.msgpack', b'y' * 401), ('b.msgpack', b'z' * 512) ]
+
+    expected = io.BytesIO()
+    with tarfile.open( fileobj = expected, mode = 'w|' ) as tar:
+        for name, data in members:
+            info = tarfile.TarInfo( name )
+            info.size = len( data )
+            info.mtime = mtime
+            info.mode = 0o0444
+            info.uname = info.gname = 'bigdata'
+            tar.addfile( info, io.BytesIO( data ) )
+
+    ret = io.BytesIO()
+    stream = _TarStream( ret, mtime = mtime )
+    offsets = [ stream.add( name, [ memoryview( data ) ] ) for name, data in members ]
+    stream.close()
+
+    assert ret.getvalue() == expected.getvalue()
+    for offset, (_, data) in zip( offsets, members ):
+        assert ret.getvalue()[offset:offset + len( data )] == data
+
+
+#
@@ -0,0 +1,56 @@
+"""Tests for loading OME-TIFF recordings (`toile.tiff_import.load_tiff`)."""
+
+##
+# Imports
+
+import numpy as np
+import pytest
+
+from toile.tiff_import import (
+    close_movie,
+    load_tiff,
+)
+
+
+##
+# Lazy and eager loading
+
+@pytest.mark.parametrize( 'to_uint8', [False, True] )
+def test_lazy_matches_eager( recordings, to_uint8 ):
+    for cur_recording in recordings:
+        eager = load_tiff( cur_recording.path, to_uint8 = to_uint8 )
+        lazy = load_tiff( cur_recording.path, to_uint8 = to_uint8, lazy = True )
+        try:
+            assert not isinstance( lazy.frames, np.ndarray )
+            assert lazy.frames.shape == eager.frames.shape
+            assert lazy.frames.dtype == eager.frames.dtype
+            assert np.array_equal( np.asarray( lazy.frames ), eager.frames )
+
+            # Partial reads
+            assert np.array_equal( lazy.frames[3], eager.frames[3] )
+            assert np.array_equal( lazy.frames[2:7:2, 5], eager.frames[2:7:2, 5] )
+
+            assert lazy.metadata == eager.metadata
+            assert list( lazy.frame_metadata ) == list( eager.frame_metadata )
+        finally:
+            close_movie( lazy )
+
+def test_pixels_as_written( recordings ):
+    for cur_recording in recordings:
+        ds = load_tiff( cur_recording.path )
+        assert ds.frames.dtype == np.uint16
+        assert np.array_equal( ds.frames, cur_recording.frames )
+
+def test_ome_metadata( recordings ):
+    ds = load_tiff( recordings[0].path )
+    n_frames, height, width = recordings[0].frames.shape
+    assert ds.metadata['size_t'] == n_frames
+    assert (ds.metadata['size_y'], ds.metadata['size_x']) == (height, width)
+    assert ds.metadata['date_acquired'] == '2024-01-15T14:30:00'
+
+    frame_metadata = list( ds.frame_metadata )
+    assert [ x['t_index'] for x in frame_metadata ] == list( range( n_frames ) )
+    assert [ x['t'] for x in frame_metadata ][:3] == pytest.approx( [0., 0.1, 0.2] )
+
+
+#